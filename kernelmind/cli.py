@@ -1,19 +1,11 @@
 import os
 import click
 
+from kernelmind import config
 from kernelmind.ingestion.downloader import download_and_extract
-from kernelmind.ingestion.crawler import crawl_repo
-
-from kernelmind.parsers.python_parser import parse_python
-from kernelmind.parsers.js_parser import parse_javascript
-from kernelmind.parsers.json_parser import parse_json
-from kernelmind.parsers.yaml_parser import parse_yaml
-
-
-from kernelmind.utils.mongo_store import save_parsed_code, save_parsed_config
-from kernelmind.utils.context_builder import build_context_pack
-from kernelmind.utils.chunker import build_text_chunks
-from kernelmind.embeddings.embedding_pipeline import EmbeddingPipeline
+from kernelmind.ingestion.pipeline import ingest_repo
+from kernelmind.metadata_store.factory import get_store, use_backend
+from kernelmind.vector_store.factory import use_vector_backend
 
 from kernelmind.search import search as run_search
 
@@ -23,9 +15,16 @@ def extract_repo_name(path):
 
 
 @click.group()
-def cli():
+@click.option("--metadata", type=click.Choice(["mongo", "sqlite"]), default=None,
+              help="Metadata backend (default: $KERNELMIND_METADATA or mongo)")
+@click.option("--vectors", type=click.Choice(["chroma", "flat"]), default=None,
+              help="Vector index backend (default: $KERNELMIND_VECTOR_BACKEND or chroma)")
+def cli(metadata, vectors):
     """KernelMind - offline code search and synthesis."""
-    pass
+    if metadata:
+        use_backend(metadata)
+    if vectors:
+        use_vector_backend(vectors)
 
 
 # -----------------------
@@ -33,7 +32,12 @@ def cli():
 # -----------------------
 @cli.command()
 @click.argument("repo_url")
-def ingest(repo_url):
+@click.option("--full", is_flag=True, help="Re-index every file, ignoring stored hashes")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True,
+              help="Parser processes (1 = parse serially)")
+@click.option("--embed-workers", default=1, show_default=True,
+              help="Embedding processes, each with its own model copy (1 = embed in-process)")
+def ingest(repo_url, full, workers, embed_workers):
     """Download, parse, chunk, and embed a repository."""
     click.echo(f"Downloading {repo_url}...")
     path = download_and_extract(repo_url)
@@ -42,125 +46,326 @@ def ingest(repo_url):
     click.echo(f"Downloaded to: {path}")
     click.echo(f"Using repository name: {repo_name}")
 
-    files = crawl_repo(path)
-
-    # --- language detection ---
-    py_files = [f for f in files if f.endswith(".py")]
-    js_files = [f for f in files if f.endswith((".js", ".jsx"))]
-    ts_files = [f for f in files if f.endswith((".ts", ".tsx"))]
-    json_files = [f for f in files if f.endswith(".json")]
-    yaml_files = [f for f in files if f.endswith((".yaml", ".yml"))]
+    stats = ingest_repo(
+        path, repo_name, workers=workers, full=full, embed_workers=embed_workers, log=click.echo
+    )
+    get_store().record_repo(repo_name, url=repo_url, branch="master", path=os.path.abspath(path))
 
-    click.echo(f"Found {len(py_files)} Python files")
-    click.echo(f"Found {len(js_files)} JS files")
-    click.echo(f"Found {len(ts_files)} TS files")
-    click.echo(f"Found {len(json_files)} JSON files")
-    click.echo(f"Found {len(yaml_files)} YAML files")
+    click.echo(
+        f"\nIngestion complete. Embedded {stats['embedded']} of {stats['chunks']} chunks, "
+        f"removed {stats['deleted']} stale chunks."
+    )
+    click.echo(f"You can now run: km s \"your query\" --repo {repo_name}")
 
-    click.echo("\nParsing files...\n")
 
-    # --- Parse & Store Code ---
-    for f in py_files:
-        click.echo(f"[PY] {f}")
-        save_parsed_code(parse_python(f), repo_name, repo_root=path)
+@cli.command()
+@click.argument("repo_name")
+@click.option("--root", default=None, help="Extracted tree (default: $KERNELMIND_REPOS/<repo_name>)")
+def reembed(repo_name, root):
+    """Re-chunk and re-embed an indexed repo from stored metadata."""
+    from kernelmind.ingestion.pipeline import reembed_repo
 
-    for f in js_files:
-        click.echo(f"[JS] {f}")
-        save_parsed_code(parse_javascript(f), repo_name, repo_root=path)
+    root = root or os.path.join(config.REPOS_DIR, repo_name)
+    total = reembed_repo(repo_name, root, log=click.echo)
+    click.echo(f"\nRe-embedded {total} chunks for {repo_name}.")
 
-    for f in ts_files:
-        click.echo(f"[TS] {f}")
-        save_parsed_code(parse_javascript(f), repo_name, repo_root=path)
 
-    # --- Parse & Store Config ---
-    for f in json_files:
-        click.echo(f"[JSON] {f}")
-        save_parsed_config(parse_json(f), repo_name, repo_root=path)
+# -----------------------
+# search command
+# -----------------------
+@cli.command()
+@click.argument("query")
+@click.option("--repo", default=None, help="Filter by repository name")
+@click.option("-k", default=5, help="Top-k chunks to retrieve")
+@click.option("--show", is_flag=True, help="Show full chunk content")
+@click.option("--type", "types", multiple=True,
+              help="Only chunks of this type (function, method, class, file, ...); repeatable")
+@click.option("--path", "path_prefix", default=None, help="Only chunks under this path prefix")
+def search(query, repo, k, show, types, path_prefix):
 
-    for f in yaml_files:
-        click.echo(f"[YAML] {f}")
-        save_parsed_config(parse_yaml(f), repo_name, repo_root=path)
+    run_search(query, k=k, repo_name=repo, synthesize=False, show_chunks=show,
+               types=types or None, path_prefix=path_prefix)
 
-    # --- Embedding ---
-    from kernelmind.utils.config_chunker import build_config_chunks
-    from kernelmind.utils.mongo_store import db
+    if show:
+        pass
 
-    pipeline = EmbeddingPipeline(backend="local")
-    total_chunks = 0
 
-    # ---------- CODE CHUNKING ----------
-    code_files = py_files + js_files + ts_files
+# -----------------------
+# answer command
+# -----------------------
+@cli.command()
+@click.argument("question")
+@click.option("-k", default=5, help="Number of supporting chunks")
+@click.option("--repo", default=None, help="Filter by repository name")
+@click.option("--type", "types", multiple=True, help="Only chunks of this type; repeatable")
+@click.option("--path", "path_prefix", default=None, help="Only chunks under this path prefix")
+def answer(question, k, repo, types, path_prefix):
 
-    for f in code_files:
-        logical = f.replace(path + "/", "")
-        pack = build_context_pack(logical, repo_name)
+    result = run_search(question, k=k, repo_name=repo, synthesize=True,
+                        types=types or None, path_prefix=path_prefix)
 
-        if not pack:
-            continue
+    if result is not None:
+        click.echo("")
+        click.echo(result)
 
-        chunks = build_text_chunks(pack, repo_root=path)
 
-        if chunks:
-            click.echo(f"Embedding {len(chunks)} code chunks from {logical}")
-            pipeline.process(chunks, repo_name)
-            total_chunks += len(chunks)
+# -----------------------
+# repo lifecycle
+# -----------------------
+def _human(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}TB"
 
-    # ---------- CONFIG CHUNKING ----------
-    config_files = json_files + yaml_files
 
-    for f in config_files:
-        logical = f.replace(path + "/", "")
+@cli.command()
+def repos():
+    """List indexed repos with chunk counts and sizes."""
+    from kernelmind.repos import list_repos
 
-        # IMPORTANT: configs live in db.configs, not db.files
-        config_doc = db.configs.find_one({
-            "file": logical,
-            "repo": repo_name
-        })
+    rows = list_repos()
+    if not rows:
+        click.echo("No repos indexed.")
+        return
 
-        if not config_doc:
-            continue
+    click.echo(f"{'REPO':40} {'FILES':>7} {'CHUNKS':>8} {'CHUNK TEXT':>11} {'SOURCE':>9}  INGESTED")
+    for r in rows:
+        click.echo(
+            f"{r['repo']:40} {r['files'] + r['configs']:>7} {r['chunks']:>8} "
+            f"{_human(r['chunk_bytes']):>11} {_human(r['source_bytes']):>9}  {r['ingested_at'][:19]}"
+        )
 
-        chunks = build_config_chunks(config_doc, repo=repo_name)
 
-        if chunks:
-            click.echo(f"Embedding {len(chunks)} config chunks from {logical}")
-            pipeline.process(chunks, repo_name)
-            total_chunks += len(chunks)
+@cli.command()
+@click.argument("repo_name")
+@click.option("--yes", is_flag=True, help="Do not ask for confirmation")
+def drop(repo_name, yes):
+    """Remove a repo from Mongo/SQLite, Chroma and repos/."""
+    from kernelmind.repos import drop_repo
 
-    click.echo(f"\nIngestion complete. Embedded {total_chunks} chunks.")
-    click.echo(f"You can now run: km s \"your query\" --repo {repo_name}")
+    if not yes:
+        click.confirm(f"Drop every record, vector and tree of {repo_name}?", abort=True)
+    drop_repo(repo_name)
+    click.echo(f"Dropped {repo_name}.")
 
 
-# -----------------------
-# search command
-# -----------------------
 @cli.command()
-@click.argument("query")
-@click.option("--repo", default=None, help="Filter by repository name")
-@click.option("-k", default=5, help="Top-k chunks to retrieve")
-@click.option("--show", is_flag=True, help="Show full chunk content")
-def search(query, repo, k, show):
+@click.option("--keep", default=1, show_default=True, help="Snapshots to keep per source repo")
+@click.option("--dry-run", is_flag=True, help="Only report what would be removed")
+@click.option("--yes", is_flag=True, help="Do not ask for confirmation")
+def gc(keep, dry_run, yes):
+    """Remove stale snapshots, orphan trees and unreferenced blobs."""
+    from kernelmind.repos import gc as run_gc
+
+    if not dry_run and not yes:
+        drop_list, orphans = run_gc(keep=keep, dry_run=True, log=click.echo)
+        click.confirm("Remove everything listed above?", abort=True)
+        drop_list, orphans = run_gc(keep=keep, log=lambda *_: None)
+    else:
+        drop_list, orphans = run_gc(keep=keep, dry_run=dry_run, log=click.echo)
+    verb = "Would remove" if dry_run else "Removed"
+    click.echo(f"{verb} {len(drop_list)} repos and {len(orphans)} orphan trees.")
 
-    run_search(query, k=k, repo_name=repo, synthesize=False, show_chunks=show)
 
-    if show:
+# -----------------------
+# embedding backends
+# -----------------------
+@cli.command("export-onnx")
+@click.option("--model", default=config.EMBED_MODEL, show_default=True)
+@click.option("--out", default=None, help="Output directory (default: $KERNELMIND_ONNX_DIR/<model>)")
+def export_onnx_cmd(model, out):
+    """Export an embedding model to int8-quantized ONNX."""
+    from kernelmind.embeddings.onnx_backend import export_onnx
+
+    path = export_onnx(model, out_dir=out, log=click.echo)
+    click.echo(f"Exported to {path}. Use it with KERNELMIND_EMBED_BACKEND=onnx.")
+
+
+@cli.command("bench-embed")
+@click.option("--backend", "backends", multiple=True, default=["onnx"], show_default=True,
+              help="Backend(s) to compare against the PyTorch 'local' reference")
+@click.option("--root", default=os.path.dirname(os.path.abspath(__file__)),
+              help="Source tree to sample texts from (default: this package)")
+@click.option("-n", "count", default=256, show_default=True, help="Texts to embed")
+@click.option("--threads", default=config.EMBED_THREADS, show_default=True,
+              help="Intra-op threads for the onnx backend (0 = runtime default)")
+def bench_embed(backends, root, count, threads):
+    """Check embedding parity (cosine) and throughput against the local backend."""
+    from kernelmind.embeddings.bench import sample_texts, cosine_parity, throughput, MIN_COSINE
+    from kernelmind.embeddings.factory import EmbeddingFactory
+
+    texts = sample_texts(root, n=count)
+    if not texts:
+        raise click.ClickException(f"No source files to sample under {root}")
+
+    reference = EmbeddingFactory.create("local")
+    click.echo(f"{len(texts)} texts from {root}")
+    click.echo(f"{'BACKEND':10} {'TEXTS/S':>9} {'MIN COS':>8} {'MEAN COS':>9}")
+    click.echo(f"{'local':10} {throughput(reference, texts):9.1f} {1.0:8.4f} {1.0:9.4f}")
+
+    failed = []
+    for name in backends:
+        options = {"threads": threads} if name == "onnx" else {}
+        backend = EmbeddingFactory.create(name, **options)
+        low, mean = cosine_parity(reference, backend, texts)
+        click.echo(f"{name:10} {throughput(backend, texts):9.1f} {low:8.4f} {mean:9.4f}")
+        if low < MIN_COSINE:
+            failed.append(name)
+
+    if failed:
+        raise click.ClickException(f"Cosine below {MIN_COSINE} for: {', '.join(failed)}")
+
+
+@cli.command("serve-embeddings")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8765, show_default=True)
+@click.option("--backend", type=click.Choice(["local", "onnx"]), default="local", show_default=True)
+@click.option("--verbose", is_flag=True, help="Log every request")
+def serve_embeddings(host, port, backend, verbose):
+    """Serve embeddings over HTTP for the "cloud" backend (KERNELMIND_EMBED_URL)."""
+    from kernelmind.embeddings.server import make_server
+
+    server = make_server(host, port, backend=backend, verbose=verbose)
+    click.echo(f"Serving {server.embedder.model_name} on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
         pass
+    finally:
+        server.server_close()
 
 
 # -----------------------
-# answer command
+# compact vectors
 # -----------------------
+def _parse_options(dims, fp16):
+    options = [("none", None, False)]
+    if fp16:
+        options.append(("none", None, True))
+    for d in dims:
+        options.append(("pca", d, False))
+        options.append(("truncate", d, False))
+        if fp16:
+            options.append(("pca", d, True))
+    return options
+
+
+@cli.command("compact-report")
+@click.option("--dims", default="64,128,256,384", show_default=True,
+              help="Comma-separated target dimensions")
+@click.option("--fp16", is_flag=True, help="Also report float16 storage")
+@click.option("--sample", default=5000, show_default=True, help="Stored vectors to evaluate on")
+@click.option("-k", default=10, show_default=True, help="Recall@k")
+def compact_report(dims, fp16, sample, k):
+    """Recall vs memory of compact vector options on the current index."""
+    from kernelmind.vector_store.factory import get_vector_store
+    from kernelmind.vector_store.compact import sample_vectors, recall_report, HNSW_LINK_BYTES
+
+    store = get_vector_store()
+    if not store.transform.identity:
+        raise click.ClickException("Index is already compact; the report needs full model-space vectors.")
+
+    vectors = sample_vectors(store, size=sample)
+    if len(vectors) <= k + 1:
+        raise click.ClickException("Not enough vectors indexed for a report.")
+
+    dims = [int(d) for d in dims.split(",") if d.strip()]
+    rows = recall_report(vectors, _parse_options(dims, fp16), k=k)
+    total = store.count()
+
+    click.echo(f"{len(vectors)} sampled of {total} vectors, recall@{k} vs exact float32 search")
+    click.echo(f"{'MODE':9} {'DIMS':>5} {'FP16':>5} {'RECALL':>7} {'B/VEC':>6} {'SIZE':>6} {'INDEX (est.)':>13}")
+    for r in rows:
+        est = _human(total * (r["bytes_per_vector"] + HNSW_LINK_BYTES))
+        click.echo(
+            f"{r['mode']:9} {r['dims']:5} {'yes' if r['fp16'] else 'no':>5} {r['recall']:7.3f} "
+            f"{r['bytes_per_vector']:6} {r['ratio']:6.0%} {est:>13}"
+        )
+    click.echo("Chroma stores float32, so fp16 only shrinks the flat backend.")
+
+
 @cli.command()
-@click.argument("question")
-@click.option("-k", default=5, help="Number of supporting chunks")
-@click.option("--repo", default=None, help="Filter by repository name")
-def answer(question, k, repo):
+@click.option("--mode", type=click.Choice(["pca", "truncate"]), default="pca", show_default=True)
+@click.option("--dims", default=256, show_default=True)
+@click.option("--fp16", is_flag=True, help="Round stored vectors through float16")
+@click.option("--yes", is_flag=True, help="Do not ask for confirmation")
+def compact(mode, dims, fp16, yes):
+    """Rewrite the vector index in a compact (reduced / float16) space."""
+    from kernelmind.vector_store.factory import get_vector_store
+    from kernelmind.vector_store.compact import compact_index
+
+    if not yes:
+        click.confirm(f"Rewrite every vector to {mode} {dims} dims? This cannot be undone without km reembed", abort=True)
+    try:
+        total = compact_index(get_vector_store(), mode=mode, dims=dims, fp16=fp16, log=click.echo)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Compacted {total} vectors. Queries are projected automatically.")
+
+
+@cli.command("bench-index")
+@click.option("--copy", is_flag=True, help="Rebuild the flat index from the Chroma index first")
+@click.option("-n", "count", default=200, show_default=True, help="Stored vectors used as queries")
+@click.option("-k", default=10, show_default=True, help="Recall@k")
+@click.option("--repo", default=None, help="Only search this repo")
+def bench_index(copy, count, k, repo):
+    """Query latency and recall of the Chroma and flat backends on the same index."""
+    from kernelmind.vector_store.factory import get_vector_store
+    from kernelmind.vector_store.filters import build_where
+    from kernelmind.vector_store.bench import copy_index, compare_backends
+
+    chroma = get_vector_store(backend="chroma")
+    flat = get_vector_store(backend="flat")
+    if copy:
+        click.echo(f"Copying {chroma.count()} vectors into the flat index...")
+        copy_index(chroma, flat, log=click.echo)
+    if not flat.count():
+        raise click.ClickException("The flat index is empty; run with --copy or ingest with --vectors flat.")
+    if not flat.transform.identity:
+        raise click.ClickException("Index is compact; the benchmark needs full model-space vectors.")
+
+    rows = compare_backends({"flat": flat, "chroma": chroma}, "flat", count=count, k=k, where=build_where(repo))
+    click.echo(f"{flat.count()} flat / {chroma.count()} chroma vectors, recall@{k} vs exact flat search")
+    click.echo(f"{'BACKEND':8} {'QUERIES':>7} {'P50 MS':>7} {'P95 MS':>7} {'BATCH MS/Q':>10} {'RECALL':>7}")
+    for r in rows:
+        click.echo(
+            f"{r['backend']:8} {r['queries']:7} {r['p50_ms']:7.2f} {r['p95_ms']:7.2f} "
+            f"{r['batch_ms']:10.2f} {r['recall']:7.3f}"
+        )
 
-    result = run_search(question, k=k, repo_name=repo, synthesize=True)
 
-    if result is not None:
-        click.echo("")
-        click.echo(result)
+@cli.command()
+@click.option("--fix", is_flag=True, help="Create any missing indexes")
+def doctor(fix):
+    """Check metadata store indexes and query plans."""
+    store = get_store()
+    click.echo(f"Metadata backend: {type(store).__name__}")
+
+    missing = store.missing_indexes()
+    if missing and fix:
+        store.ensure_indexes()
+        click.echo(f"Created {len(missing)} missing indexes.")
+        missing = store.missing_indexes()
+
+    if missing:
+        click.echo("Missing indexes:")
+        for coll, fields in missing:
+            click.echo(f"  {coll}: ({', '.join(fields)})")
+    else:
+        click.echo("Indexes: OK")
+
+    slow = store.slow_query_plans()
+    if slow:
+        click.echo("Queries falling back to a collection scan:")
+        for coll, flt, plan in slow:
+            click.echo(f"  {coll} {sorted(flt)} -> {plan}")
+    else:
+        click.echo("Query plans: OK")
+
+    if missing or slow:
+        raise SystemExit(1)
 
 
 # aliases
@@ -0,0 +1,94 @@
+import os
+
+# ----------------------------------
+# Locations + backends, overridable from the environment
+# ----------------------------------
+KERNELMIND_HOME = os.path.abspath(os.path.expanduser(
+    os.environ.get("KERNELMIND_HOME", "~/.kernelmind")
+))
+
+# downloaded + extracted repo trees, with the download cache and manifests
+REPOS_DIR = os.path.abspath(os.path.expanduser(
+    os.environ.get("KERNELMIND_REPOS", os.path.join(KERNELMIND_HOME, "repos"))
+))
+
+# "mongo" or "sqlite"
+METADATA_BACKEND = os.environ.get("KERNELMIND_METADATA", "mongo")
+MONGO_URI = os.environ.get("KERNELMIND_MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.environ.get("KERNELMIND_MONGO_DB", "kernelmind")
+SQLITE_PATH = os.path.abspath(os.path.expanduser(
+    os.environ.get("KERNELMIND_SQLITE_PATH", os.path.join(KERNELMIND_HOME, "metadata.db"))
+))
+
+# Node worker for JS/TS parsing: its script (default: the one shipped in
+# kernelmind/parsers) and the seconds one batch may take before the
+# worker is killed and restarted. @babel/parser must be resolvable from
+# the script or through NODE_PATH.
+PARSE_JS_SCRIPT = os.environ.get("KERNELMIND_PARSE_JS", "")
+JS_PARSE_TIMEOUT = float(os.environ.get("KERNELMIND_JS_TIMEOUT", "120"))
+
+# content-addressed, compressed source blobs shared by every repo; each
+# metadata backend keeps its own subdirectory (see get_blob_store)
+BLOB_DIR = os.path.abspath(os.path.expanduser(
+    os.environ.get("KERNELMIND_BLOB_DIR", os.path.join(KERNELMIND_HOME, "blobs"))
+))
+# gc only sweeps blobs untouched for this long (seconds): ingest writes a
+# blob just before committing the metadata that references it
+BLOB_GC_GRACE = int(os.environ.get("KERNELMIND_BLOB_GC_GRACE", "3600"))
+
+# on-disk embedding cache keyed by (model, chunk hash)
+EMBED_CACHE_DIR = os.path.abspath(os.path.expanduser(
+    os.environ.get("KERNELMIND_EMBED_CACHE", os.path.join(KERNELMIND_HOME, "embed_cache"))
+))
+EMBED_CACHE_MAX_ENTRIES = int(os.environ.get("KERNELMIND_EMBED_CACHE_MAX", "1000000"))
+
+# texts per encode call, and queued chunks that trigger a flush
+EMBED_BATCH_SIZE = int(os.environ.get("KERNELMIND_EMBED_BATCH", "64"))
+EMBED_FLUSH_AT = int(os.environ.get("KERNELMIND_EMBED_FLUSH", "2048"))
+
+# embedding backend used by ingest ("local", "onnx", "cloud")
+EMBED_BACKEND = os.environ.get("KERNELMIND_EMBED_BACKEND", "local")
+EMBED_MODEL = os.environ.get("KERNELMIND_EMBED_MODEL", "BAAI/bge-base-en")
+
+# exported + int8-quantized ONNX models, one directory per model
+ONNX_DIR = os.path.abspath(os.path.expanduser(
+    os.environ.get("KERNELMIND_ONNX_DIR", os.path.join(KERNELMIND_HOME, "onnx"))
+))
+# ONNX Runtime intra-op threads (0 = let the runtime decide)
+EMBED_THREADS = int(os.environ.get("KERNELMIND_EMBED_THREADS", "0"))
+
+# device for torch models ("auto" = cuda when available) and torch
+# intra-op threads (0 = torch default)
+MODEL_DEVICE = os.environ.get("KERNELMIND_DEVICE", "auto")
+TORCH_THREADS = int(os.environ.get("KERNELMIND_TORCH_THREADS", "0"))
+
+# in-memory LRU of query / symbol embeddings on the search path;
+# persisted to KERNELMIND_QUERY_CACHE when set
+QUERY_CACHE_SIZE = int(os.environ.get("KERNELMIND_QUERY_CACHE_SIZE", "4096"))
+QUERY_CACHE_PATH = os.environ.get("KERNELMIND_QUERY_CACHE", "")
+
+# vector index (Chroma persistence directory); absolute so every working
+# directory sees the same index
+INDEX_DIR = os.path.abspath(os.path.expanduser(
+    os.environ.get("KERNELMIND_INDEX", os.path.join(KERNELMIND_HOME, "chroma"))
+))
+
+# vector index backend: "chroma" (HNSW) or "flat" (exact, memory-mapped
+# NumPy matrix under FLAT_INDEX_DIR)
+VECTOR_BACKEND = os.environ.get("KERNELMIND_VECTOR_BACKEND", "chroma")
+FLAT_INDEX_DIR = os.path.abspath(os.path.expanduser(
+    os.environ.get("KERNELMIND_FLAT_INDEX", os.path.join(KERNELMIND_HOME, "flat_index"))
+))
+
+# fitted compact-vector transforms (PCA / truncation, float16) are stored
+# next to their index; this is the old shared location, migrated on open
+TRANSFORM_DIR = os.path.abspath(os.path.expanduser(
+    os.environ.get("KERNELMIND_TRANSFORM_DIR", os.path.join(KERNELMIND_HOME, "transforms"))
+))
+
+# remote embedding service used by the "cloud" backend (see km serve-embeddings)
+EMBED_URL = os.environ.get("KERNELMIND_EMBED_URL", "http://localhost:8765")
+EMBED_API_KEY = os.environ.get("KERNELMIND_EMBED_API_KEY", "")
+EMBED_CONCURRENCY = int(os.environ.get("KERNELMIND_EMBED_CONCURRENCY", "4"))
+# cap on the JSON text payload of one request
+EMBED_MAX_REQUEST_BYTES = int(os.environ.get("KERNELMIND_EMBED_MAX_REQUEST_BYTES", str(4 << 20)))
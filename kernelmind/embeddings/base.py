@@ -1,4 +1,8 @@
 
 class EmbeddingBackend:
-    def embed(self, texts):
+    def embed(self, texts, batch_size=None):
+        """
+        Vectors for texts, in order. `batch_size` overrides the backend's
+        own for this call only; backends are shared, so callers never set it.
+        """
         raise NotImplementedError
@@ -0,0 +1,50 @@
+import os
+import time
+
+import numpy as np
+
+# parity bar between a backend and the PyTorch reference
+MIN_COSINE = 0.99
+
+
+def sample_texts(root, n=256, lines_per_text=40):
+    """Up to n code snippets of `lines_per_text` lines from the .py/.js/.ts files under root."""
+    texts = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d != "node_modules")
+        for name in sorted(filenames):
+            if not name.endswith((".py", ".js", ".ts")):
+                continue
+            try:
+                with open(os.path.join(dirpath, name), encoding="utf-8") as f:
+                    lines = f.readlines()
+            except (OSError, UnicodeDecodeError):
+                continue
+            for i in range(0, len(lines), lines_per_text):
+                text = "".join(lines[i:i + lines_per_text]).strip()
+                if text:
+                    texts.append(text)
+                if len(texts) >= n:
+                    return texts
+    return texts
+
+
+def cosine_parity(reference, candidate, texts):
+    """(min, mean) cosine between the two backends' vectors for each text."""
+    a = np.asarray(reference.embed(texts), dtype=np.float32)
+    b = np.asarray(candidate.embed(texts), dtype=np.float32)
+    a /= np.linalg.norm(a, axis=1, keepdims=True)
+    b /= np.linalg.norm(b, axis=1, keepdims=True)
+    cos = (a * b).sum(axis=1)
+    return float(cos.min()), float(cos.mean())
+
+
+def throughput(backend, texts, rounds=3):
+    """Best texts/second over `rounds` full passes (after one warm-up batch)."""
+    backend.embed(texts[:8])
+    best = 0.0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        backend.embed(texts)
+        best = max(best, len(texts) / (time.perf_counter() - t0))
+    return best
@@ -0,0 +1,347 @@
+import os
+import re
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+
+import numpy as np
+
+from kernelmind import config
+from .base import EmbeddingBackend
+
+# SQLite's default limit on bound parameters is 999 on older builds
+IN_CHUNK = 900
+
+# smallest slot allocation of the vector file
+MIN_CAPACITY = 1024
+
+
+def _chunks(values, size=IN_CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _slug(model_name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+
+
+class EmbeddingCache:
+    """
+    Disk cache of embeddings for one model.
+
+    A SQLite table maps chunk hash -> (slot, last_used) and the vectors
+    live in a memory-mapped float32 file, one row per slot. The file grows
+    by doubling up to max_entries; past that, the least recently used
+    entries give up their slots.
+
+    Slots come from an explicit free list and a next-slot counter, both
+    updated inside one BEGIN IMMEDIATE transaction with the entries, so
+    ingests running at once in several processes never share a slot.
+    """
+
+    def __init__(self, root, model_name, max_entries=1000000):
+        self.dir = os.path.join(root, _slug(model_name))
+        os.makedirs(self.dir, exist_ok=True)
+        self.max_entries = max_entries
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+
+        # transactions are managed explicitly (see _txn)
+        self.conn = sqlite3.connect(
+            os.path.join(self.dir, "index.db"), check_same_thread=False,
+            isolation_level=None, timeout=60,
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                hash TEXT PRIMARY KEY, slot INTEGER NOT NULL, last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY);
+        """)
+        self.lock = threading.Lock()
+
+        with self.lock, self._txn():
+            self.dim = self._meta_int("dim")
+            if self._meta_int("next_slot") is None:
+                self._init_slots()
+        self.matrix = None
+        self.capacity = 0
+        if self.dim and os.path.exists(self.vectors_path):
+            self._open()
+
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def _txn(self):
+        """BEGIN IMMEDIATE: takes the write lock up front, across processes."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _meta_int(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _init_slots(self):
+        """Caches from before the free list: next slot past the highest, holes are free."""
+        used = {slot for (slot,) in self.conn.execute("SELECT slot FROM entries")}
+        next_slot = max(used) + 1 if used else 0
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO free_slots (slot) VALUES (?)",
+            [(s,) for s in range(next_slot) if s not in used],
+        )
+        self._set_meta("next_slot", next_slot)
+
+    # ---------------------------------
+    # vector file
+    # ---------------------------------
+
+    def _open(self):
+        rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+        self.capacity = rows
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(rows, self.dim)) if rows else None
+
+    def _grow(self, needed):
+        """Make the file and this process' mapping cover `needed` slots (under _txn)."""
+        if needed <= self.capacity:
+            return
+        if self.matrix is not None:
+            self.matrix.flush()
+            self.matrix = None
+        # another process may already have grown the file
+        rows = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+        if rows < needed:
+            new_cap = max(needed, min(self.max_entries, max(rows * 2, MIN_CAPACITY)))
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(new_cap * self.dim * 4)
+        self._open()
+
+    # ---------------------------------
+    # lookups
+    # ---------------------------------
+
+    def get_many(self, hashes):
+        """{hash: vector} for every cached hash; bumps their LRU stamp."""
+        found = {}
+        # inside the write lock, so no other process re-slots an entry mid-read
+        with self.lock, self._txn():
+            if self.dim is None:
+                self.dim = self._meta_int("dim")
+            slots = {}
+            if self.dim:
+                for part in _chunks(hashes):
+                    marks = ",".join("?" * len(part))
+                    slots.update(self.conn.execute(
+                        f"SELECT hash, slot FROM entries WHERE hash IN ({marks})", part
+                    ))
+            if slots:
+                # the file may have been grown by another process
+                self._grow(max(slots.values()) + 1)
+                for h, slot in slots.items():
+                    found[h] = np.array(self.matrix[slot])
+
+                self.conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE hash = ?",
+                    [(time.time(), h) for h in found],
+                )
+
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, hashes, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(hashes):
+            return
+
+        # never cache more than the cache can hold; last write of a hash wins
+        latest = dict(zip(list(hashes)[-self.max_entries:], vectors[-self.max_entries:]))
+
+        with self.lock, self._txn():
+            if self.dim is None:
+                self.dim = self._meta_int("dim") or int(vectors.shape[1])
+                self._set_meta("dim", self.dim)
+
+            # hashes already cached keep their slot
+            slots = {}
+            for part in _chunks(list(latest)):
+                marks = ",".join("?" * len(part))
+                slots.update(self.conn.execute(
+                    f"SELECT hash, slot FROM entries WHERE hash IN ({marks})", part
+                ))
+            new = [h for h in latest if h not in slots]
+
+            fresh = [s for (s,) in self.conn.execute(
+                "SELECT slot FROM free_slots ORDER BY slot LIMIT ?", (len(new),)
+            )]
+            self.conn.executemany("DELETE FROM free_slots WHERE slot = ?", [(s,) for s in fresh])
+
+            next_slot = self._meta_int("next_slot")
+            grow = max(0, min(len(new) - len(fresh), self.max_entries - next_slot))
+            fresh += range(next_slot, next_slot + grow)
+            next_slot += grow
+            self._set_meta("next_slot", next_slot)
+
+            evict = len(new) - len(fresh)
+            if evict:
+                victims = self.conn.execute(
+                    "SELECT hash, slot FROM entries ORDER BY last_used LIMIT ?",
+                    (evict + len(slots),),
+                ).fetchall()
+                victims = [(h, s) for h, s in victims if h not in latest][:evict]
+                self.conn.executemany("DELETE FROM entries WHERE hash = ?", [(h,) for h, _ in victims])
+                fresh += [s for _, s in victims]
+
+            slots.update(zip(new, fresh))
+            latest = {h: v for h, v in latest.items() if h in slots}
+            self._grow(next_slot)
+
+            now = time.time()
+            for h, vec in latest.items():
+                self.matrix[slots[h]] = vec
+            self.matrix.flush()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries (hash, slot, last_used) VALUES (?, ?, ?)",
+                [(h, slots[h], now) for h in latest],
+            )
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class CachedEmbeddingBackend(EmbeddingBackend):
+    """Wraps a backend so only texts missing from the cache are embedded."""
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+
+    def embed(self, texts, batch_size=None):
+        texts = list(texts)
+        hashes = [text_hash(t) for t in texts]
+        found = self.cache.get_many(list(dict.fromkeys(hashes)))
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = t
+
+        if missing:
+            fresh = np.asarray(
+                self.backend.embed(list(missing.values()), batch_size=batch_size), dtype=np.float32
+            )
+            self.cache.put_many(list(missing), fresh)
+            found.update(zip(missing, fresh))
+
+        return np.stack([found[h] for h in hashes]) if hashes else np.zeros((0, 0), dtype=np.float32)
+
+
+# ============================================================
+# Query / symbol embeddings on the search path
+# ============================================================
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of (model, text) -> vector for the short texts search
+    embeds over and over (refined queries, called symbols). Optionally
+    loaded from / saved to a pickle at `path`.
+    """
+
+    def __init__(self, max_entries=4096, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        if path and os.path.exists(path):
+            self.load()
+
+    def embed(self, embedder, texts):
+        """Vectors for texts in order; only misses reach the embedder, in one batch."""
+        model = getattr(embedder, "model_name", type(embedder).__name__)
+        texts = list(texts)
+        found = {}
+        with self.lock:
+            for t in texts:
+                key = (model, t)
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    found[t] = self.entries[key]
+            missing = list(dict.fromkeys(t for t in texts if t not in found))
+            self.hits += sum(1 for t in texts if t in found)
+            self.misses += len(missing)
+
+        if missing:
+            vectors = np.asarray(embedder.embed(missing), dtype=np.float32)
+            with self.lock:
+                for t, vec in zip(missing, vectors):
+                    found[t] = vec
+                    self.entries[(model, t)] = vec
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                self.dirty = True
+
+        return np.stack([found[t] for t in texts])
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                entries = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return
+        with self.lock:
+            self.entries = OrderedDict(list(entries.items())[-self.max_entries:])
+
+    def save(self):
+        if not (self.path and self.dirty):
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self.lock:
+            tmp = self.path + ".part"
+            with open(tmp, "wb") as f:
+                pickle.dump(dict(self.entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+            self.dirty = False
+
+
+_QUERY_CACHE = None
+
+
+def get_query_cache():
+    """Process-wide query/symbol embedding cache."""
+    global _QUERY_CACHE
+    if _QUERY_CACHE is None:
+        _QUERY_CACHE = QueryEmbeddingCache(
+            config.QUERY_CACHE_SIZE,
+            path=os.path.expanduser(config.QUERY_CACHE_PATH) or None,
+        )
+    return _QUERY_CACHE
@@ -1,6 +1,122 @@
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from kernelmind import config
 from .base import EmbeddingBackend
 
+# statuses worth retrying: throttling and transient gateway / overload
+# errors; a 500 is the embedder itself failing on the input
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
 class CloudEmbeddingBackend(EmbeddingBackend):
-    def embed(self, texts):
-        raise RuntimeError("Cloud embeddings not configured yet.")
+    """
+    Embeddings from a remote service speaking the km serve-embeddings
+    protocol:
+
+      GET  {url}/info   -> {"model": str, "dim": int}
+      POST {url}/embed  {"model": str, "texts": [...]} -> {"embeddings": [[...]]}
+
+    Inputs are cut into batches capped by count and payload size, sent
+    over a pooled keep-alive session with bounded concurrency, retried
+    with exponential backoff, and returned in input order.
+    """
+
+    def __init__(self, model_name=config.EMBED_MODEL, url=config.EMBED_URL,
+                 batch_size=config.EMBED_BATCH_SIZE, max_request_bytes=config.EMBED_MAX_REQUEST_BYTES,
+                 concurrency=config.EMBED_CONCURRENCY, retries=4, backoff=0.5, timeout=120,
+                 api_key=config.EMBED_API_KEY):
+        self.url = url.rstrip("/")
+        self.batch_size = batch_size
+        self.max_request_bytes = max_request_bytes
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+        self.pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="km-embed-http")
+
+        # the service may run a variant (e.g. "<model>@onnx-int8"); its full
+        # name keys the embedding cache, the base name must match
+        info = self._request("GET", "/info")
+        if str(info.get("model", "")).split("@")[0] != model_name:
+            raise RuntimeError(
+                f"Embedding service at {self.url} serves {info.get('model')!r}, expected {model_name!r}"
+            )
+        self.model_name = info["model"]
+        self.dim = int(info["dim"])
+
+    # ---------------------------------
+    # transport
+    # ---------------------------------
+
+    def _request(self, method, path, payload=None):
+        last = None
+        for attempt in range(self.retries + 1):
+            try:
+                resp = self.session.request(method, self.url + path, json=payload, timeout=self.timeout)
+                if resp.status_code not in RETRY_STATUSES:
+                    if resp.status_code >= 400:
+                        raise RuntimeError(
+                            f"Embedding service at {self.url}: {method} {path}: "
+                            f"HTTP {resp.status_code} {resp.text[:500]}"
+                        )
+                    return resp.json()
+                last = RuntimeError(f"{method} {path}: HTTP {resp.status_code}")
+                retry_after = resp.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last, retry_after = e, None
+
+            if attempt == self.retries:
+                break
+            delay = self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            time.sleep(delay)
+
+        raise RuntimeError(f"Embedding service at {self.url} failed after {self.retries + 1} attempts: {last}")
+
+    def _batches(self, texts, batch_size):
+        batch, size = [], 0
+        for text in texts:
+            n = len(text.encode()) + 8
+            if batch and (len(batch) >= batch_size or size + n > self.max_request_bytes):
+                yield batch
+                batch, size = [], 0
+            batch.append(text)
+            size += n
+        if batch:
+            yield batch
+
+    def _embed_batch(self, texts):
+        data = self._request("POST", "/embed", {"model": self.model_name, "texts": texts})
+        vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        if vectors.shape != (len(texts), self.dim):
+            raise RuntimeError(
+                f"Embedding service returned shape {vectors.shape}, expected ({len(texts)}, {self.dim})"
+            )
+        return vectors
+
+    def embed(self, texts, batch_size=None):
+        batches = list(self._batches(list(texts), batch_size or self.batch_size))
+        if not batches:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+        return np.concatenate(list(self.pool.map(self._embed_batch, batches)))
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
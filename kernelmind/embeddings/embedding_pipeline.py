@@ -1,27 +1,96 @@
 from kernelmind.embeddings.factory import EmbeddingFactory
-from kernelmind.vector_store.chroma_store import VectorStore
+from kernelmind.embeddings.cache import EmbeddingCache, CachedEmbeddingBackend
+from kernelmind.vector_store.base import clean_metas
+from kernelmind.vector_store.factory import get_vector_store
+from kernelmind.vector_store.filters import filter_meta
+from kernelmind.utils.chunker import approx_token_lengths
+from kernelmind import config, models
 import hashlib
 
+import numpy as np
+
 
 class EmbeddingPipeline:
-    def __init__(self, backend="local"):
-        self.embedder = EmbeddingFactory.create(backend)
-        self.store = VectorStore()
+    """
+    Chunks -> vectors. `process` diffs a file's chunks against the store
+    and queues the new ones; queued chunks from every file are embedded
+    together once `flush_at` are waiting (and on `flush()`), sorted by
+    token length so each encode batch of `batch_size` pads as little as
+    possible. `workers` > 1 spreads those batches over a process pool.
+    """
 
-    def _chunk_id(self, repo, chunk, index):
-        q = chunk.get("qualified_name") or chunk.get("name") or "file"
-        return f"{repo}:{chunk['path']}:{q}:{index}"
+    def __init__(self, backend=config.EMBED_BACKEND, cache=True,
+                 batch_size=config.EMBED_BATCH_SIZE, flush_at=config.EMBED_FLUSH_AT,
+                 workers=1):
+        # models come from the process-wide registry, so search and ingest
+        # in one process share a single copy
+        if workers > 1:
+            self.embedder = models.get_model(
+                ("embedder", "multiprocess", backend, workers),
+                lambda: EmbeddingFactory.create(
+                    "multiprocess", inner=backend, workers=workers, batch_size=batch_size
+                ),
+            )
+        else:
+            self.embedder = models.get_embedder(backend)
+        self.backend = self.embedder
+        self.batch_size = batch_size
+        self.flush_at = flush_at
+        self._pending = {}
+        self.cache = None
+        if cache:
+            model = getattr(self.embedder, "model_name", backend)
+            self.cache = EmbeddingCache(
+                config.EMBED_CACHE_DIR, model, max_entries=config.EMBED_CACHE_MAX_ENTRIES
+            )
+            self.embedder = CachedEmbeddingBackend(self.embedder, self.cache)
+        self.store = get_vector_store()
+        self.store.ensure_model(getattr(self.backend, "model_name", None), getattr(self.backend, "dim", None))
+        self.store.ensure_filter_meta()
+
+    @property
+    def pending(self):
+        """Chunks queued for the next flush."""
+        return len(self._pending)
 
+    def cache_stats(self):
+        return self.cache.stats() if self.cache else None
+
+    def _chunk_id(self, repo, chunk, chash):
+        """
+        Identity of a chunk: where it lives, what it is and what it says.
+        Unchanged chunks keep their id however the rest of the file moves
+        (chunk text carries no line numbers, see chunker._fit).
+        """
+        q = chunk.get("qualified_name") or chunk.get("name") or "file"
+        return f"{repo}:{chunk['path']}:{chunk['type']}:{q}:{chash[:16]}"
 
     def _chunk_hash(self, chunk):
         return hashlib.sha256(chunk["text"].encode()).hexdigest()
 
-    def process(self, chunks, repo_name):
-        ids, docs, metas, texts = [], [], [], []
+    def process(self, chunks, repo_name, paths=None):
+        """
+        Sync the vectors of the given files with `chunks`.
 
-        for idx, chunk in enumerate(chunks):
-            cid = self._chunk_id(repo_name, chunk, idx)
+        `paths` are the files whose chunk sets are being replaced (default:
+        every path in `chunks`, pass it explicitly for files that now yield
+        no chunks). Chunks whose id is already stored are kept as is, new
+        ones are queued for the next flush, and stored ids that no longer
+        occur are deleted. Kept chunks that moved get their line span
+        updated in place. Returns {"embedded", "kept", "deleted"} counts.
+        """
+        ids, metas, texts = [], [], []
+        seen = {}
+
+        for chunk in chunks:
             chash = self._chunk_hash(chunk)
+            cid = self._chunk_id(repo_name, chunk, chash)
+
+            # identical chunks in one file (e.g. repeated overloads) get an
+            # occurrence suffix so ids stay unique and stable
+            seen[cid] = seen.get(cid, 0) + 1
+            if seen[cid] > 1:
+                cid = f"{cid}#{seen[cid]}"
 
             ids.append(cid)
             texts.append(chunk["text"])
@@ -35,13 +104,69 @@ class EmbeddingPipeline:
                 "class": chunk.get("class"),
                 "start": chunk.get("start"),
                 "end": chunk.get("end"),
+                "parent": chunk.get("parent"),
+                "part": chunk.get("part"),
                 "hash": chash,
+                **filter_meta(chunk["path"]),
             }
 
             metas.append(meta)
 
-        if not texts:
-            return
+        if paths is None:
+            paths = {chunk["path"] for chunk in chunks}
+
+        existing = {}
+        for path in paths:
+            existing.update(self.store.file_metas(repo_name, path))
+
+        orphans = set(existing) - set(ids)
+        if orphans:
+            self.store.delete_ids(orphans)
+
+        moved = [
+            i for i, (cid, meta) in enumerate(zip(ids, clean_metas(metas)))
+            if cid in existing and any(existing[cid].get(k) != v for k, v in meta.items())
+        ]
+        if moved:
+            self.store.update_metadata([ids[i] for i in moved], [metas[i] for i in moved])
+
+        fresh = [i for i, cid in enumerate(ids) if cid not in existing]
+        for i in fresh:
+            self._pending[ids[i]] = (texts[i], metas[i])
+
+        if len(self._pending) >= self.flush_at:
+            self.flush()
+
+        return {"embedded": len(fresh), "kept": len(ids) - len(fresh), "deleted": len(orphans)}
+
+    def token_lengths(self, texts):
+        """Token count per text under the embedder's tokenizer (estimated without one)."""
+        token_lengths = getattr(self.backend, "token_lengths", None)
+        if token_lengths is not None:
+            return token_lengths(texts)
+        return approx_token_lengths(texts)
+
+    def flush(self):
+        """Embed and upsert every queued chunk. Returns how many were written."""
+        if not self._pending:
+            return 0
+
+        ids = list(self._pending)
+        texts = [self._pending[cid][0] for cid in ids]
+        metas = [self._pending[cid][1] for cid in ids]
+        self._pending = {}
+
+        lengths = self.token_lengths(texts)
+        order = sorted(range(len(ids)), key=lambda i: lengths[i])
+
+        # one call for the whole flush; the backend cuts the sorted texts
+        # into batch_size batches, so neighbours in a batch pad alike
+        embeddings = self.embedder.embed([texts[i] for i in order], batch_size=self.batch_size)
 
-        embeddings = self.embedder.embed(texts)
-        self.store.add(ids, embeddings, texts, metas)
+        self.store.upsert(
+            [ids[i] for i in order],
+            np.asarray(embeddings, dtype=np.float32),
+            [texts[i] for i in order],
+            [metas[i] for i in order],
+        )
+        return len(ids)
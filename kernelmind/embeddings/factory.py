@@ -1,13 +1,18 @@
-
-from .local_backend import LocalEmbeddingBackend
-from .cloud_backend import CloudEmbeddingBackend
-
 class EmbeddingFactory:
     @staticmethod
-    def create(backend="local"):
+    def create(backend="local", **options):
+        # imports are lazy so e.g. the onnx backend never pulls in torch
         if backend == "local":
-            return LocalEmbeddingBackend()
+            from .local_backend import LocalEmbeddingBackend
+            return LocalEmbeddingBackend(**options)
+        elif backend == "onnx":
+            from .onnx_backend import OnnxEmbeddingBackend
+            return OnnxEmbeddingBackend(**options)
+        elif backend == "multiprocess":
+            from .multiprocess_backend import MultiProcessEmbeddingBackend
+            return MultiProcessEmbeddingBackend(**options)
         elif backend == "cloud":
-            return CloudEmbeddingBackend()
+            from .cloud_backend import CloudEmbeddingBackend
+            return CloudEmbeddingBackend(**options)
         else:
             raise ValueError(f"Unknown backend: {backend}")
@@ -1,15 +1,31 @@
 from sentence_transformers import SentenceTransformer
-import torch
+import threading
+from kernelmind import config, models
 from .base import EmbeddingBackend
 
 class LocalEmbeddingBackend(EmbeddingBackend):
-    def __init__(self, model_name="BAAI/bge-base-en"):
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+    def __init__(self, model_name=config.EMBED_MODEL, batch_size=64, device=None):
+        device = models.resolve_device(device)
+        models.apply_torch_threads()
+        self.device = device
+        self.model_name = model_name
+        self.tokenizer_path = model_name
+        self.batch_size = batch_size
         self.model = SentenceTransformer(model_name, device=device)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        # fast tokenizers refuse concurrent use ("Already borrowed")
+        self._tokenizer_lock = threading.Lock()
 
-    def embed(self, texts):
+    def embed(self, texts, batch_size=None):
         return self.model.encode(
             texts,
+            batch_size=batch_size or self.batch_size,
             normalize_embeddings=True,
             show_progress_bar=False,
         )
+
+    def token_lengths(self, texts):
+        """Token count of every text under the model's own tokenizer."""
+        with self._tokenizer_lock:
+            encoded = self.model.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
@@ -0,0 +1,102 @@
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from kernelmind import config
+from kernelmind.utils.chunker import approx_token_lengths
+from .base import EmbeddingBackend
+
+# ---------------------------------
+# worker side (one model per process)
+# ---------------------------------
+
+_BACKEND = None
+
+
+def _init_worker(inner, threads, options):
+    """Pin the thread pools before the backend imports torch / onnxruntime."""
+    global _BACKEND
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    from .factory import EmbeddingFactory
+
+    if inner == "onnx":
+        options = dict(options, threads=threads)
+    _BACKEND = EmbeddingFactory.create(inner, **options)
+
+    if inner == "local":
+        import torch
+        torch.set_num_threads(threads)
+
+
+def _describe():
+    return (
+        getattr(_BACKEND, "model_name", None),
+        getattr(_BACKEND, "tokenizer_path", None),
+        getattr(_BACKEND, "dim", None),
+    )
+
+
+def _embed(texts):
+    # each shard is one batch; the worker must not split it again
+    return np.asarray(_BACKEND.embed(texts, batch_size=max(1, len(texts))), dtype=np.float32)
+
+
+# ---------------------------------
+# parent side
+# ---------------------------------
+
+class MultiProcessEmbeddingBackend(EmbeddingBackend):
+    """
+    Shards embedding batches across `workers` processes, each holding its
+    own copy of the `inner` backend with `threads` intra-op threads.
+    Results come back in input order.
+    """
+
+    def __init__(self, inner=config.EMBED_BACKEND, workers=2, threads=None,
+                 batch_size=config.EMBED_BATCH_SIZE, **options):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+
+        # spawn: never fork a parent that may already hold torch threads
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(inner, self.threads, dict(options, batch_size=batch_size)),
+        )
+        atexit.register(self.close)
+
+        # also loads the model in a first worker before ingest starts
+        self.model_name, self.tokenizer_path, self.dim = self.pool.submit(_describe).result()
+        self._tokenizer = None
+        self._tokenizer_lock = threading.Lock()
+
+    def embed(self, texts, batch_size=None):
+        texts = list(texts)
+        batch_size = batch_size or self.batch_size
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(list(self.pool.map(_embed, batches)))
+
+    def token_lengths(self, texts):
+        """Counted with the model's tokenizer loaded in this process (no model weights)."""
+        if not self.tokenizer_path:
+            return approx_token_lengths(texts)
+        with self._tokenizer_lock:
+            if self._tokenizer is None:
+                from transformers import AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_path)
+            encoded = self._tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
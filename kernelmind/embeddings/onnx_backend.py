@@ -0,0 +1,162 @@
+import os
+import re
+import json
+import threading
+
+import numpy as np
+
+from kernelmind import config
+from .base import EmbeddingBackend
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+META_FILE = "kernelmind.json"
+
+
+def model_dir(model_name, root=None):
+    return os.path.join(root or config.ONNX_DIR, re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name))
+
+
+# ============================================================
+# Export
+# ============================================================
+
+def export_onnx(model_name=config.EMBED_MODEL, out_dir=None, opset=17, log=print):
+    """
+    Export a SentenceTransformer's transformer to ONNX and quantize its
+    weights to int8 (dynamic quantization). Writes the fp32 and int8
+    graphs, the tokenizer and the pooling mode into `out_dir`.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    try:
+        import onnx  # noqa: F401 - needed by the exporter and the quantizer
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError as e:
+        raise RuntimeError(
+            f"ONNX export needs the onnx and onnxruntime packages ({e}). "
+            "Install them with: pip install onnx onnxruntime"
+        ) from e
+
+    out_dir = out_dir or model_dir(model_name)
+    os.makedirs(out_dir, exist_ok=True)
+
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0]
+    pooling = st[1].get_pooling_mode_str() if len(st) > 1 else "cls"
+    hf_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+
+    names = list(tokenizer.model_input_names)
+    sample = tokenizer(["def f(x):\n    return x"], return_tensors="pt")
+    inputs = tuple(sample[n] for n in names)
+
+    fp32 = os.path.join(out_dir, FP32_FILE)
+    log(f"Exporting {model_name} -> {fp32}")
+    with torch.no_grad():
+        torch.onnx.export(
+            hf_model,
+            inputs,
+            fp32,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                **{n: {0: "batch", 1: "sequence"} for n in names},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+        )
+
+    int8 = os.path.join(out_dir, INT8_FILE)
+    log(f"Quantizing -> {int8}")
+    quantize_dynamic(fp32, int8, weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(out_dir)
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump({
+            "model_name": model_name,
+            "pooling": pooling,
+            "max_length": transformer.max_seq_length,
+            "dim": st.get_sentence_embedding_dimension(),
+            "inputs": names,
+        }, f, indent=2)
+
+    return out_dir
+
+
+# ============================================================
+# Backend
+# ============================================================
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    CPU embeddings from an exported int8 ONNX graph (see export_onnx).
+    Same interface and normalized output as LocalEmbeddingBackend.
+    """
+
+    def __init__(self, model_name=config.EMBED_MODEL, batch_size=64,
+                 threads=config.EMBED_THREADS, path=None, quantized=True):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = path or model_dir(model_name)
+        meta_path = os.path.join(path, META_FILE)
+        if not os.path.exists(meta_path):
+            raise RuntimeError(
+                f"No exported ONNX model in {path}. Run: km export-onnx --model {model_name}"
+            )
+        with open(meta_path) as f:
+            self.meta = json.load(f)
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+
+        graph = os.path.join(path, INT8_FILE if quantized else FP32_FILE)
+        self.session = ort.InferenceSession(graph, opts, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.tokenizer_path = path
+        self._tokenizer_lock = threading.Lock()
+
+        # distinct cache namespace: int8 vectors are close to, not equal to, fp32 ones
+        self.model_name = f"{model_name}@onnx-{'int8' if quantized else 'fp32'}"
+        self.batch_size = batch_size
+        self.max_length = self.meta.get("max_length") or 512
+        self.dim = self.meta.get("dim")
+        self.inputs = [i.name for i in self.session.get_inputs()]
+
+    def _pool(self, hidden, mask):
+        if self.meta.get("pooling") == "mean":
+            mask = mask[..., None].astype(hidden.dtype)
+            return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return hidden[:, 0]
+
+    def embed(self, texts, batch_size=None):
+        texts = list(texts)
+        batch_size = batch_size or self.batch_size
+        out = []
+        for i in range(0, len(texts), batch_size):
+            with self._tokenizer_lock:
+                enc = self.tokenizer(
+                    texts[i:i + batch_size],
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length,
+                    return_tensors="np",
+                )
+            feed = {name: enc[name].astype(np.int64) for name in self.inputs}
+            hidden = self.session.run(None, feed)[0]
+            vecs = self._pool(hidden, enc["attention_mask"])
+            vecs /= np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+            out.append(vecs.astype(np.float32))
+
+        if not out:
+            return np.zeros((0, self.meta.get("dim", 0)), dtype=np.float32)
+        return np.concatenate(out)
+
+    def token_lengths(self, texts):
+        with self._tokenizer_lock:
+            encoded = self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
@@ -0,0 +1,78 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from kernelmind import models
+
+# refuse request bodies larger than this
+MAX_BODY_BYTES = 64 << 20
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive for pooled clients
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/info":
+            return self._send(404, {"error": "not found"})
+        embedder = self.server.embedder
+        self._send(200, {"model": embedder.model_name, "dim": embedder.dim})
+
+    def _read_body(self):
+        """The request body, or None (and the connection closed) if too large."""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return None
+        # always drain the body so the keep-alive stream stays in sync
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        body = self._read_body()
+        if body is None:
+            return self._send(413, {"error": "request too large"})
+        if self.path != "/embed":
+            return self._send(404, {"error": "not found"})
+
+        try:
+            req = json.loads(body)
+            texts = req["texts"]
+        except (ValueError, KeyError):
+            return self._send(400, {"error": "expected {\"model\", \"texts\"}"})
+
+        embedder = self.server.embedder
+        if req.get("model") and req["model"] != embedder.model_name:
+            return self._send(400, {"error": f"serving {embedder.model_name}, not {req['model']}"})
+
+        # one forward pass at a time; concurrent requests queue here
+        try:
+            with self.server.lock:
+                vectors = embedder.embed(texts)
+        except Exception as e:
+            # answer, so the client fails instead of retrying a dropped connection
+            return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+        self._send(200, {"embeddings": [list(map(float, v)) for v in vectors]})
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+
+def make_server(host="127.0.0.1", port=8765, backend="local", verbose=False):
+    """
+    Stand-in for a remote embedding service, serving the protocol
+    CloudEmbeddingBackend speaks from a local backend.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.embedder = models.get_embedder(backend)
+    server.lock = threading.Lock()
+    server.verbose = verbose
+    return server
@@ -1,4 +1,7 @@
 import os
+import re
+import json
+import hashlib
 
 EXCLUDE_DIRS = {
     "node_modules",
@@ -21,39 +24,306 @@ EXCLUDE_DIRS = {
     "__snapshots__",
     "target",        # Rust
     "bin", "obj",    # C/C++
+    "vendor", "third_party",
 }
 
-EXCLUDE_FILE_PATTERNS = {
+EXCLUDE_FILE_PATTERNS = (
     ".min.js",
     ".map",
     ".lock",
     ".snap",
     ".log",
-}
+    ".bundle.js",
+    ".pb.go",
+    "_pb2.py",
+    "package-lock.json",
+)
 
 INCLUDE_DIRS = {".py", ".js", ".ts", ".java", ".go", ".json", ".yaml", ".yml", ".toml", ".md"}
 
+IGNORE_FILES = (".gitignore", ".kmignore")
+
+# files above this are almost always bundles, fixtures or generated data
+MAX_FILE_BYTES = 1024 * 1024
+
+# how much of a file is sniffed for binary / generated markers
+SNIFF_BYTES = 8192
+
+# conventional generated-file headers, looked for in the first lines only:
+# "@generated", Go's "Code generated ... DO NOT EDIT." and "autogenerated"
+GENERATED_MARKERS = re.compile(
+    rb"@generated\b|\bcode generated\b.*\bdo not edit\.|\bauto-?generated\b",
+    re.IGNORECASE,
+)
+GENERATED_HEADER_LINES = 5
+
+# average line length above this in the sniffed head means minified
+MINIFIED_LINE_LENGTH = 400
+
+
 def should_ignore(dirname):
     return dirname in EXCLUDE_DIRS
 def should_include(filename):
     _, ext = os.path.splitext(filename)
     return ext in INCLUDE_DIRS
 def should_exclude_file(filename):
-    for pat in EXCLUDE_FILE_PATTERNS:
-        if filename.endswith(pat):
-            return True
+    return filename.endswith(EXCLUDE_FILE_PATTERNS)
+
+
+def sha256_of_source(path):
+    """Same hash the parsers store: sha256 of the utf-8 decoded source."""
+    with open(path, "r", encoding="utf-8") as f:
+        src = f.read()
+    return hashlib.sha256(src.encode()).hexdigest()
+
+
+# ============================================================
+# .gitignore / .kmignore
+# ============================================================
+
+def _glob_to_regex(glob):
+    out = []
+    i = 0
+    while i < len(glob):
+        c = glob[i]
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if glob.startswith("/**", i) and i + 3 == len(glob):
+            out.append("/.*")
+            i += 3
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = glob.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = glob[i + 1:end]
+                # gitignore negates a class with "!", regex with "^"
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """
+    Ordered gitignore rules collected from every ignore file on the way
+    down the tree. Later rules win, `!` re-includes, a trailing `/`
+    matches directories only, and patterns without a slash match the
+    basename at any depth below the file that declared them.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = rules or []
+
+    def extended(self, dir_abs, dir_rel):
+        rules = list(self.rules)
+        for name in IGNORE_FILES:
+            path = os.path.join(dir_abs, name)
+            if not os.path.isfile(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                rule = self._compile(line, dir_rel)
+                if rule:
+                    rules.append(rule)
+        if len(rules) == len(self.rules):
+            return self
+        return IgnoreRules(rules)
+
+    @staticmethod
+    def _compile(line, base):
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        if line.startswith("\\"):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/") if dir_only else line
+        # a leading or inner slash anchors; judged before any slash is stripped
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if not line:
+            return None
+
+        regex = re.compile(_glob_to_regex(line) + "$")
+        return (base, regex, negate, dir_only, anchored)
+
+    def ignored(self, rel_path, is_dir):
+        result = False
+        for base, regex, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel_path.startswith(base + "/"):
+                    continue
+                target = rel_path[len(base) + 1:]
+            else:
+                target = rel_path
+            if not anchored:
+                target = target.rsplit("/", 1)[-1]
+            if regex.match(target):
+                result = not negate
+        return result
+
+
+# ============================================================
+# Content checks
+# ============================================================
+
+def is_binary_or_generated(path):
+    """Sniff the head of a file for NUL bytes, generated markers or minification."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return True
+
+    if b"\0" in head:
+        return True
+
+    header = head.split(b"\n", GENERATED_HEADER_LINES)[:GENERATED_HEADER_LINES]
+    if any(GENERATED_MARKERS.search(line) for line in header):
+        return True
+
+    lines = head.count(b"\n") + 1
+    if len(head) >= SNIFF_BYTES and len(head) / lines > MINIFIED_LINE_LENGTH:
+        return True
+
     return False
 
 
-def crawl_repo(root_path):
-    collected = []
-    for current_root, dirs, files in os.walk(root_path):
-        dirs[:] = [d for d in dirs if not should_ignore(d)]
-        for file in files:
-            if should_exclude_file(file):
+# ============================================================
+# Manifest of (path, size, mtime, hash)
+# ============================================================
+
+def load_manifest(manifest_path):
+    if not manifest_path or not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest_path, entries):
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+    os.replace(tmp, manifest_path)
+
+
+# ============================================================
+# Crawl
+# ============================================================
+
+def _walk(root_path, max_bytes):
+    """Yield (absolute path, relative path, stat) for candidate files."""
+    stack = [(root_path, "", IgnoreRules().extended(root_path, ""))]
+
+    while stack:
+        dir_abs, dir_rel, rules = stack.pop()
+        try:
+            entries = list(os.scandir(dir_abs))
+        except OSError:
+            continue
+
+        for entry in entries:
+            rel = f"{dir_rel}/{entry.name}" if dir_rel else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if should_ignore(entry.name) or rules.ignored(rel, True):
+                        continue
+                    stack.append((entry.path, rel, rules.extended(entry.path, rel)))
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+            except OSError:
+                continue
+
+            if should_exclude_file(entry.name) or not should_include(entry.name):
+                continue
+            if rules.ignored(rel, False):
+                continue
+
+            st = entry.stat(follow_symlinks=False)
+            if st.st_size > max_bytes:
                 continue
-            if should_include(file):
-                full_path = os.path.join(current_root, file)
-                collected.append(full_path)
-    return collected
 
+            yield entry.path, rel, st
+
+
+def scan_repo(root_path, manifest_path=None, max_bytes=MAX_FILE_BYTES):
+    """
+    Crawl a repo and diff it against the previous manifest.
+
+    Files whose (size, mtime) match the manifest reuse the stored hash and
+    are not read at all. Returns a dict with:
+      - files   : absolute paths of every file kept
+      - hashes  : relative path -> sha256 (same hash the parsers store)
+      - added / changed / removed : relative paths vs. the last manifest
+    """
+    previous = load_manifest(manifest_path)
+    current = {}
+    files = []
+    added, changed = [], []
+
+    for path, rel, st in _walk(root_path, max_bytes):
+        old = previous.get(rel)
+        if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime_ns:
+            current[rel] = old
+            files.append(path)
+            continue
+
+        if is_binary_or_generated(path):
+            continue
+        try:
+            digest = sha256_of_source(path)
+        except (OSError, UnicodeDecodeError):
+            continue
+
+        current[rel] = {"size": st.st_size, "mtime": st.st_mtime_ns, "hash": digest}
+        files.append(path)
+
+        if old is None:
+            added.append(rel)
+        elif old["hash"] != digest:
+            changed.append(rel)
+
+    removed = sorted(p for p in previous if p not in current)
+
+    if manifest_path:
+        save_manifest(manifest_path, current)
+
+    return {
+        "files": sorted(files),
+        "hashes": {rel: e["hash"] for rel, e in current.items()},
+        "added": sorted(added),
+        "changed": sorted(changed),
+        "removed": removed,
+    }
+
+
+def crawl_repo(root_path, manifest_path=None):
+    return scan_repo(root_path, manifest_path)["files"]
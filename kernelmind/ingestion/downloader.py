@@ -1,34 +1,140 @@
 import os
-import requests
+import re
+import json
+import time
+import shutil
 import zipfile
-import io
-from datetime import datetime
+import requests
+
+from kernelmind import config
+
+CACHE_FILE = ".cache.json"
+ARCHIVE_DIR = ".archives"
+CHUNK_SIZE = 1024 * 1024
 
 def repo_to_zip_url(repo_url, branch="master"):
     if repo_url.endswith("/"):
         repo_url = repo_url[:-1]
     return repo_url + f"/archive/refs/heads/{branch}.zip"
 
-def download_and_extract(repo_url, base_dir="repos", branch="master"):
+def cache_key(repo_url, branch):
+    parts = repo_url.rstrip("/").split("/")
+    return f"{'/'.join(parts[-2:])}@{branch}"
+
+def _safe(part):
+    """One path segment: branch names like feature/x must not nest directories."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", part).strip(".") or "_"
+
+def tree_name(repo_url, branch):
+    """<owner>__<repo>-<branch>, so forks with the same repo name never share a tree."""
+    owner, repo = repo_url.rstrip("/").split("/")[-2:]
+    return f"{_safe(owner)}__{_safe(repo)}-{_safe(branch)}"
+
+def load_cache(base_dir):
+    path = os.path.join(base_dir, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(base_dir, cache):
+    path = os.path.join(base_dir, CACHE_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def stream_to_file(response, dest):
+    """Write a streamed response to disk in CHUNK_SIZE pieces."""
+    tmp = dest + ".part"
+    with open(tmp, "wb") as f:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if chunk:
+                f.write(chunk)
+    os.replace(tmp, dest)
+    return dest
+
+def extract_archive(zip_path, target_dir):
+    """
+    Extract straight from the archive on disk into target_dir.
+    GitHub archives wrap everything in one top-level folder, which is
+    flattened away. File mtimes are taken from the archive entries so
+    unchanged files keep stable stat info across re-extracts.
+    """
+    staging = target_dir + ".extracting"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    with zipfile.ZipFile(zip_path) as z:
+        for info in z.infolist():
+            out = z.extract(info, staging)
+            if not info.is_dir():
+                ts = time.mktime(info.date_time + (0, 0, -1))
+                os.utime(out, (ts, ts))
+
+    root = staging
+    entries = os.listdir(staging)
+    if len(entries) == 1 and os.path.isdir(os.path.join(staging, entries[0])):
+        root = os.path.join(staging, entries[0])
+
+    shutil.rmtree(target_dir, ignore_errors=True)
+    os.replace(root, target_dir)
+    shutil.rmtree(staging, ignore_errors=True)
+    return target_dir
+
+def download_and_extract(repo_url, base_dir=None, branch="master"):
+    """
+    Download a GitHub archive and extract it to
+    base_dir/<owner>__<repo>-<branch> (see tree_name), base_dir being
+    KERNELMIND_REPOS by default.
+
+    The download is streamed to disk, never held in memory. Each
+    (repo, branch) keeps its ETag in base_dir/.cache.json; when GitHub
+    answers 304 Not Modified the existing tree is reused as-is.
+    """
+    base_dir = os.path.abspath(base_dir or config.REPOS_DIR)
     os.makedirs(base_dir, exist_ok=True)
-    repo_name=repo_url.rstrip("/").split("/")[-1]
-    timestamp= datetime.now().strftime("%Y%m%d_%H%M%S")
+    name = tree_name(repo_url, branch)
+    target_dir = os.path.join(base_dir, name)
+
+    key = cache_key(repo_url, branch)
+    cache = load_cache(base_dir)
+    entry = cache.get(key, {})
+
+    headers = {}
+    if entry.get("etag") and os.path.isdir(target_dir):
+        headers["If-None-Match"] = entry["etag"]
 
-    target_dir = os.path.join(base_dir, f"{repo_name}{timestamp}")
     zip_url = repo_to_zip_url(repo_url, branch)
     print(f"[INFO]: downloading from: {zip_url}")
-    response = requests.get(zip_url)
-    response.raise_for_status()
 
-    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-        z.extractall(target_dir)
-        entries = os.listdir(target_dir)
-        if len(entries) == 1:
-            single=os.path.join(target_dir, entries[0])
-            if os.path.isdir(single):
-                return single
+    with requests.get(zip_url, headers=headers, stream=True) as response:
+        if response.status_code == 304:
+            print(f"[CACHE]: {key} unchanged, reusing {target_dir}")
+            return target_dir
+        response.raise_for_status()
+
+        archive_dir = os.path.join(base_dir, ARCHIVE_DIR)
+        os.makedirs(archive_dir, exist_ok=True)
+        zip_path = os.path.join(archive_dir, f"{name}.zip")
+        stream_to_file(response, zip_path)
+        etag = response.headers.get("ETag")
+
+    extract_archive(zip_path, target_dir)
+    os.remove(zip_path)
+
+    cache[key] = {
+        "url": repo_url,
+        "branch": branch,
+        "etag": etag,
+        # codeload ETags are the quoted commit sha of the archive
+        "commit": (etag or "").strip('W/"') or None,
+        "path": target_dir,
+        "downloaded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    save_cache(base_dir, cache)
 
     print(f"[SUCCESS]: extracted to {target_dir}")
     return target_dir
-    
-
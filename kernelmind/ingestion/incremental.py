@@ -0,0 +1,65 @@
+import os
+
+from kernelmind.ingestion.crawler import sha256_of_source
+from kernelmind.metadata_store.factory import get_store
+
+
+def load_indexed_hashes(repo_name):
+    """Map of logical path -> stored hash for every code and config file."""
+    return get_store().file_hashes(repo_name)
+
+
+def diff_files(files, repo_root, known, hashes=None):
+    """
+    Split crawled files against the stored hashes.
+
+    `hashes` (relative path -> sha256, e.g. from scan_repo) avoids reading
+    files again; anything missing from it is hashed from disk.
+
+    Returns a dict with:
+      - added     : absolute paths not yet indexed
+      - changed   : absolute paths whose hash differs
+      - unchanged : absolute paths with an identical hash
+      - deleted   : logical paths indexed but no longer on disk
+    """
+    plan = {"added": [], "changed": [], "unchanged": [], "deleted": []}
+    seen = set()
+
+    for f in files:
+        logical = os.path.relpath(f, repo_root)
+        seen.add(logical)
+
+        if logical not in known:
+            plan["added"].append(f)
+            continue
+
+        current = (hashes or {}).get(logical)
+        if current is None:
+            try:
+                current = sha256_of_source(f)
+            except (OSError, UnicodeDecodeError):
+                plan["changed"].append(f)
+                continue
+
+        if current == known[logical]:
+            plan["unchanged"].append(f)
+        else:
+            plan["changed"].append(f)
+
+    plan["deleted"] = sorted(p for p in known if p not in seen)
+    return plan
+
+
+def purge_files(repo_name, paths, store=None):
+    """Remove every metadata record and vector belonging to the given files."""
+    if not paths:
+        return 0
+
+    paths = list(paths)
+    get_store().delete_files(repo_name, paths)
+
+    if store is not None:
+        for p in paths:
+            store.delete_file(repo_name, p)
+
+    return len(paths)
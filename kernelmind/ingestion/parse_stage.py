@@ -0,0 +1,99 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from kernelmind.parsers.python_parser import parse_python
+from kernelmind.parsers.js_parser import parse_javascript, parse_javascript_batch
+from kernelmind.parsers.json_parser import parse_json
+from kernelmind.parsers.yaml_parser import parse_yaml
+
+# extension -> (label, kind, parser)
+PARSERS = {
+    ".py":   ("PY", "code", parse_python),
+    ".js":   ("JS", "code", parse_javascript),
+    ".jsx":  ("JS", "code", parse_javascript),
+    ".ts":   ("TS", "code", parse_javascript),
+    ".tsx":  ("TS", "code", parse_javascript),
+    ".json": ("JSON", "config", parse_json),
+    ".yaml": ("YAML", "config", parse_yaml),
+    ".yml":  ("YAML", "config", parse_yaml),
+}
+
+# files handed to a worker per task; keeps IPC overhead per file small
+TASK_SIZE = 16
+
+# tasks in flight per worker; bounds how many parsed results can pile up
+# when the consumer is slower than the pool
+TASKS_PER_WORKER = 4
+
+
+def parser_for(path):
+    _, ext = os.path.splitext(path)
+    return PARSERS.get(ext)
+
+
+def parse_file(path):
+    """Parse one file. Returns (path, label, kind, parsed)."""
+    label, kind, parser = parser_for(path)
+    return path, label, kind, parser(path)
+
+
+def _parse_batch(paths):
+    """
+    Parse a batch of files. JS/TS files go to the Node worker as a single
+    request; everything else is parsed in-process. Input order is kept.
+    """
+    js_paths = [p for p in paths if parser_for(p)[2] is parse_javascript]
+    js_results = dict(zip(js_paths, parse_javascript_batch(js_paths)))
+
+    out = []
+    for p in paths:
+        label, kind, parser = parser_for(p)
+        if p in js_results:
+            out.append((p, label, kind, js_results[p]))
+        else:
+            out.append((p, label, kind, parser(p)))
+    return out
+
+
+def parse_files(paths, workers=1):
+    """
+    Yield (path, label, kind, parsed) for every parseable path.
+
+    With workers <= 1 files are parsed in-process in input order.
+    Otherwise they are fanned out to a process pool in TASK_SIZE batches
+    and yielded as each batch completes, so the caller can store results
+    while the rest of the repo is still being parsed. Only
+    workers * TASKS_PER_WORKER batches are in flight at once, so memory
+    stays flat however large the repo is. Every pool process
+    keeps its own Node worker, which gives a pool of JS parsers for free.
+    """
+    paths = [p for p in paths if parser_for(p)]
+    batches = [paths[i:i + TASK_SIZE] for i in range(0, len(paths), TASK_SIZE)]
+
+    if workers <= 1:
+        for b in batches:
+            for result in _parse_batch(b):
+                yield result
+        return
+
+    pending = iter(batches)
+    window = workers * TASKS_PER_WORKER
+
+    # spawn, not fork: by now the parent runs stage threads and may hold
+    # torch / tokenizer state that is not fork-safe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = set()
+        for b in pending:
+            in_flight.add(pool.submit(_parse_batch, b))
+            if len(in_flight) >= window:
+                break
+
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                for result in fut.result():
+                    yield result
+                nxt = next(pending, None)
+                if nxt is not None:
+                    in_flight.add(pool.submit(_parse_batch, nxt))
@@ -0,0 +1,261 @@
+import os
+import queue
+import threading
+
+from kernelmind.ingestion.crawler import scan_repo
+from kernelmind.ingestion.incremental import load_indexed_hashes, diff_files, purge_files
+from kernelmind.ingestion.parse_stage import PARSERS, parse_files
+
+from kernelmind.metadata_store.base import normalize_keys, BULK_BATCH
+from kernelmind.metadata_store.factory import get_store
+from kernelmind.utils.context_builder import iter_context_packs
+from kernelmind.utils.chunker import build_text_chunks
+from kernelmind.utils.config_chunker import build_config_chunks
+from kernelmind.embeddings.embedding_pipeline import EmbeddingPipeline
+
+PARSEABLE_EXTS = tuple(PARSERS)
+
+# bound on parsed files / chunk groups waiting between stages
+QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+# ============================================================
+# 1. PLAN: crawl + incremental diff + purge of stale files
+# ============================================================
+
+def plan_ingest(path, repo_name, full=False, store=None, log=print):
+    """
+    Crawl the tree, diff it against what is indexed and purge stale
+    records. Returns the absolute paths that still need to be ingested.
+    """
+    manifest = os.path.join(os.path.dirname(path), ".manifests", f"{repo_name}.json")
+    scan = scan_repo(path, manifest_path=manifest)
+    log(
+        f"Scan: {len(scan['added'])} new, {len(scan['changed'])} modified, "
+        f"{len(scan['removed'])} removed since last crawl"
+    )
+    files = [f for f in scan["files"] if f.endswith(PARSEABLE_EXTS)]
+
+    known = load_indexed_hashes(repo_name)
+    plan = diff_files(files, path, {} if full else known, hashes=scan["hashes"])
+    if full:
+        on_disk = {os.path.relpath(f, path) for f in files}
+        plan["deleted"] = sorted(p for p in known if p not in on_disk)
+
+    log(
+        f"{len(plan['added'])} added, {len(plan['changed'])} changed, "
+        f"{len(plan['unchanged'])} unchanged, {len(plan['deleted'])} deleted"
+    )
+
+    # deleted files lose their records + vectors; changed files only lose
+    # their records, their vectors are diffed chunk by chunk on re-embed
+    if full:
+        purge_files(repo_name, sorted(known), store=store)
+    else:
+        purge_files(repo_name, plan["deleted"], store=store)
+        purge_files(repo_name, [os.path.relpath(f, path) for f in plan["changed"]])
+
+    return plan["added"] + plan["changed"]
+
+
+# ============================================================
+# 2. STAGES
+# ============================================================
+
+def _code_pack(parsed, logical, repo_name):
+    """Context pack built from the parser output, no store round trip."""
+    file_doc = dict(parsed["file"], path=logical)
+    if "source" in parsed:
+        file_doc["source"] = parsed["source"]
+    return {
+        "file": file_doc,
+        "repo": repo_name,
+        "imports": parsed.get("imports", []),
+        "functions": parsed.get("functions", []),
+        "classes": parsed.get("classes", []),
+        "methods": parsed.get("methods", []),
+    }
+
+
+def _config_doc(parsed, logical):
+    return {"file": logical, "tree": normalize_keys(parsed.get("tree"))}
+
+
+class _Stage(threading.Thread):
+    """Runs fn(); always signals _DONE downstream (if any) and keeps any error."""
+
+    def __init__(self, name, fn, out_q):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.out_q = out_q
+        self.error = None
+
+    def run(self):
+        try:
+            self.fn()
+        except BaseException as e:
+            self.error = e
+        finally:
+            if self.out_q is not None:
+                self.out_q.put(_DONE)
+
+
+def run_pipeline(files, repo_root, repo_name, workers=1, pipeline=None,
+                 queue_size=QUEUE_SIZE, store_batch=BULK_BATCH, log=print):
+    """
+    Stream files through parse -> chunk -> embed -> store.
+
+    Parsing runs in a process pool fed from its own thread, chunking runs
+    in a second thread, and embedding runs on the calling thread in
+    cross-file batches (see EmbeddingPipeline.flush). Metadata - and with
+    it the file hash the next incremental run trusts - is written by a
+    third thread (store_batch files per bulk round trip), and only for
+    files whose vectors have all been flushed, so an interrupted ingest
+    never leaves a file marked unchanged without its vectors. Stages are
+    joined by bounded queues, so a slow embedder back-pressures parsing
+    instead of letting parsed files pile up.
+    """
+    pipeline = pipeline or EmbeddingPipeline()
+    parsed_q = queue.Queue(maxsize=queue_size)
+    chunk_q = queue.Queue(maxsize=queue_size)
+    # unbounded: the embed loop must never block on a failed writer
+    save_q = queue.Queue()
+    stats = {"files": 0, "chunks": 0, "embedded": 0, "deleted": 0}
+
+    def parse():
+        for item in parse_files(files, workers=workers):
+            parsed_q.put(item)
+
+    def chunk():
+        while True:
+            item = parsed_q.get()
+            if item is _DONE:
+                break
+            f, label, kind, parsed = item
+            log(f"[{label}] {f}")
+
+            logical = os.path.relpath(f, repo_root)
+            if kind == "code":
+                chunks = build_text_chunks(
+                    _code_pack(parsed, logical, repo_name), repo_root=repo_root,
+                    token_lengths=pipeline.token_lengths,
+                )
+            else:
+                chunks = build_config_chunks(_config_doc(parsed, logical), repo=repo_name)
+
+            stats["files"] += 1
+            # even an empty chunk list goes through, so a file that no
+            # longer yields chunks drops its old vectors
+            chunk_q.put((logical, kind, chunks, parsed))
+
+    def store():
+        meta = get_store()
+        pending = []
+        while True:
+            items = save_q.get()
+            if items is _DONE:
+                break
+            pending.extend(items)
+            while len(pending) >= store_batch:
+                meta.save_batch(pending[:store_batch], repo_name, repo_root=repo_root)
+                pending = pending[store_batch:]
+        if pending:
+            meta.save_batch(pending, repo_name, repo_root=repo_root)
+
+    parser = _Stage("km-parse", parse, parsed_q)
+    chunker = _Stage("km-chunk", chunk, chunk_q)
+    storer = _Stage("km-store", store, None)
+    parser.start()
+    chunker.start()
+    storer.start()
+
+    # files whose chunks are queued but not yet flushed to the vector store
+    unflushed = []
+    try:
+        while True:
+            item = chunk_q.get()
+            if item is _DONE:
+                break
+            logical, kind, chunks, parsed = item
+            synced = pipeline.process(chunks, repo_name, paths=[logical])
+            log(
+                f"Queued {synced['embedded']} {kind} chunks from {logical} "
+                f"({synced['kept']} unchanged, {synced['deleted']} removed)"
+            )
+            stats["chunks"] += len(chunks)
+            stats["embedded"] += synced["embedded"]
+            stats["deleted"] += synced["deleted"]
+
+            unflushed.append((kind, parsed))
+            if not pipeline.pending:
+                save_q.put(unflushed)
+                unflushed = []
+
+        # the last, partially filled embedding batch
+        pipeline.flush()
+        save_q.put(unflushed)
+    finally:
+        # files flushed before an error still get their records
+        save_q.put(_DONE)
+        storer.join()
+
+    if storer.error is not None:
+        raise storer.error
+    # a failed chunk stage can leave the parse thread blocked on a full
+    # queue, so surface its error before waiting on the parser
+    chunker.join()
+    if chunker.error is not None:
+        raise chunker.error
+    parser.join()
+    if parser.error is not None:
+        raise parser.error
+
+    cache = pipeline.cache_stats()
+    if cache:
+        stats["cache"] = cache
+        log(
+            f"Embedding cache: {cache['hits']} hits, {cache['misses']} misses "
+            f"({cache['hit_rate']:.0%} hit rate)"
+        )
+
+    return stats
+
+
+# ============================================================
+# 3. ENTRY POINT
+# ============================================================
+
+def ingest_repo(path, repo_name, workers=1, full=False, embed_workers=1, log=print):
+    """Plan, purge and stream a repository into the metadata + vector stores."""
+    pipeline = EmbeddingPipeline(workers=embed_workers)
+    files = plan_ingest(path, repo_name, full=full, store=pipeline.store, log=log)
+    return run_pipeline(files, path, repo_name, workers=workers, pipeline=pipeline, log=log)
+
+
+def reembed_repo(repo_name, repo_root, log=print):
+    """
+    Rebuild every vector of an indexed repo from the metadata already
+    stored, without re-parsing. Context packs are streamed in batches.
+    """
+    pipeline = EmbeddingPipeline()
+    pipeline.store.delete_repo(repo_name)
+    total = 0
+
+    for logical, pack in iter_context_packs(repo_name):
+        chunks = build_text_chunks(pack, repo_root=repo_root, token_lengths=pipeline.token_lengths)
+        if chunks:
+            log(f"Embedding {len(chunks)} code chunks from {logical}")
+            pipeline.process(chunks, repo_name)
+            total += len(chunks)
+
+    for config_doc in get_store().configs(repo_name):
+        chunks = build_config_chunks(config_doc, repo=repo_name)
+        if chunks:
+            log(f"Embedding {len(chunks)} config chunks from {config_doc['file']}")
+            pipeline.process(chunks, repo_name)
+            total += len(chunks)
+
+    pipeline.flush()
+    return total
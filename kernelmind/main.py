@@ -1,17 +1,7 @@
 import os
 from kernelmind.ingestion.downloader import download_and_extract
-from kernelmind.ingestion.crawler import crawl_repo
-
-from kernelmind.parsers.python_parser import parse_python
-from kernelmind.parsers.js_parser import parse_javascript
-from kernelmind.parsers.json_parser import parse_json
-from kernelmind.parsers.yaml_parser import parse_yaml
-
-
-from kernelmind.utils.mongo_store import save_parsed_output
-from kernelmind.utils.context_builder import build_context_pack
-from kernelmind.utils.chunker import build_text_chunks
-from kernelmind.embeddings.embedding_pipeline import EmbeddingPipeline
+from kernelmind.ingestion.pipeline import ingest_repo
+from kernelmind.metadata_store.factory import get_store
 from kernelmind.search import search
 
 
@@ -41,88 +31,16 @@ if __name__ == "__main__":
     print(f"Repo name    : {repo_name}\n")
 
     # ----------------------------------
-    # 3. Crawl files
-    # ----------------------------------
-    files = crawl_repo(path)
-    print(f"Found {len(files)} total files.\n")
-
-    # Split by language
-    py_files  = [f for f in files if f.endswith(".py")]
-    js_files  = [f for f in files if f.endswith((".js", ".jsx"))]
-    ts_files  = [f for f in files if f.endswith((".ts", ".tsx"))]
-    json_files = [f for f in files if f.endswith(".json")]
-    yaml_files = [f for f in files if f.endswith((".yaml", ".yml"))]
-
-
-    print(f"{len(py_files)} Python files")
-    print(f"{len(js_files)} JavaScript files")
-    print(f"{len(ts_files)} TypeScript files\n")
-    print(f"{len(json_files)} JSON files")
-    print(f"{len(yaml_files)} YAML files\n")
-
-
-    # ----------------------------------
-    # 4. Parse & store AST
-    # ----------------------------------
-    print("Parsing files...\n")
-
-    # Python
-    for f in py_files:
-        print(f"[PY] {f}")
-        parsed = parse_python(f)
-        save_parsed_output(parsed, repo_name, repo_root=path)
-
-    # JS
-    for f in js_files:
-        print(f"[JS] {f}")
-        parsed = parse_javascript(f)
-        save_parsed_output(parsed, repo_name, repo_root=path)
-
-    # TS
-    for f in ts_files:
-        print(f"[TS] {f}")
-        parsed = parse_javascript(f)   # same parser handles TS
-        save_parsed_output(parsed, repo_name, repo_root=path)
-    
-    # JSON
-    for f in json_files:
-        print(f"[JSON] {f}")
-        parsed = parse_json(f)
-        save_parsed_output(parsed, repo_name, repo_root=path)
-
-    # YAML
-    for f in yaml_files:
-        print(f"[YAML] {f}")
-        parsed = parse_yaml(f)
-        save_parsed_output(parsed, repo_name, repo_root=path)
-
-
-    # ----------------------------------
-    # 5. Embedding pipeline
+    # 3. Crawl, parse, store, chunk + embed (streamed)
     # ----------------------------------
-    pipeline = EmbeddingPipeline(backend="local")
-
-    # ----------------------------------
-    # 6. Chunk + embed ALL code files
-    # ----------------------------------
-    total_chunks = 0
-
-    all_code_files = py_files + js_files + ts_files + json_files + yaml_files
-
-    for f in all_code_files:
-        logical_path = f.replace(path + "/", "")
-        pack = build_context_pack(logical_path, repo_name)
-
-        chunks = build_text_chunks(pack, repo_root=path)
-        if chunks:
-            print(f"Embedding {len(chunks)} chunks from {logical_path}")
-            pipeline.process(chunks, repo_name)
-            total_chunks += len(chunks)
+    stats = ingest_repo(path, repo_name, workers=os.cpu_count() or 1)
+    total_chunks = stats["chunks"]
+    get_store().record_repo(repo_name, url=repo_url, branch="master", path=os.path.abspath(path))
 
     print(f"\nDONE. Embedded {total_chunks} chunks for repo '{repo_name}'.\n")
 
     # ----------------------------------
-    # 7. Search session
+    # 4. Search session
     # ----------------------------------
     print("Search is ready. Type queries below (exit to quit).\n")
 
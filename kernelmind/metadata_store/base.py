@@ -0,0 +1,203 @@
+import os
+from datetime import datetime
+from copy import deepcopy
+
+from kernelmind.utils.blob_store import get_blob_store
+
+# files per bulk round trip / transaction when saving a batch
+BULK_BATCH = 500
+
+# collection -> field holding the file path
+SYMBOL_COLLECTIONS = {
+    "imports": "file",
+    "functions": "path",
+    "classes": "path",
+    "methods": "path",
+}
+
+# collection -> compound indexes every lookup/delete path relies on
+INDEXES = {
+    "files":     [("repo", "path")],
+    "imports":   [("repo", "file")],
+    "functions": [("repo", "path"), ("repo", "qualified_name"), ("repo", "name")],
+    "classes":   [("repo", "path"), ("repo", "qualified_name"), ("repo", "name")],
+    "methods":   [("repo", "path"), ("repo", "qualified_name"), ("repo", "name")],
+    "configs":   [("repo", "file")],
+    "repos":     [("repo",)],
+}
+
+# every collection holding per-repo records
+COLLECTIONS = ("files", "imports", "functions", "classes", "methods", "configs", "repos")
+
+
+def normalize_keys(obj):
+    """Recursively ensure all dict keys are strings."""
+    if isinstance(obj, dict):
+        new = {}
+        for k, v in obj.items():
+            key = str(k)
+            new[key] = normalize_keys(v)
+        return new
+    elif isinstance(obj, list):
+        return [normalize_keys(i) for i in obj]
+    else:
+        return obj
+
+
+# ============================================================
+# Documents stored per parsed file (shared by every backend)
+# ============================================================
+
+def build_code_docs(parsed, repo_name, repo_root=None):
+    """
+    Turn one parser result into the documents stored for it.
+    Returns (file_doc, {collection: [docs]}).
+
+    Source text goes to the blob store under the file hash; documents
+    only keep the hash and line spans.
+    """
+    file_doc = parsed["file"].copy()
+    file_doc.pop("source", None)
+
+    if parsed.get("source") is not None:
+        get_blob_store().put(parsed["source"], file_doc["hash"])
+
+    # Normalize file path
+    if repo_root:
+        file_doc["path"] = os.path.relpath(file_doc["path"], repo_root)
+
+    now = datetime.utcnow()
+    file_doc.update({
+        "repo": repo_name,
+        "created_at": now,
+        "type": "code"
+    })
+
+    docs = {name: [] for name in SYMBOL_COLLECTIONS}
+
+    for imp in parsed.get("imports", []):
+        docs["imports"].append({
+            "file": file_doc["path"],
+            "repo": repo_name,
+            "import": imp,
+            "hash": file_doc["hash"],
+            "created_at": now,
+        })
+
+    for name in ("functions", "classes", "methods"):
+        for item in parsed.get(name, []):
+            doc = deepcopy(item)
+            doc.pop("code", None)
+            doc.update({
+                "path": file_doc["path"],
+                "repo": repo_name,
+                "hash": file_doc["hash"],
+                "created_at": now,
+            })
+            docs[name].append(doc)
+
+    return file_doc, docs
+
+
+def build_config_doc(parsed, repo_name, repo_root=None):
+    path = parsed["file"]["path"]
+    if repo_root:
+        path = os.path.relpath(path, repo_root)
+
+    if parsed["file"].get("source") is not None:
+        get_blob_store().put(parsed["file"]["source"], parsed["file"]["hash"])
+
+    # ---- FIX: Normalize everything ----
+    return {
+        "file": path,
+        "repo": repo_name,
+        "hash": parsed["file"]["hash"],
+        "created_at": datetime.utcnow(),
+        "type": parsed.get("type"),
+        "keys": [str(k) for k in parsed.get("keys", [])],
+        "paths": [str(p) for p in parsed.get("paths", [])],
+        "tree": normalize_keys(parsed.get("tree")),   # <---- normalized!
+    }
+
+
+def split_batch(items, repo_name, repo_root=None):
+    """
+    Build every document for a batch of (kind, parsed) items.
+    Returns (file_docs, {collection: [docs]}, config_docs).
+    """
+    file_docs, config_docs = [], []
+    symbol_docs = {name: [] for name in SYMBOL_COLLECTIONS}
+
+    for kind, parsed in items:
+        if kind == "code":
+            file_doc, docs = build_code_docs(parsed, repo_name, repo_root)
+            file_docs.append(file_doc)
+            for name, batch in docs.items():
+                symbol_docs[name].extend(batch)
+        else:
+            config_docs.append(build_config_doc(parsed, repo_name, repo_root))
+
+    return file_docs, symbol_docs, config_docs
+
+
+# ============================================================
+# Interface
+# ============================================================
+
+class MetadataStore:
+    """
+    Files, imports, functions, classes, methods and configs for every
+    indexed repo. Paths are always repo-relative.
+    """
+
+    def save_batch(self, items, repo_name, repo_root=None):
+        """Replace the records of every (kind, parsed) file; returns their paths."""
+        raise NotImplementedError
+
+    def file_hashes(self, repo_name):
+        """{path: hash} for every code and config file of a repo."""
+        raise NotImplementedError
+
+    def delete_files(self, repo_name, paths):
+        raise NotImplementedError
+
+    def file_paths(self, repo_name):
+        """Iterate code file paths of a repo in sorted order."""
+        raise NotImplementedError
+
+    def context_packs(self, repo_name, paths):
+        """{path: pack} for every given path that has a file record."""
+        raise NotImplementedError
+
+    def configs(self, repo_name):
+        """Iterate every config document of a repo."""
+        raise NotImplementedError
+
+    # ---- repo lifecycle ----
+
+    def record_repo(self, repo_name, **info):
+        """Upsert the registry entry of a repo (url, branch, path, ...), stamped ingested_at."""
+        raise NotImplementedError
+
+    def repo_infos(self):
+        """{repo: {"files", "configs", "ingested_at", **registry info}} for every known repo."""
+        raise NotImplementedError
+
+    def drop_repo(self, repo_name):
+        """Delete every record of a repo from every collection."""
+        raise NotImplementedError
+
+    def referenced_hashes(self):
+        """Set of every file hash still referenced by any repo."""
+        raise NotImplementedError
+
+    def ensure_indexes(self):
+        raise NotImplementedError
+
+    def missing_indexes(self):
+        """(collection, fields) pairs from INDEXES that do not exist yet."""
+        raise NotImplementedError
+
+    def slow_query_plans(self):
+        """(collection, filter, plan) for lookups that scan a whole collection."""
+        raise NotImplementedError
@@ -0,0 +1,34 @@
+from kernelmind import config
+
+
+class MetadataStoreFactory:
+    @staticmethod
+    def create(backend=None):
+        backend = backend or config.METADATA_BACKEND
+        # backends are imported lazily so sqlite users never need pymongo
+        if backend == "mongo":
+            from .mongo_store import MongoMetadataStore
+            return MongoMetadataStore(config.MONGO_URI, config.MONGO_DB)
+        elif backend == "sqlite":
+            from .sqlite_store import SQLiteMetadataStore
+            return SQLiteMetadataStore(config.SQLITE_PATH)
+        else:
+            raise ValueError(f"Unknown metadata backend: {backend}")
+
+
+_STORE = None
+
+
+def get_store():
+    """Process-wide metadata store, created on first use."""
+    global _STORE
+    if _STORE is None:
+        _STORE = MetadataStoreFactory.create()
+    return _STORE
+
+
+def use_backend(backend):
+    """Switch the process-wide store, e.g. from a CLI flag."""
+    global _STORE
+    config.METADATA_BACKEND = backend
+    _STORE = None
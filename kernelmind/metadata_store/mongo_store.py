@@ -0,0 +1,225 @@
+from datetime import datetime
+from pymongo import MongoClient, ReplaceOne, ASCENDING
+
+from .base import MetadataStore, INDEXES, COLLECTIONS, SYMBOL_COLLECTIONS, split_batch
+
+
+def _index_name(fields):
+    return "_".join(f"{f}_1" for f in fields)
+
+
+def _winning_stages(plan):
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        plan = plan.get("inputStage")
+    return stages
+
+
+def _group(docs, field):
+    grouped = {}
+    for doc in docs:
+        grouped.setdefault(doc[field], []).append(doc)
+    return grouped
+
+
+class MongoMetadataStore(MetadataStore):
+    def __init__(self, uri="mongodb://localhost:27017", db_name="kernelmind"):
+        self.client = MongoClient(uri)
+        self.db = self.client[db_name]
+        self._indexes_ready = False
+
+    def _db(self):
+        """The database, with indexes bootstrapped on first use."""
+        if not self._indexes_ready:
+            self.ensure_indexes()
+            self._indexes_ready = True
+        return self.db
+
+    # ============================================================
+    # INDEXES
+    # ============================================================
+
+    def ensure_indexes(self):
+        """Create every index in INDEXES. create_index is a no-op if it exists."""
+        for coll, specs in INDEXES.items():
+            for fields in specs:
+                self.db[coll].create_index(
+                    [(f, ASCENDING) for f in fields], name=_index_name(fields)
+                )
+
+    def missing_indexes(self):
+        missing = []
+        for coll, specs in INDEXES.items():
+            existing = {
+                tuple(k for k, _ in info["key"])
+                for info in self.db[coll].index_information().values()
+            }
+            for fields in specs:
+                if tuple(fields) not in existing:
+                    missing.append((coll, fields))
+        return missing
+
+    def slow_query_plans(self):
+        """
+        Explain the lookups ingest and context building run, using a real
+        (repo, path) from db.files, and flag any COLLSCAN.
+        """
+        db = self.db
+        sample = db.files.find_one({}, {"repo": 1, "path": 1})
+        if not sample:
+            return []
+
+        repo, path = sample["repo"], sample["path"]
+        queries = [
+            ("files", {"repo": repo, "path": path}),
+            ("imports", {"repo": repo, "file": path}),
+            ("functions", {"repo": repo, "path": path}),
+            ("classes", {"repo": repo, "path": path}),
+            ("methods", {"repo": repo, "path": path}),
+            ("functions", {"repo": repo, "qualified_name": "__km_probe__"}),
+            ("methods", {"repo": repo, "name": "__km_probe__"}),
+            ("configs", {"repo": repo, "file": path}),
+        ]
+
+        slow = []
+        for coll, flt in queries:
+            plan = db[coll].find(flt).explain().get("queryPlanner", {}).get("winningPlan", {})
+            # sharded / newer servers nest the plan one level deeper
+            plan = plan.get("queryPlan", plan)
+            stages = _winning_stages(plan)
+            if "COLLSCAN" in stages:
+                slow.append((coll, flt, " > ".join(stages)))
+        return slow
+
+    # ============================================================
+    # WRITES
+    # ============================================================
+
+    def save_batch(self, items, repo_name, repo_root=None):
+        """
+        One delete_many per collection clears every path in the batch,
+        then the new documents go in through unordered insert_many /
+        bulk_write calls. Deletes run first so an unordered write can
+        never remove freshly inserted records.
+        """
+        db = self._db()
+        file_docs, symbol_docs, config_docs = split_batch(items, repo_name, repo_root)
+        code_paths = [d["path"] for d in file_docs]
+        config_paths = [d["file"] for d in config_docs]
+
+        # Clear old metadata
+        if code_paths:
+            for name, field in SYMBOL_COLLECTIONS.items():
+                db[name].delete_many({"repo": repo_name, field: {"$in": code_paths}})
+        if config_paths:
+            db.configs.delete_many({"repo": repo_name, "file": {"$in": config_paths}})
+
+        # Insert
+        if file_docs:
+            db.files.bulk_write([
+                # replace, not $set: no field of the previous record survives
+                ReplaceOne({"path": d["path"], "repo": repo_name}, d, upsert=True)
+                for d in file_docs
+            ], ordered=False)
+        for name, docs in symbol_docs.items():
+            if docs:
+                db[name].insert_many(docs, ordered=False)
+        if config_docs:
+            db.configs.insert_many(config_docs, ordered=False)
+
+        return code_paths + config_paths
+
+    def delete_files(self, repo_name, paths):
+        db = self._db()
+        paths = list(paths)
+        db.files.delete_many({"repo": repo_name, "path": {"$in": paths}})
+        for name, field in SYMBOL_COLLECTIONS.items():
+            db[name].delete_many({"repo": repo_name, field: {"$in": paths}})
+        db.configs.delete_many({"repo": repo_name, "file": {"$in": paths}})
+
+    # ============================================================
+    # READS
+    # ============================================================
+
+    def file_hashes(self, repo_name):
+        db = self._db()
+        known = {}
+        for doc in db.files.find({"repo": repo_name}, {"path": 1, "hash": 1}):
+            known[doc["path"]] = doc.get("hash")
+        for doc in db.configs.find({"repo": repo_name}, {"file": 1, "hash": 1}):
+            known[doc["file"]] = doc.get("hash")
+        return known
+
+    def file_paths(self, repo_name):
+        cursor = self._db().files.find({"repo": repo_name}, {"path": 1}).sort("path", 1)
+        for doc in cursor:
+            yield doc["path"]
+
+    def context_packs(self, repo_name, paths):
+        """Six $in queries for the whole batch, grouped by path on the client."""
+        db = self._db()
+        paths = list(paths)
+
+        files = {
+            doc["path"]: doc
+            for doc in db.files.find({"repo": repo_name, "path": {"$in": paths}})
+        }
+        if not files:
+            return {}
+        found = list(files)
+
+        imports = _group(db.imports.find({"repo": repo_name, "file": {"$in": found}}), "file")
+        functions = _group(db.functions.find({"repo": repo_name, "path": {"$in": found}}), "path")
+        classes = _group(db.classes.find({"repo": repo_name, "path": {"$in": found}}), "path")
+        methods = _group(db.methods.find({"repo": repo_name, "path": {"$in": found}}), "path")
+        configs = {
+            doc["file"]: doc
+            for doc in db.configs.find({"repo": repo_name, "file": {"$in": found}})
+        }
+
+        return {
+            path: {
+                "file": files[path],
+                "imports": imports.get(path, []),
+                "functions": functions.get(path, []),
+                "classes": classes.get(path, []),
+                "methods": methods.get(path, []),
+                "config": configs.get(path),
+            }
+            for path in paths if path in files
+        }
+
+    def configs(self, repo_name):
+        return self._db().configs.find({"repo": repo_name})
+
+    # ============================================================
+    # REPO LIFECYCLE
+    # ============================================================
+
+    def record_repo(self, repo_name, **info):
+        info.update({"repo": repo_name, "ingested_at": datetime.utcnow()})
+        self._db().repos.update_one({"repo": repo_name}, {"$set": info}, upsert=True)
+
+    def repo_infos(self):
+        db = self._db()
+        infos = {}
+        for coll, key in (("files", "files"), ("configs", "configs")):
+            for row in db[coll].aggregate([{"$group": {"_id": "$repo", "n": {"$sum": 1}}}]):
+                infos.setdefault(row["_id"], {"files": 0, "configs": 0})[key] = row["n"]
+        for doc in db.repos.find({}, {"_id": 0}):
+            infos.setdefault(doc["repo"], {"files": 0, "configs": 0}).update(doc)
+        return infos
+
+    def drop_repo(self, repo_name):
+        db = self._db()
+        for coll in COLLECTIONS:
+            db[coll].delete_many({"repo": repo_name})
+
+    def referenced_hashes(self):
+        db = self._db()
+        hashes = set()
+        for coll in ("files", "configs"):
+            for doc in db[coll].find({}, {"hash": 1}):
+                hashes.add(doc.get("hash"))
+        return hashes
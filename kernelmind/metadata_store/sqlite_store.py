@@ -0,0 +1,272 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from .base import MetadataStore, INDEXES, COLLECTIONS, SYMBOL_COLLECTIONS, split_batch
+
+# every table keeps the lookup columns as real columns and the full
+# document as JSON, so reads hand back the same dicts Mongo would
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    repo TEXT NOT NULL, path TEXT NOT NULL, hash TEXT, doc TEXT NOT NULL,
+    PRIMARY KEY (repo, path)
+);
+CREATE TABLE IF NOT EXISTS imports (
+    repo TEXT NOT NULL, file TEXT NOT NULL, doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS functions (
+    repo TEXT NOT NULL, path TEXT NOT NULL, name TEXT, qualified_name TEXT, doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classes (
+    repo TEXT NOT NULL, path TEXT NOT NULL, name TEXT, qualified_name TEXT, doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS methods (
+    repo TEXT NOT NULL, path TEXT NOT NULL, name TEXT, qualified_name TEXT, doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS configs (
+    repo TEXT NOT NULL, file TEXT NOT NULL, hash TEXT, doc TEXT NOT NULL,
+    PRIMARY KEY (repo, file)
+);
+CREATE TABLE IF NOT EXISTS repos (
+    repo TEXT NOT NULL PRIMARY KEY, doc TEXT NOT NULL
+);
+"""
+
+# SQLite's default limit on bound parameters is 999 on older builds
+IN_CHUNK = 900
+
+
+def _index_name(coll, fields):
+    return f"idx_{coll}_" + "_".join(fields)
+
+
+def _dumps(doc):
+    doc = {k: v for k, v in doc.items() if k != "_id"}
+    return json.dumps(doc, default=str)
+
+
+def _chunks(values, size=IN_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class SQLiteMetadataStore(MetadataStore):
+    """
+    Embedded metadata store in a single WAL-mode SQLite file. Each batch
+    is written in one transaction; the connection is shared across the
+    ingest threads behind a lock.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.ensure_indexes()
+
+    # ============================================================
+    # INDEXES
+    # ============================================================
+
+    def ensure_indexes(self):
+        with self.lock, self.conn:
+            for coll, specs in INDEXES.items():
+                for fields in specs:
+                    self.conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {_index_name(coll, fields)} "
+                        f"ON {coll} ({', '.join(fields)})"
+                    )
+
+    def missing_indexes(self):
+        rows = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        ).fetchall()
+        existing = {r[0] for r in rows}
+        return [
+            (coll, fields)
+            for coll, specs in INDEXES.items()
+            for fields in specs
+            if _index_name(coll, fields) not in existing
+        ]
+
+    def slow_query_plans(self):
+        queries = [("files", "path"), ("configs", "file")]
+        queries += [(name, field) for name, field in SYMBOL_COLLECTIONS.items()]
+        queries += [(name, "qualified_name") for name in ("functions", "classes", "methods")]
+        queries += [(name, "name") for name in ("functions", "classes", "methods")]
+
+        slow = []
+        for coll, field in queries:
+            plan = self.conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT doc FROM {coll} WHERE repo = ? AND {field} = ?",
+                ("__km_probe__", "__km_probe__"),
+            ).fetchall()
+            detail = " > ".join(row[-1] for row in plan)
+            if "SCAN" in detail and "USING" not in detail:
+                slow.append((coll, {"repo": "?", field: "?"}, detail))
+        return slow
+
+    # ============================================================
+    # WRITES
+    # ============================================================
+
+    def _delete(self, repo_name, code_paths, config_paths):
+        for part in _chunks(code_paths):
+            marks = ",".join("?" * len(part))
+            self.conn.execute(
+                f"DELETE FROM files WHERE repo = ? AND path IN ({marks})", [repo_name, *part]
+            )
+            for name, field in SYMBOL_COLLECTIONS.items():
+                self.conn.execute(
+                    f"DELETE FROM {name} WHERE repo = ? AND {field} IN ({marks})",
+                    [repo_name, *part],
+                )
+        for part in _chunks(config_paths):
+            marks = ",".join("?" * len(part))
+            self.conn.execute(
+                f"DELETE FROM configs WHERE repo = ? AND file IN ({marks})", [repo_name, *part]
+            )
+
+    def save_batch(self, items, repo_name, repo_root=None):
+        file_docs, symbol_docs, config_docs = split_batch(items, repo_name, repo_root)
+        code_paths = [d["path"] for d in file_docs]
+        config_paths = [d["file"] for d in config_docs]
+
+        with self.lock, self.conn:
+            self._delete(repo_name, code_paths, config_paths)
+
+            self.conn.executemany(
+                "INSERT INTO files (repo, path, hash, doc) VALUES (?, ?, ?, ?)",
+                [(repo_name, d["path"], d.get("hash"), _dumps(d)) for d in file_docs],
+            )
+            self.conn.executemany(
+                "INSERT INTO imports (repo, file, doc) VALUES (?, ?, ?)",
+                [(repo_name, d["file"], _dumps(d)) for d in symbol_docs["imports"]],
+            )
+            for name in ("functions", "classes", "methods"):
+                self.conn.executemany(
+                    f"INSERT INTO {name} (repo, path, name, qualified_name, doc) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (repo_name, d["path"], d.get("name"), d.get("qualified_name"), _dumps(d))
+                        for d in symbol_docs[name]
+                    ],
+                )
+            self.conn.executemany(
+                "INSERT INTO configs (repo, file, hash, doc) VALUES (?, ?, ?, ?)",
+                [(repo_name, d["file"], d.get("hash"), _dumps(d)) for d in config_docs],
+            )
+
+        return code_paths + config_paths
+
+    def delete_files(self, repo_name, paths):
+        paths = list(paths)
+        with self.lock, self.conn:
+            self._delete(repo_name, paths, paths)
+
+    # ============================================================
+    # READS
+    # ============================================================
+
+    def file_hashes(self, repo_name):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, hash FROM files WHERE repo = ? "
+                "UNION ALL SELECT file, hash FROM configs WHERE repo = ?",
+                (repo_name, repo_name),
+            ).fetchall()
+        return dict(rows)
+
+    def file_paths(self, repo_name):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path FROM files WHERE repo = ? ORDER BY path", (repo_name,)
+            ).fetchall()
+        for (path,) in rows:
+            yield path
+
+    def _select(self, table, field, repo_name, paths):
+        out = []
+        for part in _chunks(paths):
+            marks = ",".join("?" * len(part))
+            out.extend(
+                json.loads(doc) for (doc,) in self.conn.execute(
+                    f"SELECT doc FROM {table} WHERE repo = ? AND {field} IN ({marks})",
+                    [repo_name, *part],
+                )
+            )
+        return out
+
+    def context_packs(self, repo_name, paths):
+        paths = list(paths)
+        with self.lock:
+            files = {d["path"]: d for d in self._select("files", "path", repo_name, paths)}
+            found = list(files)
+            grouped = {}
+            for name, field in SYMBOL_COLLECTIONS.items():
+                grouped[name] = {}
+                for d in self._select(name, field, repo_name, found):
+                    grouped[name].setdefault(d[field], []).append(d)
+            configs = {d["file"]: d for d in self._select("configs", "file", repo_name, found)}
+
+        return {
+            path: {
+                "file": files[path],
+                "imports": grouped["imports"].get(path, []),
+                "functions": grouped["functions"].get(path, []),
+                "classes": grouped["classes"].get(path, []),
+                "methods": grouped["methods"].get(path, []),
+                "config": configs.get(path),
+            }
+            for path in paths if path in files
+        }
+
+    def configs(self, repo_name):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT doc FROM configs WHERE repo = ? ORDER BY file", (repo_name,)
+            ).fetchall()
+        for (doc,) in rows:
+            yield json.loads(doc)
+
+    # ============================================================
+    # REPO LIFECYCLE
+    # ============================================================
+
+    def record_repo(self, repo_name, **info):
+        info.update({"repo": repo_name, "ingested_at": datetime.utcnow()})
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO repos (repo, doc) VALUES (?, ?)",
+                (repo_name, _dumps(info)),
+            )
+
+    def repo_infos(self):
+        infos = {}
+        with self.lock:
+            for table in ("files", "configs"):
+                rows = self.conn.execute(
+                    f"SELECT repo, COUNT(*) FROM {table} GROUP BY repo"
+                ).fetchall()
+                for repo, n in rows:
+                    infos.setdefault(repo, {"files": 0, "configs": 0})[table] = n
+            for repo, doc in self.conn.execute("SELECT repo, doc FROM repos").fetchall():
+                infos.setdefault(repo, {"files": 0, "configs": 0}).update(json.loads(doc))
+        return infos
+
+    def drop_repo(self, repo_name):
+        with self.lock, self.conn:
+            for table in COLLECTIONS:
+                self.conn.execute(f"DELETE FROM {table} WHERE repo = ?", (repo_name,))
+
+    def referenced_hashes(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT hash FROM files UNION SELECT hash FROM configs"
+            ).fetchall()
+        return {r[0] for r in rows}
@@ -0,0 +1,88 @@
+import gc
+import sys
+import threading
+
+from kernelmind import config
+
+# ----------------------------------
+# Process-wide model registry
+#
+# Every model (embedder, reranker, query rewriter) is loaded once, on
+# first use, and shared by search, ingest and the CLI.
+# ----------------------------------
+
+_MODELS = {}
+_LOCK = threading.Lock()
+_SETTINGS = {"device": config.MODEL_DEVICE, "threads": config.TORCH_THREADS}
+
+
+def configure(device=None, threads=None):
+    """Device / torch threads for models loaded from now on."""
+    if device is not None:
+        _SETTINGS["device"] = device
+    if threads is not None:
+        _SETTINGS["threads"] = threads
+
+
+def resolve_device(device=None):
+    device = device or _SETTINGS["device"]
+    if device != "auto":
+        return device
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def apply_torch_threads():
+    if _SETTINGS["threads"]:
+        import torch
+        torch.set_num_threads(_SETTINGS["threads"])
+
+
+def get_model(key, loader):
+    """The model registered under `key`, calling loader() the first time."""
+    with _LOCK:
+        if key not in _MODELS:
+            _MODELS[key] = loader()
+        return _MODELS[key]
+
+
+def get_embedder(backend=None, model_name=None):
+    """
+    Shared embedding backend. It is never reconfigured for one caller:
+    pass a batch size to its embed() instead.
+    """
+    from kernelmind.embeddings.factory import EmbeddingFactory
+
+    backend = backend or config.EMBED_BACKEND
+    model_name = model_name or config.EMBED_MODEL
+    options = {"model_name": model_name} if backend in ("local", "onnx", "cloud") else {}
+
+    return get_model(
+        ("embedder", backend, model_name),
+        lambda: EmbeddingFactory.create(backend, **options),
+    )
+
+
+def loaded():
+    with _LOCK:
+        return list(_MODELS)
+
+
+def unload(kind=None):
+    """
+    Drop every registered model (or only those of one kind, e.g.
+    "reranker") so their memory can be reclaimed. They reload on next use.
+    """
+    with _LOCK:
+        keys = [k for k in _MODELS if kind is None or k[0] == kind]
+        for key in keys:
+            model = _MODELS.pop(key)
+            close = getattr(model, "close", None)
+            if close is not None:
+                close()
+    gc.collect()
+
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    return keys
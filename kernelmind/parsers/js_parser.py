@@ -1,185 +1,177 @@
+import os
 import json
-import subprocess
+import queue
+import atexit
 import hashlib
+import threading
+import subprocess
 from typing import Any, Dict, List
 
+from kernelmind import config
 
-def sha256_of_file(path: str) -> str:
-    with open(path, "rb") as f:
-        return hashlib.sha256(f.read()).hexdigest()
+PARSE_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parse_js.js")
 
 
-def parse_javascript(path: str) -> Dict[str, Any]:
-    """Parse JS/TS via Babel parser (Node script)."""
+def read_source(path: str):
+    # hash the decoded source like the other parsers so stored hashes
+    # can be compared across languages for incremental ingest
+    with open(path, "r", encoding="utf-8") as f:
+        src = f.read()
+    return src, hashlib.sha256(src.encode()).hexdigest()
 
-    try:
-        result = subprocess.check_output(
-            ["node", "parse_js.js", path],
-            stderr=subprocess.STDOUT
-        ).decode("utf8")
-    except subprocess.CalledProcessError as e:
-        return {
-            "file": {"path": path, "hash": sha256_of_file(path)},
-            "error": f"Failed to parse: {e.output.decode('utf8')}",
-            "imports": [],
-            "functions": [],
-            "classes": [],
-            "methods": []
-        }
-
-    data = json.loads(result)
-
-    if not data.get("ok"):
-        return {
-            "file": {"path": path, "hash": sha256_of_file(path)},
-            "error": data.get("error", "Unknown error"),
-            "imports": [],
-            "functions": [],
-            "classes": [],
-            "methods": []
-        }
-
-    ast = data["ast"]
-
-    imports = extract_imports(ast)
-    functions = extract_functions(ast)
-    classes, methods = extract_classes_and_methods(ast)
 
+def _failed(path: str, error: str) -> Dict[str, Any]:
+    src, file_hash = read_source(path)
     return {
-        "file": {"path": path, "hash": sha256_of_file(path)},
-        "imports": imports,
-        "functions": functions,
-        "classes": classes,
-        "methods": methods
+        "file": {"path": path, "hash": file_hash},
+        "error": error,
+        "imports": [],
+        "functions": [],
+        "classes": [],
+        "methods": [],
+        "source": src,
     }
 
 
-# ----------------------------------------------------------------------
-# Extract imports
-# ----------------------------------------------------------------------
-
-def extract_imports(ast) -> List[str]:
-    modules = []
-
-    def visit(node):
-        if isinstance(node, dict):
-            # ES6 import
-            if node.get("type") == "ImportDeclaration":
-                if node.get("source", {}).get("value"):
-                    modules.append(node["source"]["value"])
-
-            # require("x")
-            if node.get("type") == "CallExpression":
-                callee = node.get("callee", {})
-                if callee.get("type") == "Identifier" and callee.get("name") == "require":
-                    args = node.get("arguments", [])
-                    if args and args[0].get("type") == "StringLiteral":
-                        modules.append(args[0]["value"])
-
-            for k, v in node.items():
-                if isinstance(v, (dict, list)):
-                    visit(v)
-
-        elif isinstance(node, list):
-            for item in node:
-                visit(item)
-
-    visit(ast)
-    return modules
-
-
-# ----------------------------------------------------------------------
-# Extract functions
-# ----------------------------------------------------------------------
-
-def extract_functions(ast):
-    funcs = []
-
-    def visit(node):
-        if isinstance(node, dict):
-            t = node.get("type")
-
-            # function foo() {}
-            if t == "FunctionDeclaration":
-                name = (node.get("id") or {}).get("name", "<anonymous>")
-                funcs.append({
-                    "name": name,
-                    "qualified_name": name,
-                    "args": [p["name"] for p in node.get("params", []) if p.get("name")],
-                    "start_line": node["loc"]["start"]["line"],
-                    "end_line": node["loc"]["end"]["line"],
-                })
-
-            # const foo = () => {}
-            if t == "VariableDeclarator":
-                id_node = node.get("id")
-                init = node.get("init")
-
-                if id_node and init and init.get("type") in ("ArrowFunctionExpression", "FunctionExpression"):
-                    name = id_node.get("name", "<anonymous>")
-                    params = init.get("params", [])
-                    funcs.append({
-                        "name": name,
-                        "qualified_name": name,
-                        "args": [p["name"] for p in params if p.get("name")],
-                        "start_line": init["loc"]["start"]["line"],
-                        "end_line": init["loc"]["end"]["line"],
-                    })
-
-            for k, v in node.items():
-                if isinstance(v, (dict, list)):
-                    visit(v)
-
-        elif isinstance(node, list):
-            for item in node:
-                visit(item)
-
-    visit(ast)
-    return funcs
-
-
-# ----------------------------------------------------------------------
-# Extract classes + methods
-# ----------------------------------------------------------------------
-
-def extract_classes_and_methods(ast):
-    classes = []
-    methods = []
-
-    def visit(node, current_class=None):
-        if isinstance(node, dict):
-            t = node.get("type")
-
-            # class Foo {}
-            if t == "ClassDeclaration":
-                cls_name = (node.get("id") or {}).get("name", "<anonymous>")
-                classes.append({
-                    "name": cls_name,
-                    "qualified_name": cls_name,
-                    "start_line": node["loc"]["start"]["line"],
-                    "end_line": node["loc"]["end"]["line"],
-                })
-                current_class = cls_name
-
-            # Foo { method() {} }
-            if t == "ClassMethod" and current_class:
-                mname = (node.get("key") or {}).get("name", "<anonymous>")
-                methods.append({
-                    "name": mname,
-                    "qualified_name": f"{current_class}.{mname}",
-                    "class": current_class,
-                    "args": [p["name"] for p in node.get("params", []) if p.get("name")],
-                    "start_line": node["loc"]["start"]["line"],
-                    "end_line": node["loc"]["end"]["line"],
-                })
-
-            for k, v in node.items():
-                if isinstance(v, (dict, list)):
-                    visit(v, current_class)
-
-        elif isinstance(node, list):
-            for item in node:
-                visit(item, current_class)
-
-    visit(ast)
-    return classes, methods
+class NodeWorker:
+    """
+    Long-lived `node parse_js.js` process.
+
+    Batches of paths go in as one JSON line on stdin; the worker answers
+    with one JSON line holding the compact imports/functions/classes/methods
+    record for every path, so Node and Babel are loaded once per process
+    instead of once per file. A worker that hangs past `timeout` seconds
+    or exits is killed and started again for the next batch.
+    """
+
+    def __init__(self, script=None, timeout=None):
+        self.script = script or config.PARSE_JS_SCRIPT or PARSE_JS
+        self.timeout = timeout or config.JS_PARSE_TIMEOUT
+        self.proc = None
+        self._lines = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.proc = subprocess.Popen(
+            ["node", self.script],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf8",
+        )
+        # stdout is drained by a thread so a response can be awaited with a deadline
+        self._lines = queue.Queue()
+        threading.Thread(
+            target=_pump, args=(self.proc.stdout, self._lines), name="km-node-stdout", daemon=True
+        ).start()
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def parse_batch(self, paths: List[str]) -> List[Dict[str, Any]]:
+        with self._lock:
+            if not self.alive():
+                self.start()
+
+            self._next_id += 1
+            req = {"id": self._next_id, "paths": [os.path.abspath(p) for p in paths]}
+            try:
+                self.proc.stdin.write(json.dumps(req) + "\n")
+                self.proc.stdin.flush()
+                line = self._lines.get(timeout=self.timeout)
+            except (BrokenPipeError, OSError) as e:
+                self.kill()
+                raise RuntimeError(f"node worker died: {e}")
+            except queue.Empty:
+                self.kill()
+                raise RuntimeError(f"node worker timed out after {self.timeout:g}s")
+
+            if not line:
+                self.kill()
+                raise RuntimeError("node worker exited without a response")
+
+            try:
+                resp = json.loads(line)
+            except ValueError:
+                self.kill()
+                raise RuntimeError("node worker sent a malformed response")
+            if resp.get("id") != req["id"] or len(resp.get("results", [])) != len(paths):
+                self.kill()
+                raise RuntimeError("node worker response does not match the request")
+            return resp["results"]
+
+    def kill(self):
+        if self.proc is None:
+            return
+        self.proc.kill()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        self.proc = None
+
+    def close(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except Exception:
+            self.proc.kill()
+        self.proc = None
+
+
+def _pump(stream, lines):
+    """Forward a worker's stdout lines; "" marks EOF."""
+    try:
+        for line in stream:
+            lines.put(line)
+    except (OSError, ValueError):
+        pass
+    lines.put("")
+
+
+_WORKER = None
+
+
+def _get_worker():
+    global _WORKER
+    if _WORKER is None:
+        _WORKER = NodeWorker()
+        atexit.register(_WORKER.close)
+    return _WORKER
+
+
+def parse_javascript_batch(paths: List[str]) -> List[Dict[str, Any]]:
+    """Parse many JS/TS files through the shared Node worker, in input order."""
+    if not paths:
+        return []
+
+    try:
+        results = _get_worker().parse_batch(paths)
+    except RuntimeError as e:
+        return [_failed(p, f"Failed to parse: {e}") for p in paths]
+
+    out = []
+    for path, data in zip(paths, results):
+        if data.get("error"):
+            out.append(_failed(path, data["error"]))
+            continue
+
+        src, file_hash = read_source(path)
+        out.append({
+            "file": {"path": path, "hash": file_hash},
+            "imports": data.get("imports", []),
+            "functions": data.get("functions", []),
+            "classes": data.get("classes", []),
+            "methods": data.get("methods", []),
+            "source": src,
+        })
+    return out
+
+
+def parse_javascript(path: str) -> Dict[str, Any]:
+    """Parse JS/TS via Babel parser (Node script)."""
+    return parse_javascript_batch([path])[0]
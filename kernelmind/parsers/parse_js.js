@@ -0,0 +1,184 @@
+const fs = require("fs");
+const readline = require("readline");
+const parser = require("@babel/parser");
+const traverse = require("@babel/traverse").default;
+
+const PLUGINS = [
+  "typescript",
+  "jsx",
+  "classProperties",
+  "classPrivateProperties",
+  "decorators-legacy",
+  "dynamicImport",
+  "optionalChaining",
+  "nullishCoalescingOperator",
+  "topLevelAwait",
+];
+
+function paramNames(params) {
+  const names = [];
+  for (const p of params || []) {
+    if (p.type === "Identifier") names.push(p.name);
+    else if (p.type === "AssignmentPattern" && p.left.type === "Identifier") names.push(p.left.name);
+    else if (p.type === "RestElement" && p.argument.type === "Identifier") names.push(p.argument.name);
+  }
+  return names;
+}
+
+function enclosingClass(pathNode) {
+  const cls = pathNode.findParent((p) => p.isClassDeclaration() || p.isClassExpression());
+  return cls && cls.node.id ? cls.node.id.name : null;
+}
+
+// JSDoc block right above a declaration, looking through
+// `const x = ...` and `export` wrappers the comment attaches to
+function docOf(pathNode) {
+  let p = pathNode;
+  while (p) {
+    const comments = p.node.leadingComments;
+    if (comments && comments.length) {
+      const c = comments[comments.length - 1];
+      if (c.type !== "CommentBlock" || !c.value.startsWith("*")) return null;
+      const text = c.value
+        .split("\n")
+        .map((l) => l.replace(/^\s*\*+ ?/, ""))
+        .join("\n")
+        .trim();
+      return text || null;
+    }
+    p = p.parentPath;
+    if (!p || !(p.isVariableDeclarator() || p.isVariableDeclaration() ||
+                p.isExportNamedDeclaration() || p.isExportDefaultDeclaration())) {
+      return null;
+    }
+  }
+  return null;
+}
+
+function parseJS(path) {
+  const src = fs.readFileSync(path, "utf8");
+
+  let ast;
+  try {
+    ast = parser.parse(src, { sourceType: "unambiguous", plugins: PLUGINS });
+  } catch (err) {
+    return { file: { path }, error: err.message, imports: [], functions: [], classes: [], methods: [] };
+  }
+
+  const imports = [];
+  const functions = [];
+  const classes = [];
+  const methods = [];
+
+  traverse(ast, {
+    ImportDeclaration(pathNode) {
+      imports.push(pathNode.node.source.value);
+    },
+
+    // require("x")
+    CallExpression(pathNode) {
+      const n = pathNode.node;
+      if (n.callee.type === "Identifier" && n.callee.name === "require") {
+        const arg = n.arguments[0];
+        if (arg && arg.type === "StringLiteral") imports.push(arg.value);
+      }
+    },
+
+    // function foo() {}
+    FunctionDeclaration(pathNode) {
+      const n = pathNode.node;
+      const name = n.id ? n.id.name : "<anonymous>";
+      functions.push({
+        name,
+        qualified_name: name,
+        args: paramNames(n.params),
+        docstring: docOf(pathNode),
+        start_line: n.loc.start.line,
+        signature_end: n.body.loc.start.line,
+        end_line: n.loc.end.line,
+      });
+    },
+
+    // const foo = () => {}
+    VariableDeclarator(pathNode) {
+      const n = pathNode.node;
+      const init = n.init;
+      if (!init || (init.type !== "ArrowFunctionExpression" && init.type !== "FunctionExpression")) return;
+      const name = n.id && n.id.name ? n.id.name : "<anonymous>";
+      functions.push({
+        name,
+        qualified_name: name,
+        args: paramNames(init.params),
+        docstring: docOf(pathNode),
+        start_line: init.loc.start.line,
+        signature_end: init.body.loc.start.line,
+        end_line: init.loc.end.line,
+      });
+    },
+
+    // class Foo {}
+    ClassDeclaration(pathNode) {
+      const n = pathNode.node;
+      const name = n.id ? n.id.name : "<anonymous>";
+      classes.push({
+        name,
+        qualified_name: name,
+        docstring: docOf(pathNode),
+        start_line: n.loc.start.line,
+        signature_end: n.body.loc.start.line,
+        end_line: n.loc.end.line,
+      });
+    },
+
+    // Foo { method() {} }
+    ClassMethod(pathNode) {
+      const n = pathNode.node;
+      const cls = enclosingClass(pathNode);
+      if (!cls) return;
+      const name = n.key && n.key.name ? n.key.name : "<anonymous>";
+      methods.push({
+        name,
+        qualified_name: `${cls}.${name}`,
+        class: cls,
+        args: paramNames(n.params),
+        docstring: docOf(pathNode),
+        start_line: n.loc.start.line,
+        signature_end: n.body.loc.start.line,
+        end_line: n.loc.end.line,
+      });
+    },
+  });
+
+  return { file: { path }, imports, functions, classes, methods };
+}
+
+function safeParse(path) {
+  try {
+    return parseJS(path);
+  } catch (err) {
+    return { file: { path }, error: err.message, imports: [], functions: [], classes: [], methods: [] };
+  }
+}
+
+// Worker mode: one JSON request per stdin line, {"id": n, "paths": [...]},
+// answered with one JSON line {"id": n, "results": [...]} in path order.
+function serve() {
+  const rl = readline.createInterface({ input: process.stdin, terminal: false });
+  rl.on("line", (line) => {
+    if (!line.trim()) return;
+    const req = JSON.parse(line);
+    const results = req.paths.map(safeParse);
+    process.stdout.write(JSON.stringify({ id: req.id, results }) + "\n");
+  });
+  rl.on("close", () => process.exit(0));
+}
+
+if (require.main === module) {
+  if (process.argv[2]) {
+    process.stdout.write(JSON.stringify(safeParse(process.argv[2])) + "\n");
+  } else {
+    serve();
+  }
+}
+
+module.exports = { parseJS };
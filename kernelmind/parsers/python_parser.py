@@ -7,7 +7,6 @@ def parse_python(path: str) -> Dict[str, Any]:
         src = f.read()
 
     file_hash = hashlib.sha256(src.encode()).hexdigest()
-    lines = src.splitlines()
 
     try:
         tree = ast.parse(src)
@@ -22,16 +21,16 @@ def parse_python(path: str) -> Dict[str, Any]:
         }
 
     imports = extract_imports(tree)
-    functions = extract_functions(tree, lines)
-    classes, methods = extract_classes_and_methods(tree, lines)
+    functions = extract_functions(tree)
+    classes, methods = extract_classes_and_methods(tree)
 
     return {
-        "file": {"path": path, "hash": file_hash},
+        "file": {"path": path, "hash": file_hash, "docstring": ast.get_docstring(tree)},
         "imports": imports,
         "functions": functions,
         "classes": classes,
         "methods": methods,
-        "source": src,   # <-- ⭐ CRITICAL ADDITION
+        "source": src,   # <-- stored once in the blob store, keyed by hash
     }
 
 
@@ -46,11 +45,12 @@ def extract_imports(tree: ast.AST) -> List[str]:
     return imports
 
 
-def slice_code(lines, start, end):
-    return "\n".join(lines[start - 1 : end])
+def signature_end(node) -> int:
+    """Last line of a def/class header (decorators excluded)."""
+    return max(node.lineno, node.body[0].lineno - 1)
 
 
-def extract_functions(tree: ast.AST, lines: List[str]) -> List[Dict[str, Any]]:
+def extract_functions(tree: ast.AST) -> List[Dict[str, Any]]:
     funcs = []
     for node in tree.body:
         if isinstance(node, ast.FunctionDef):
@@ -58,14 +58,15 @@ def extract_functions(tree: ast.AST, lines: List[str]) -> List[Dict[str, Any]]:
                 "name": node.name,
                 "qualified_name": node.name,
                 "args": [a.arg for a in node.args.args],
+                "docstring": ast.get_docstring(node),
                 "start_line": node.lineno,
+                "signature_end": signature_end(node),
                 "end_line": node.end_lineno,
-                "code": slice_code(lines, node.lineno, node.end_lineno),
             })
     return funcs
 
 
-def extract_classes_and_methods(tree: ast.AST, lines: List[str]):
+def extract_classes_and_methods(tree: ast.AST):
     classes = []
     methods = []
 
@@ -74,9 +75,10 @@ def extract_classes_and_methods(tree: ast.AST, lines: List[str]):
             classes.append({
                 "name": node.name,
                 "qualified_name": node.name,
+                "docstring": ast.get_docstring(node),
                 "start_line": node.lineno,
+                "signature_end": signature_end(node),
                 "end_line": node.end_lineno,
-                "code": slice_code(lines, node.lineno, node.end_lineno),
             })
 
             for n in node.body:
@@ -86,9 +88,10 @@ def extract_classes_and_methods(tree: ast.AST, lines: List[str]):
                         "qualified_name": f"{node.name}.{n.name}",
                         "class": node.name,
                         "args": [a.arg for a in n.args.args],
+                        "docstring": ast.get_docstring(n),
                         "start_line": n.lineno,
+                        "signature_end": signature_end(n),
                         "end_line": n.end_lineno,
-                        "code": slice_code(lines, n.lineno, n.end_lineno),
                     })
 
     return classes, methods
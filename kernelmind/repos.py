@@ -0,0 +1,155 @@
+import os
+import re
+import time
+import shutil
+
+from kernelmind import config
+from kernelmind.ingestion.downloader import load_cache
+from kernelmind.metadata_store.factory import get_store
+from kernelmind.utils.blob_store import get_blob_store
+from kernelmind.vector_store.factory import get_vector_store
+
+# legacy downloads appended a %Y%m%d_%H%M%S stamp to the repo name
+_TIMESTAMP = re.compile(r"\d{8}_\d{6}$")
+
+
+def _root(base_dir):
+    return os.path.abspath(base_dir or config.REPOS_DIR)
+
+
+def _inside(path, root):
+    """True for paths strictly below root; nothing outside it is ever removed."""
+    path = os.path.abspath(path)
+    return path != root and os.path.commonpath([path, root]) == root
+
+
+def list_repos(store=None):
+    """
+    Every repo known to the metadata or vector store, with file counts,
+    chunk counts, chunk text bytes and compressed source bytes.
+    """
+    store = store or get_vector_store()
+    meta = get_store()
+    blobs = get_blob_store()
+
+    infos = meta.repo_infos()
+    chunks = store.repo_stats()
+
+    rows = []
+    for repo in sorted(set(infos) | set(chunks)):
+        info = infos.get(repo, {"files": 0, "configs": 0})
+        hashes = set(meta.file_hashes(repo).values())
+        rows.append({
+            "repo": repo,
+            "files": info.get("files", 0),
+            "configs": info.get("configs", 0),
+            "chunks": chunks.get(repo, {}).get("chunks", 0),
+            "chunk_bytes": chunks.get(repo, {}).get("bytes", 0),
+            "source_bytes": sum(blobs.size_of(h) for h in hashes),
+            "ingested_at": str(info.get("ingested_at") or ""),
+            "url": info.get("url"),
+            "branch": info.get("branch"),
+            "path": info.get("path"),
+        })
+    return rows
+
+
+def drop_repo(repo_name, base_dir=None, store=None):
+    """Remove a repo from the metadata store, the vector store and its tree under base_dir."""
+    store = store or get_vector_store()
+    meta = get_store()
+    base_dir = _root(base_dir)
+
+    path = meta.repo_infos().get(repo_name, {}).get("path")
+    meta.drop_repo(repo_name)
+    store.delete_repo(repo_name)
+
+    for tree in {path, os.path.join(base_dir, repo_name)}:
+        if tree and _inside(tree, base_dir) and os.path.isdir(tree):
+            shutil.rmtree(tree, ignore_errors=True)
+
+    manifest = os.path.join(base_dir, ".manifests", f"{repo_name}.json")
+    if os.path.exists(manifest):
+        os.remove(manifest)
+
+
+def _family(row):
+    """Snapshots of the same source share a family: url@branch, else the unstamped name."""
+    if row.get("url"):
+        return f"{row['url'].rstrip('/')}@{row.get('branch')}"
+    return _TIMESTAMP.sub("", row["repo"])
+
+
+def _age_key(row):
+    stamp = _TIMESTAMP.search(row["repo"])
+    return row["ingested_at"] or (stamp.group(0) if stamp else "")
+
+
+def plan_gc(rows, keep=1, base_dir=None):
+    """
+    Work out what gc would remove:
+      - repos beyond the newest `keep` snapshots of each family
+      - trees recorded by the downloader under base_dir that no
+        surviving repo points at
+    Directories gc knows nothing about are never touched.
+    """
+    base_dir = _root(base_dir)
+    families = {}
+    for row in rows:
+        families.setdefault(_family(row), []).append(row)
+
+    drop = []
+    for members in families.values():
+        members.sort(key=_age_key, reverse=True)
+        drop.extend(m["repo"] for m in members[keep:])
+
+    kept = [r for r in rows if r["repo"] not in drop]
+    live = {os.path.abspath(r["path"]) for r in kept if r.get("path")}
+    live |= {os.path.join(base_dir, r["repo"]) for r in kept}
+
+    recorded = {
+        os.path.abspath(entry["path"])
+        for entry in load_cache(base_dir).values() if entry.get("path")
+    }
+    orphans = sorted(
+        tree for tree in recorded
+        if tree not in live and _inside(tree, base_dir) and os.path.isdir(tree)
+    )
+    return drop, orphans
+
+
+def gc(keep=1, base_dir=None, dry_run=False, log=print):
+    """Drop stale snapshots and orphan trees, then sweep unreferenced blobs."""
+    store = get_vector_store()
+    rows = list_repos(store)
+    drop, orphans = plan_gc(rows, keep=keep, base_dir=base_dir)
+
+    for repo in drop:
+        log(f"drop repo  {repo}")
+        if not dry_run:
+            drop_repo(repo, base_dir=base_dir, store=store)
+
+    for tree in orphans:
+        log(f"drop tree  {tree}")
+        if not dry_run:
+            shutil.rmtree(tree, ignore_errors=True)
+
+    # blobs live under a directory per metadata backend, so this backend's
+    # references account for every blob swept here. A running ingest puts
+    # blobs before the metadata naming them is committed, so recent ones
+    # are left for a later gc.
+    blobs = get_blob_store()
+    cutoff = time.time() - config.BLOB_GC_GRACE
+    referenced = get_store().referenced_hashes()
+    stale = [
+        d for d in blobs.iter_hashes()
+        if d not in referenced and (blobs.mtime(d) or cutoff) < cutoff
+    ]
+    if not dry_run:
+        for digest in stale:
+            # skip blobs put again since they were listed
+            if (blobs.mtime(digest) or cutoff) < cutoff:
+                blobs.delete(digest)
+    log(f"{'would sweep' if dry_run else 'swept'} {len(stale)} unreferenced blobs")
+
+    return drop, orphans
@@ -3,30 +3,24 @@ import re
 import math
 from typing import List, Tuple
 
-import chromadb
 from rank_bm25 import BM25Okapi
 
-from kernelmind.embeddings.local_backend import LocalEmbeddingBackend
+from kernelmind import models
+from kernelmind.embeddings.cache import get_query_cache
+from kernelmind.vector_store.base import check_index_model
+from kernelmind.vector_store.factory import get_vector_store, DEFAULT_COLLECTION
+from kernelmind.vector_store.filters import BLOCKED_FOLDERS, build_where, matches_prefix, normalize_prefix
 from kernelmind.utils.rewriter import QueryRewriter
 from kernelmind.synthesis import synthesize_answer
 
-# Reranker imports (transformers)
-try:
-    from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
-except Exception:
-    AutoTokenizer = None
-    AutoModelForSequenceClassification = None
-    pipeline = None
-
 # ----------------------------------
 # Init
 # ----------------------------------
-_EMBEDDER = LocalEmbeddingBackend()
-_REWRITER = QueryRewriter()
+# Embedder, rewriter and reranker all live in the model registry and are
+# loaded on first use, so importing this module loads no model.
+_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 
-# Reranker will be created lazily when first used
-_RERANKER = None
-_RERANKER_MODEL = "BAAI/bge-reranker-base"
+_COLLECTION = DEFAULT_COLLECTION
 
 CANDIDATE_MULTIPLIER = 12
 
@@ -39,15 +33,6 @@ TYPE_BOOST = {
     None:       0.00,
 }
 
-BLOCKED_FOLDERS = [
-    "tests/", "test/",
-    "docs/", "docs_src/",
-    "examples/", "example/",
-    "tutorial/", "tutorials/",
-    "benchmarks/", "scripts/",
-    "migrations/",
-]
-
 token_pattern = re.compile(r"\w+")
 
 CALL_PATTERN = re.compile(
@@ -57,9 +42,12 @@ CALL_PATTERN = re.compile(
 def tokenize(text):
     return token_pattern.findall((text or "").lower())
 
+def wants_blocked(query: str):
+    return "test" in query.lower() or "docs" in query.lower()
+
 def should_allow(path: str, query: str):
     p = (path or "").lower()
-    if "test" in query.lower() or "docs" in query.lower():
+    if wants_blocked(query):
         return True
     for bad in BLOCKED_FOLDERS:
         if bad in p:
@@ -105,7 +93,7 @@ def _meta_matches_symbol(meta: dict, sym: str):
         return True
     return False
 
-def expand_call_chain(initial_chunks, repo_name, collection, depth=2, per_symbol=6):
+def expand_call_chain(initial_chunks, repo_name, store, depth=2, per_symbol=6):
     seen = set()
     expanded = []
 
@@ -129,28 +117,25 @@ def expand_call_chain(initial_chunks, repo_name, collection, depth=2, per_symbol
             if meta.get("type") not in ("function", "method"):
                 continue
 
-            symbols = extract_called_symbols(doc)
+            symbols = sorted(extract_called_symbols(doc))
             if not symbols:
                 continue
 
-            for sym in symbols:
-                try:
-                    sym_emb = _EMBEDDER.embed([sym])
-                except Exception:
-                    continue
-
-                try:
-                    raw = collection.query(
-                        query_embeddings=sym_emb,
-                        n_results=per_symbol,
-                        include=["documents", "metadatas", "distances"],
-                    )
-                except Exception:
-                    continue
-
-                docs2 = raw.get("documents", [[]])[0] if raw.get("documents") else []
-                metas2 = raw.get("metadatas", [[]])[0] if raw.get("metadatas") else []
-                dists2 = raw.get("distances", [[]])[0] if raw.get("distances") else [0.0] * len(docs2)
+            # one cached embed + one batched query for every symbol of the chunk
+            try:
+                sym_embs = get_query_cache().embed(models.get_embedder(), symbols)
+                raw = store.query_vectors(
+                    sym_embs,
+                    k=per_symbol,
+                    where=build_where(repo_name, types=("function", "method", "class")),
+                )
+            except Exception:
+                continue
+
+            for n, sym in enumerate(symbols):
+                docs2 = raw["documents"][n] if raw.get("documents") else []
+                metas2 = raw["metadatas"][n] if raw.get("metadatas") else []
+                dists2 = raw["distances"][n] if raw.get("distances") else [0.0] * len(docs2)
 
                 for d2, m2, di2 in zip(docs2, metas2, dists2):
                     if repo_name and m2.get("repo") != repo_name:
@@ -173,22 +158,25 @@ def expand_call_chain(initial_chunks, repo_name, collection, depth=2, per_symbol
 # RERANKER
 # ----------------------------------
 
-from sentence_transformers import CrossEncoder
-
 class Reranker:
-    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    def __init__(self, model_name=_RERANKER_MODEL, device=None):
         self.model_name = model_name
         self.device = None
         self.model = None
-        self._load()
+        self._load(models.resolve_device(device))
+
+    def _load(self, device):
+        from sentence_transformers import CrossEncoder
 
-    def _load(self):
         print("[RERANKER] Initializing cross-encoder...")
+        models.apply_torch_threads()
         try:
-            self.model = CrossEncoder(self.model_name, device="cuda")
-            self.device = "cuda"
+            self.model = CrossEncoder(self.model_name, device=device)
+            self.device = device
         except Exception as e:
-            print("CUDA load failed, falling back to CPU:", e)
+            if device == "cpu":
+                raise
+            print(f"{device} load failed, falling back to CPU:", e)
             self.model = CrossEncoder(self.model_name, device="cpu")
             self.device = "cpu"
 
@@ -202,46 +190,52 @@ class Reranker:
         except RuntimeError as e:
             if "CUDA out of memory" in str(e):
                 print("CUDA OOM during scoring — switching reranker to CPU")
-                self.model = CrossEncoder(self.model_name, device="cpu")
-                self.device = "cpu"
+                self._load("cpu")
                 return self.model.predict(pairs, batch_size=batch_size)
             raise e
 
 def _ensure_reranker():
-    global _RERANKER
-    if _RERANKER is None:
-        print("[RERANKER] Creating new reranker instance...")
-        _RERANKER = Reranker()
-    else:
-        print(f"[RERANKER] Reusing existing reranker on { _RERANKER.device }")
-    return _RERANKER
+    reranker = models.get_model(("reranker", _RERANKER_MODEL), lambda: Reranker(_RERANKER_MODEL))
+    print(f"[RERANKER] Using reranker on { reranker.device }")
+    return reranker
 
 # ----------------------------------
 # MAIN SEARCH
 # ----------------------------------
 
-def search(query, k=5, repo_name=None, synthesize=True, show_chunks=False, use_reranker=True):
-    refined = _REWRITER.rewrite(query)
+def search(query, k=5, repo_name=None, synthesize=True, show_chunks=False, use_reranker=True,
+           types=None, path_prefix=None):
+    refined = models.get_model(("rewriter",), QueryRewriter).rewrite(query)
 
     print("\n--------------------------------------")
     print("Original Query:", query)
     print("Refined Query :", refined)
     print("--------------------------------------\n")
 
-    q_emb = _EMBEDDER.embed([refined])
+    qcache = get_query_cache()
+    embedder = models.get_embedder()
+    store = get_vector_store(_COLLECTION)
+    try:
+        check_index_model(store.metadata, getattr(embedder, "model_name", None), getattr(embedder, "dim", None))
+    except RuntimeError as e:
+        print(e)
+        return None
 
-    client = chromadb.PersistentClient(path=".chromadb")
-    col = client.get_collection("kernelmind_index")
+    q_emb = qcache.embed(embedder, [refined])
+    path_prefix = normalize_prefix(path_prefix)
+
+    # filters run inside the store so every candidate slot is usable;
+    # indexes without the derived fields only get repo / type pushed down
+    if store.has_filter_meta():
+        where = build_where(repo_name, types, wants_blocked(refined), path_prefix)
+    else:
+        where = build_where(repo_name, types)
 
     n_candidates = max(k * CANDIDATE_MULTIPLIER, k + 10)
     try:
-        raw = col.query(
-            query_embeddings=q_emb,
-            n_results=n_candidates,
-            include=["documents", "metadatas", "distances"],
-        )
+        raw = store.query_vectors(q_emb, k=n_candidates, where=where)
     except Exception as e:
-        print("Chroma dense query failed:", e)
+        print("Dense query failed:", e)
         return None
 
     docs = raw.get("documents", [[]])[0] if raw.get("documents") else []
@@ -254,6 +248,8 @@ def search(query, k=5, repo_name=None, synthesize=True, show_chunks=False, use_r
             continue
         if not should_allow(meta.get("path", ""), refined):
             continue
+        if not matches_prefix(meta.get("path"), path_prefix):
+            continue
         candidates.append({"doc": doc, "meta": meta, "dist": dist})
 
     if len(candidates) == 0:
@@ -262,9 +258,16 @@ def search(query, k=5, repo_name=None, synthesize=True, show_chunks=False, use_r
         return None
 
     initial = [(c["doc"], c["meta"], c["dist"]) for c in candidates[:k]]
-    expanded = expand_call_chain(initial, repo_name, col, depth=2, per_symbol=6)
+    expanded = expand_call_chain(initial, repo_name, store, depth=2, per_symbol=6)
     merged = expanded if expanded else initial
 
+    qstats = qcache.stats()
+    print(
+        f"[QCACHE] {qstats['hits']} hits, {qstats['misses']} misses, "
+        f"{qstats['size']} cached query/symbol embeddings"
+    )
+    qcache.save()
+
     docs2 = [t[0] for t in merged]
     metas2 = [t[1] for t in merged]
     dists2 = [float(t[2]) for t in merged]
@@ -0,0 +1,156 @@
+import io
+import os
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+
+from kernelmind import config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# one-byte codec header in front of every blob
+_ZLIB = b"z"
+_ZSTD = b"s"
+
+# decoded blobs kept in memory; chunking slices the same file many times
+CACHE_SIZE = 256
+
+
+class BlobStore:
+    """
+    Source text stored once per sha256, compressed with zstd when the
+    `zstandard` package is available and zlib otherwise. The key is the
+    same hash the parsers compute, so identical files in different repos
+    or snapshots share one blob and metadata only needs the hash.
+    """
+
+    def __init__(self, root, fallback=None):
+        self.root = root
+        # read-only location of blobs written before per-backend roots
+        self.fallback = fallback
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, digest, root=None):
+        return os.path.join(root or self.root, digest[:2], digest[2:])
+
+    def _existing(self, digest):
+        path = self._path(digest)
+        if self.fallback and not os.path.exists(path):
+            legacy = self._path(digest, self.fallback)
+            if os.path.exists(legacy):
+                return legacy
+        return path
+
+    def has(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def put(self, text, digest=None):
+        """Store text and return its sha256. Existing blobs are not rewritten."""
+        data = text.encode()
+        digest = digest or hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            # refresh the mtime so gc sees the blob as in use again
+            try:
+                os.utime(path)
+                return digest
+            except FileNotFoundError:
+                pass
+
+        if zstandard is not None:
+            payload = _ZSTD + zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            payload = _ZLIB + zlib.compress(data, 6)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        return digest
+
+    def get(self, digest):
+        """Decoded text for a hash, or None if the blob is missing."""
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+
+        try:
+            with open(self._existing(digest), "rb") as f:
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+
+        codec, body = payload[:1], payload[1:]
+        if codec == _ZSTD:
+            if zstandard is None:
+                raise RuntimeError("blob is zstd-compressed but zstandard is not installed")
+            data = zstandard.ZstdDecompressor().decompress(body)
+        else:
+            data = zlib.decompress(body)
+        text = data.decode()
+
+        with self._lock:
+            self._cache[digest] = text
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return text
+
+    def lines(self, digest, start, end):
+        """Lines start..end (1-based, inclusive) of a blob."""
+        text = self.get(digest)
+        if text is None:
+            return None
+        return "".join(io.StringIO(text).readlines()[start - 1:end])
+
+    def delete(self, digest):
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._cache.pop(digest, None)
+
+    def iter_hashes(self):
+        if not os.path.isdir(self.root):
+            return
+        for prefix in os.listdir(self.root):
+            folder = os.path.join(self.root, prefix)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if not name.endswith(".tmp"):
+                    yield prefix + name
+
+    def mtime(self, digest):
+        try:
+            return os.path.getmtime(self._path(digest))
+        except FileNotFoundError:
+            return None
+
+    def size_of(self, digest):
+        try:
+            return os.path.getsize(self._existing(digest))
+        except FileNotFoundError:
+            return 0
+
+
+_BLOBS = None
+
+
+def get_blob_store():
+    """
+    Blob store of the current metadata backend. Each backend gets its own
+    directory, so gc only sweeps blobs whose references it can see.
+    """
+    global _BLOBS
+    root = os.path.join(config.BLOB_DIR, config.METADATA_BACKEND)
+    if _BLOBS is None or _BLOBS.root != root:
+        _BLOBS = BlobStore(root, fallback=config.BLOB_DIR)
+    return _BLOBS
@@ -1,5 +1,8 @@
+import io
 import os
 
+from kernelmind.utils.blob_store import get_blob_store
+
 def load_file_lines(absolute_path):
     with open(absolute_path, "r", encoding="utf-8") as f:
         return f.readlines()
@@ -9,37 +12,200 @@ def extract_chunk(text_lines, start, end):
     return "".join(text_lines[start - 1:end])
 
 
-def build_text_chunks(context_pack, repo_root):
+# input window of BAAI/bge-base-en; anything past it is truncated
+MAX_TOKENS = 512
+# reserved for the "# file: ..." header and the [CLS]/[SEP] tokens
+HEADER_TOKENS = 48
+# tokens repeated at the start of the next window when a unit is split
+OVERLAP_TOKENS = 64
+# longest def/class header kept in a skeleton
+SIGNATURE_MAX_LINES = 8
+
+
+def approx_token_lengths(texts):
+    """~4 characters per token, used when no tokenizer is at hand."""
+    return [len(t) // 4 + 1 for t in texts]
+
+
+def _windows(line_tokens, budget, overlap=OVERLAP_TOKENS):
+    """
+    Split lines into [start, end) index ranges of at most `budget` tokens,
+    each starting ~`overlap` tokens before the previous one ended. A
+    single line over budget becomes a window of its own.
+    """
+    windows = []
+    i, n = 0, len(line_tokens)
+    while i < n:
+        j, used = i, 0
+        while j < n and (j == i or used + line_tokens[j] <= budget):
+            used += line_tokens[j]
+            j += 1
+        windows.append((i, j))
+        if j >= n:
+            break
+
+        k, back = j, 0
+        while k - 1 > i and back + line_tokens[k - 1] <= overlap:
+            k -= 1
+            back += line_tokens[k]
+        i = k
+    return windows
+
+
+def _header(fields):
+    return "".join(f"# {k}: {v}\n" for k, v in fields) + "\n"
+
+
+def _fit(chunk, fields, body, first_line, token_lengths, max_tokens):
+    """
+    One chunk if `body` fits the window, else overlapping part chunks
+    that link back to the unit through `parent`. `first_line` is the
+    source line of body[0], or None when body is a synthetic skeleton.
+
+    Line spans go to the chunk's start/end only, never into its text: the
+    text feeds the chunk id and the embedding cache key, which must not
+    change when unrelated lines above the unit move it.
+    """
+    line_tokens = token_lengths(body) if body else []
+    budget = max_tokens - HEADER_TOKENS
+
+    if sum(line_tokens) <= budget:
+        chunk["text"] = _header(fields) + "".join(body)
+        return [chunk]
+
+    windows = _windows(line_tokens, budget)
+    parent = f"{chunk['path']}::{chunk.get('qualified_name') or chunk['type']}"
+    parts = []
+    for n, (i, j) in enumerate(windows, 1):
+        part = dict(chunk, parent=parent, part=n)
+        if first_line is not None:
+            part["start"], part["end"] = first_line + i, first_line + j - 1
+        part["text"] = _header(fields + [("part", f"{n}/{len(windows)}")]) + "".join(body[i:j])
+        parts.append(part)
+    return parts
+
+
+# ----------------------------------
+# Skeletons (signatures + docstrings)
+# ----------------------------------
+
+def _signature(lines, item):
+    start = item["start_line"]
+    end = item.get("signature_end") or start
+    end = min(max(end, start), item["end_line"], start + SIGNATURE_MAX_LINES - 1)
+    sig = lines[start - 1:end]
+    return [l if l.endswith("\n") else l + "\n" for l in sig]
+
+
+def _indent_of(line):
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _doc(text, indent, python, first_paragraph=False):
+    if not text:
+        return []
+    text = text.strip()
+    if first_paragraph:
+        text = text.split("\n\n")[0]
+    doc = text.splitlines()
+    if python:
+        doc[0] = '"""' + doc[0]
+        doc[-1] = doc[-1] + '"""'
+        return [f"{indent}{l}\n" if l else "\n" for l in doc]
+    return [f"{indent}// {l}\n" if l else f"{indent}//\n" for l in doc]
+
+
+def _member_skeleton(lines, item, python):
+    sig = _signature(lines, item)
+    if not sig:
+        return []
+    inner = _indent_of(sig[0]) + "    "
+    return sig + _doc(item.get("docstring"), inner, python, first_paragraph=True) + [f"{inner}...\n"]
+
+
+def _class_skeleton(lines, cls, methods, python):
+    sig = _signature(lines, cls)
+    inner = _indent_of(sig[0]) + "    " if sig else "    "
+    body = sig + _doc(cls.get("docstring"), inner, python)
+    for m in methods:
+        body += _member_skeleton(lines, m, python)
+    return body
+
+
+def _file_skeleton(lines, pack, python):
+    body = _doc(pack["file"].get("docstring"), "", python)
+    # parser packs list module names, stored packs the import documents
+    imports = [imp["import"] if isinstance(imp, dict) else imp for imp in pack.get("imports") or []]
+    if imports:
+        body.append(f"# imports: {', '.join(imports)}\n")
+
+    by_class = {}
+    for m in pack["methods"]:
+        by_class.setdefault(m.get("class"), []).append(m)
+
+    top = [("function", fn) for fn in pack["functions"]] + [("class", c) for c in pack["classes"]]
+    for kind, item in sorted(top, key=lambda t: t[1]["start_line"]):
+        if body:
+            body.append("\n")
+        if kind == "function":
+            body += _member_skeleton(lines, item, python)
+        else:
+            sig = _signature(lines, item)
+            inner = _indent_of(sig[0]) + "    " if sig else "    "
+            body += sig + _doc(item.get("docstring"), inner, python, first_paragraph=True)
+            body += [l for m in by_class.get(item["name"], []) for l in _signature(lines, m)]
+    return body
+
+
+def build_text_chunks(context_pack, repo_root, token_lengths=None, max_tokens=MAX_TOKENS):
+    """
+    Chunks for one code file, each sized for the embedder window.
+
+    Functions and methods carry their source; file and class chunks are
+    skeletons of signatures and docstrings (the bodies live in their own
+    chunks). A unit over `max_tokens` - measured with `token_lengths`,
+    the embedder tokenizer when given - is split into overlapping parts.
+    """
+    token_lengths = token_lengths or approx_token_lengths
     file_path = context_pack["file"]["path"]
     absolute = os.path.join(repo_root, file_path)
     repo = context_pack.get("repo", None)
+    python = file_path.endswith(".py")
 
-    lines = load_file_lines(absolute)
+    # reuse the source the parser already read when the pack carries it,
+    # then the blob store, and only then the file on disk
+    source_text = context_pack["file"].get("source")
+    if source_text is None and context_pack["file"].get("hash"):
+        source_text = get_blob_store().get(context_pack["file"]["hash"])
+    if source_text is not None:
+        lines = io.StringIO(source_text).readlines()
+    else:
+        lines = load_file_lines(absolute)
     chunks = []
 
-    
+    by_class = {}
+    for m in context_pack["methods"]:
+        by_class.setdefault(m.get("class", ""), []).append(m)
+    for members in by_class.values():
+        members.sort(key=lambda m: m["start_line"])
+
     # ----------------------------------
     # File-level chunk
     # ----------------------------------
     start = 1
     end = len(lines)
-    source = extract_chunk(lines, start, end)
+    has_symbols = context_pack["functions"] or context_pack["classes"]
 
-    text = (
-        f"# file: {file_path}\n"
-        f"# type: file\n"
-        f"# lines: {start}-{end}\n\n"
-        f"{source}"
-    )
+    if has_symbols:
+        body, first = _file_skeleton(lines, context_pack, python), None
+    else:
+        body, first = lines, start
 
-    chunks.append({
-        "type": "file",
-        "path": file_path,
-        "repo": repo,
-        "start": start,
-        "end": end,
-        "text": text
-    })
+    chunks += _fit(
+        {"type": "file", "path": file_path, "repo": repo, "start": start, "end": end},
+        [("file", file_path), ("type", "file")],
+        body, first, token_lengths, max_tokens,
+    )
 
     # ----------------------------------
     # Functions
@@ -47,59 +213,58 @@ def build_text_chunks(context_pack, repo_root):
     for fn in context_pack["functions"]:
         start = fn["start_line"]
         end = fn["end_line"]
-        source = extract_chunk(lines, start, end)
 
         q = fn.get("qualified_name", fn["name"])
 
-        text = (
-            f"# file: {file_path}\n"
-            f"# function: {fn['name']}\n"
-            f"# qualified: {q}\n"
-            f"# args: {', '.join(fn.get('args', []))}\n"
-            f"# lines: {start}-{end}\n\n"
-            f"{source}"
+        chunks += _fit(
+            {
+                "type": "function",
+                "path": file_path,
+                "name": fn["name"],
+                "qualified_name": q,
+                "args": fn.get("args", []),
+                "repo": repo,
+                "start": start,
+                "end": end,
+            },
+            [
+                ("file", file_path),
+                ("function", fn["name"]),
+                ("qualified", q),
+                ("args", ", ".join(fn.get("args", []))),
+            ],
+            lines[start - 1:end], start, token_lengths, max_tokens,
         )
 
-        chunks.append({
-            "type": "function",
-            "path": file_path,
-            "name": fn["name"],
-            "qualified_name": q,
-            "args": fn.get("args", []),
-            "repo": repo,
-            "start": start,
-            "end": end,
-            "text": text
-        })
-
     # ----------------------------------
     # Classes
     # ----------------------------------
     for cls in context_pack["classes"]:
         start = cls["start_line"]
         end = cls["end_line"]
-        source = extract_chunk(lines, start, end)
 
         q = cls.get("qualified_name", cls.get("name", ""))
+        methods = by_class.get(cls["name"], [])
 
-        text = (
-            f"# file: {file_path}\n"
-            f"# class: {cls['name']}\n"
-            f"# qualified: {q}\n"
-            f"# lines: {start}-{end}\n\n"
-            f"{source}"
-        )
+        # a class without methods keeps its source (fields, constants, ...)
+        if methods:
+            body, first = _class_skeleton(lines, cls, methods, python), None
+        else:
+            body, first = lines[start - 1:end], start
 
-        chunks.append({
-            "type": "class",
-            "path": file_path,
-            "name": cls["name"],
-            "qualified_name": q,
-            "repo": repo,
-            "start": start,
-            "end": end,
-            "text": text
-        })
+        chunks += _fit(
+            {
+                "type": "class",
+                "path": file_path,
+                "name": cls["name"],
+                "qualified_name": q,
+                "repo": repo,
+                "start": start,
+                "end": end,
+            },
+            [("file", file_path), ("class", cls["name"]), ("qualified", q)],
+            body, first, token_lengths, max_tokens,
+        )
 
     # ----------------------------------
     # Methods
@@ -107,31 +272,29 @@ def build_text_chunks(context_pack, repo_root):
     for m in context_pack["methods"]:
         start = m["start_line"]
         end = m["end_line"]
-        source = extract_chunk(lines, start, end)
 
         q = m.get("qualified_name", f"{m.get('class','')}.{m['name']}")
 
-        text = (
-            f"# file: {file_path}\n"
-            f"# class: {m.get('class','')}\n"
-            f"# method: {m['name']}\n"
-            f"# qualified: {q}\n"
-            f"# args: {', '.join(m.get('args', []))}\n"
-            f"# lines: {start}-{end}\n\n"
-            f"{source}"
+        chunks += _fit(
+            {
+                "type": "method",
+                "path": file_path,
+                "name": m["name"],
+                "qualified_name": q,
+                "class": m.get("class", ""),
+                "args": m.get("args", []),
+                "repo": repo,
+                "start": start,
+                "end": end,
+            },
+            [
+                ("file", file_path),
+                ("class", m.get("class", "")),
+                ("method", m["name"]),
+                ("qualified", q),
+                ("args", ", ".join(m.get("args", []))),
+            ],
+            lines[start - 1:end], start, token_lengths, max_tokens,
         )
 
-        chunks.append({
-            "type": "method",
-            "path": file_path,
-            "name": m["name"],
-            "qualified_name": q,
-            "class": m.get("class", ""),
-            "args": m.get("args", []),
-            "repo": repo,
-            "start": start,
-            "end": end,
-            "text": text
-        })
-
     return chunks
@@ -1,50 +1,42 @@
-from pymongo import MongoClient
-
-client = MongoClient("mongodb://localhost:27017")
-db = client.kernelmind
+from kernelmind.metadata_store.factory import get_store
+
+# files per batched lookup when streaming a whole repo
+PACK_BATCH = 200
+
+
+def build_context_packs(file_paths, repo_name):
+    """
+    Context packs for many files at once (one batched query per
+    collection). Returns {path: pack} for every path with a file record.
+    """
+    file_paths = list(file_paths)
+    if not file_paths:
+        return {}
+    return get_store().context_packs(repo_name, file_paths)
+
+
+def iter_context_packs(repo_name, batch_size=PACK_BATCH):
+    """
+    Stream (path, pack) for every code file of a repo, batch_size files
+    per round of batched queries, so whole-repo chunking never holds more
+    than one batch in memory.
+    """
+    batch = []
+    for path in get_store().file_paths(repo_name):
+        batch.append(path)
+        if len(batch) >= batch_size:
+            packs = build_context_packs(batch, repo_name)
+            for p in batch:
+                if p in packs:
+                    yield p, packs[p]
+            batch = []
+
+    if batch:
+        packs = build_context_packs(batch, repo_name)
+        for p in batch:
+            if p in packs:
+                yield p, packs[p]
 
 
 def build_context_pack(file_path, repo_name):
-    # ---- file metadata ----
-    file_doc = db.files.find_one({
-        "path": file_path,
-        "repo": repo_name
-    })
-
-    if not file_doc:
-        return None
-
-    # ---- code-structure elements ----
-    imports = list(db.imports.find({
-        "file": file_path,
-        "repo": repo_name
-    }))
-
-    functions = list(db.functions.find({
-        "path": file_path,
-        "repo": repo_name
-    }))
-
-    classes = list(db.classes.find({
-        "path": file_path,
-        "repo": repo_name
-    }))
-
-    methods = list(db.methods.find({
-        "path": file_path,
-        "repo": repo_name
-    }))
-
-    config = db.configs.find_one({
-        "file": file_path,
-        "repo": repo_name
-    })
-
-    return {
-        "file": file_doc,
-        "imports": imports,
-        "functions": functions,
-        "classes": classes,
-        "methods": methods,
-        "config": config,      # <---- THE IMPORTANT NEW PART
-    }
+    return build_context_packs([file_path], repo_name).get(file_path)
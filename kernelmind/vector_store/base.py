@@ -0,0 +1,139 @@
+from kernelmind.vector_store.compact import get_transform, legacy_transform_path
+from kernelmind.vector_store.filters import FILTER_META_FLAG
+
+
+def check_index_model(metadata, model_name, dim):
+    """
+    Raise if an index was built with another embedding model or width.
+    Variants of one model ("<model>@onnx-int8") share a vector space.
+    """
+    metadata = metadata or {}
+    have_model, have_dim = metadata.get("embed_model"), metadata.get("embed_dim")
+    if not have_model:
+        return
+    model_name = (model_name or "").split("@")[0]
+    if have_model != model_name or (dim and have_dim and int(have_dim) != int(dim)):
+        raise RuntimeError(
+            f"Index was built with {have_model} ({have_dim} dims); the embedder is "
+            f"{model_name} ({dim} dims). Re-embed the index or switch backends."
+        )
+
+
+def clean_metas(metadatas):
+    """Metadata values reduced to the scalar types every backend stores."""
+    clean = []
+    for meta in metadatas:
+        fixed = {}
+        for k, v in meta.items():
+            if v is None:
+                fixed[k] = ""
+            elif isinstance(v, (bool, int, float, str)):
+                fixed[k] = v
+            else:
+                fixed[k] = str(v)
+        clean.append(fixed)
+    return clean
+
+
+# ============================================================
+# Interface
+# ============================================================
+
+class BaseVectorStore:
+    """
+    Chunk vectors, documents and metadata of one index. Embeddings come
+    in model space; `transform` maps them to the (possibly compact) space
+    the index stores, on write and on query.
+
+    Query and get results use Chroma's shape: {"ids", "documents",
+    "metadatas", "distances"}, one row per query for query_vectors().
+    Distances are squared l2.
+    """
+
+    def __init__(self, name, transform_path, legacy_key=None):
+        self.name = name
+        # the fitted compact transform lives with the index it belongs to
+        self.transform_path = transform_path
+        self.transform = get_transform(transform_path, legacy=legacy_transform_path(legacy_key or name))
+
+    def to_index_space(self, vectors):
+        return vectors if self.transform.identity else self.transform.apply(vectors)
+
+    # ---- index-level metadata ----
+
+    @property
+    def metadata(self):
+        raise NotImplementedError
+
+    def user_metadata(self):
+        # hnsw:* settings are fixed at creation and may not be re-sent
+        return {k: v for k, v in self.metadata.items() if not k.startswith("hnsw:")}
+
+    def _set_metadata(self, **updates):
+        raise NotImplementedError
+
+    def ensure_model(self, model_name, dim):
+        """Check the embedder against the index, recording it on first use."""
+        check_index_model(self.metadata, model_name, dim)
+        if not self.metadata.get("embed_model") and model_name:
+            self._set_metadata(embed_model=model_name.split("@")[0], embed_dim=int(dim or 0))
+
+    def has_filter_meta(self):
+        return bool(self.metadata.get(FILTER_META_FLAG))
+
+    def ensure_filter_meta(self, page=5000, log=print):
+        """Make sure every chunk carries the blocked / top_dir metadata search filters on."""
+        raise NotImplementedError
+
+    # ---- writes ----
+
+    def add(self, ids, embeddings, documents, metadatas, transformed=False):
+        """Insert chunks; `transformed` embeddings are already in the index space."""
+        raise NotImplementedError
+
+    def upsert(self, ids, embeddings, documents, metadatas, transformed=False):
+        """Insert new ids and overwrite existing ones in place."""
+        raise NotImplementedError
+
+    def update_metadata(self, ids, metadatas):
+        """Overwrite the metadata of stored chunks, leaving their vectors alone."""
+        raise NotImplementedError
+
+    def delete_ids(self, ids):
+        raise NotImplementedError
+
+    def delete_file(self, repo, path):
+        """Remove every chunk stored for one file of a repo."""
+        raise NotImplementedError
+
+    def delete_repo(self, repo):
+        """Remove every chunk stored for a repo."""
+        raise NotImplementedError
+
+    def rewrite(self, transform, log=print):
+        """Replace every stored vector v with transform.apply(v); returns the count."""
+        raise NotImplementedError
+
+    # ---- reads ----
+
+    def count(self):
+        raise NotImplementedError
+
+    def file_metas(self, repo, path):
+        """{id: metadata} of every chunk stored for one file of a repo."""
+        raise NotImplementedError
+
+    def iter_pages(self, include=("embeddings",), page=5000):
+        """Yield get()-shaped pages over the whole index."""
+        raise NotImplementedError
+
+    def repo_stats(self, page=5000):
+        """{repo: {"chunks": n, "bytes": chunk text bytes}} across the whole index."""
+        raise NotImplementedError
+
+    def get(self, ids):
+        raise NotImplementedError
+
+    def query_vectors(self, embeddings, k=10, where=None):
+        """Nearest chunks for a batch of model-space query vectors."""
+        raise NotImplementedError
@@ -0,0 +1,64 @@
+import time
+
+import numpy as np
+
+from kernelmind.vector_store.compact import set_transform, sample_vectors
+
+
+def copy_index(src, dst, page=2000, log=print):
+    """
+    Rebuild `dst` as a copy of `src` (any two backends): vectors are copied
+    as stored, together with the index metadata and compact transform.
+    """
+    stale = [cid for batch in dst.iter_pages(include=()) for cid in batch["ids"]]
+    dst.delete_ids(stale)
+    set_transform(dst.transform_path, src.transform)
+    dst.transform = src.transform
+    dst._set_metadata(**src.user_metadata())
+
+    total = 0
+    for batch in src.iter_pages(include=("embeddings", "documents", "metadatas"), page=page):
+        dst.upsert(batch["ids"], np.asarray(batch["embeddings"]), batch["documents"], batch["metadatas"], transformed=True)
+        total += len(batch["ids"])
+        log(f"  copied {total} vectors")
+    return total
+
+
+def _timed(store, queries, k, where):
+    times, found = [], []
+    for q in queries:
+        start = time.perf_counter()
+        res = store.query_vectors(q[None, :], k=k, where=where)
+        times.append(time.perf_counter() - start)
+        found.append(set(res["ids"][0]))
+    start = time.perf_counter()
+    store.query_vectors(queries, k=k, where=where)
+    batch = time.perf_counter() - start
+    return times, batch, found
+
+
+def compare_backends(stores, reference, count=200, k=10, where=None):
+    """
+    Query latency and recall@k of every {label: store} against the exact
+    results of `stores[reference]`. Stored vectors of the reference
+    double as queries, so its index must not be compact.
+    """
+    queries = sample_vectors(stores[reference], size=count)
+    if not len(queries):
+        return []
+
+    runs = {label: _timed(store, queries, k, where) for label, store in stores.items()}
+    truth = runs[reference][2]
+
+    rows = []
+    for label, (times, batch, found) in runs.items():
+        recall = np.mean([len(a & b) / max(len(b), 1) for a, b in zip(found, truth)])
+        rows.append({
+            "backend": label,
+            "queries": len(queries),
+            "p50_ms": float(np.percentile(times, 50) * 1000),
+            "p95_ms": float(np.percentile(times, 95) * 1000),
+            "batch_ms": batch * 1000 / len(queries),
+            "recall": float(recall),
+        })
+    return rows
@@ -1,44 +1,206 @@
+import os
+import threading
+
 import chromadb
 
-class VectorStore:
-    def __init__(self, collection_name="kernelmind_index"):
-        self.client = chromadb.PersistentClient(path=".chromadb")
+from kernelmind import config
+from kernelmind.vector_store.base import BaseVectorStore, clean_metas
+from kernelmind.vector_store.filters import filter_meta, FILTER_META_FLAG
+
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(path=None):
+    """One Chroma client per index directory for the whole process."""
+    path = os.path.abspath(path or config.INDEX_DIR)
+    with _CLIENTS_LOCK:
+        if path not in _CLIENTS:
+            if not os.path.isdir(path) and os.path.isdir(".chromadb"):
+                print(
+                    f"[INDEX] No index at {path}, but ./.chromadb exists (the old per-directory "
+                    f"location). Move it there or set KERNELMIND_INDEX={os.path.abspath('.chromadb')}"
+                )
+            _CLIENTS[path] = chromadb.PersistentClient(path=path)
+        return _CLIENTS[path]
+
+
+class VectorStore(BaseVectorStore):
+    """Chroma collection in a persistent client (HNSW, approximate)."""
+
+    def __init__(self, collection_name="kernelmind_index", path=None):
+        path = os.path.abspath(path or config.INDEX_DIR)
+        super().__init__(collection_name, os.path.join(path, f"{collection_name}.transform.npz"))
+        self.client = get_client(path)
         self.collection = self.client.get_or_create_collection(collection_name)
 
-    def add(self, ids, embeddings, documents, metadatas):
+    @property
+    def metadata(self):
+        return self.collection.metadata or {}
+
+    def _set_metadata(self, **updates):
+        metadata = self.user_metadata()
+        metadata.update(updates)
+        self.collection.modify(metadata=metadata)
+
+    def ensure_filter_meta(self, page=5000, log=print):
         """
-        Adds vectors in safe batches. Chroma cannot handle > ~5461 items per batch.
+        Make sure every chunk carries the blocked / top_dir metadata search
+        filters on. Indexes from before it existed are backfilled once.
         """
+        if self.has_filter_meta():
+            return 0
+        updated = 0
+        if self.collection.count():
+            log("Backfilling search filter metadata on existing chunks...")
+            for batch in self.iter_pages(include=("metadatas",), page=page):
+                ids, metas = [], []
+                for cid, meta in zip(batch["ids"], batch["metadatas"]):
+                    if "blocked" in meta and "top_dir" in meta:
+                        continue
+                    ids.append(cid)
+                    metas.append({**meta, **filter_meta(meta.get("path"))})
+                if ids:
+                    self.collection.update(ids=ids, metadatas=metas)
+                    updated += len(ids)
+        self._set_metadata(**{FILTER_META_FLAG: True})
+        return updated
 
+    def _write(self, op, ids, embeddings, documents, metadatas, transformed=False):
+        """
+        Writes vectors in safe batches. Chroma cannot handle > ~5461 items per batch.
+        """
         # Clean metadata to satisfy Chroma restrictions
-        clean_metas = []
-        for meta in metadatas:
-            fixed = {}
-            for k, v in meta.items():
-                if v is None:
-                    fixed[k] = ""
-                elif isinstance(v, (bool, int, float, str)):
-                    fixed[k] = v
-                else:
-                    fixed[k] = str(v)
-            clean_metas.append(fixed)
+        metas = clean_metas(metadatas)
+        if not transformed:
+            embeddings = self.to_index_space(embeddings)
 
         # Chroma batch safety margin
         BATCH = 2000
 
-        # Add in slices
         for i in range(0, len(ids), BATCH):
             j = i + BATCH
-            self.collection.add(
+            op(
                 ids=ids[i:j],
                 embeddings=embeddings[i:j],
                 documents=documents[i:j],
-                metadatas=clean_metas[i:j],
+                metadatas=metas[i:j],
+            )
+
+    def add(self, ids, embeddings, documents, metadatas, transformed=False):
+        self._write(self.collection.add, ids, embeddings, documents, metadatas, transformed)
+
+    def upsert(self, ids, embeddings, documents, metadatas, transformed=False):
+        self._write(self.collection.upsert, ids, embeddings, documents, metadatas, transformed)
+
+    def update_metadata(self, ids, metadatas):
+        metas = clean_metas(metadatas)
+        for i in range(0, len(ids), 2000):
+            self.collection.update(ids=ids[i:i + 2000], metadatas=metas[i:i + 2000])
+
+    def file_metas(self, repo, path):
+        res = self.collection.get(where={"$and": [{"repo": repo}, {"path": path}]}, include=["metadatas"])
+        return dict(zip(res.get("ids") or [], res.get("metadatas") or []))
+
+    def delete_ids(self, ids):
+        ids = list(ids)
+        for i in range(0, len(ids), 2000):
+            self.collection.delete(ids=ids[i:i + 2000])
+
+    def delete_file(self, repo, path):
+        self.collection.delete(where={"$and": [{"repo": repo}, {"path": path}]})
+
+    def delete_repo(self, repo):
+        self.collection.delete(where={"repo": repo})
+
+    def rewrite(self, transform, log=print):
+        """
+        Pages are projected into a side collection which then replaces the
+        original; Chroma cannot change the width of a collection in place.
+        The original is kept under a backup name until the swap is done.
+        """
+        side_name = f"{self.name}__compact"
+        backup_name = f"{self.name}__backup"
+        if self._exists(backup_name):
+            raise RuntimeError(
+                f"{backup_name} is left over from an interrupted compact and holds the "
+                f"original vectors. Check {self.name}, then delete or restore the backup."
+            )
+        if self._exists(side_name):
+            self.client.delete_collection(side_name)
+        # carry the index-level metadata (embedding model, filter flag) over
+        side = self.client.create_collection(side_name, metadata=self.user_metadata() or None)
+
+        total = 0
+        for batch in self.iter_pages(include=("embeddings", "documents", "metadatas")):
+            side.add(
+                ids=batch["ids"],
+                embeddings=transform.apply(batch["embeddings"]),
+                documents=batch["documents"],
+                metadatas=batch["metadatas"],
             )
+            total += len(batch["ids"])
+            log(f"  rewrote {total} vectors")
+
+        self.collection.modify(name=backup_name)
+        try:
+            side.modify(name=self.name)
+        except Exception:
+            self.collection.modify(name=self.name)
+            raise
+        self.collection = self.client.get_collection(self.name)
+        self.client.delete_collection(backup_name)
+        return total
+
+    def _exists(self, name):
+        try:
+            self.client.get_collection(name)
+        except Exception:
+            return False
+        return True
+
+    def count(self):
+        return self.collection.count()
+
+    def iter_pages(self, include=("embeddings",), page=5000):
+        offset = 0
+        while True:
+            batch = self.collection.get(include=list(include), limit=page, offset=offset)
+            if not batch.get("ids"):
+                break
+            yield batch
+            offset += len(batch["ids"])
+
+    def repo_stats(self, page=5000):
+        stats = {}
+        offset = 0
+        while True:
+            batch = self.collection.get(
+                include=["metadatas", "documents"], limit=page, offset=offset
+            )
+            metas = batch.get("metadatas") or []
+            docs = batch.get("documents") or []
+            if not metas:
+                break
+            for meta, doc in zip(metas, docs):
+                entry = stats.setdefault(meta.get("repo"), {"chunks": 0, "bytes": 0})
+                entry["chunks"] += 1
+                entry["bytes"] += len((doc or "").encode())
+            offset += len(metas)
+        return stats
 
     def get(self, ids):
         return self.collection.get(ids=ids)
 
+    def query_vectors(self, embeddings, k=10, where=None):
+        return self.collection.query(
+            query_embeddings=self.to_index_space(embeddings),
+            n_results=k,
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+
     def query(self, text, k=5):
         return self.collection.query(
             query_texts=[text],
@@ -0,0 +1,222 @@
+import os
+import json
+import shutil
+
+import numpy as np
+
+from kernelmind import config
+
+# Chroma's default HNSW keeps ~2 * M (M=16) int32 links per vector on level 0
+HNSW_LINK_BYTES = 2 * 16 * 4
+
+# vectors used to fit a PCA; more adds little for 768-d embeddings
+FIT_SAMPLE = 20000
+
+
+def _normalize(vecs):
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs / np.clip(norms, 1e-12, None)
+
+
+class VectorTransform:
+    """
+    Maps model-space vectors into the compact space an index stores.
+
+    mode "none" keeps the vectors, "truncate" keeps the first `dims`
+    components and "pca" projects onto the top `dims` principal
+    components fitted on the index. Outputs are re-normalized so l2 and
+    cosine rankings agree. `fp16` rounds through float16: Chroma still
+    keeps float32, so there it only records the choice; the flat backend
+    stores half precision natively.
+    """
+
+    def __init__(self, mode="none", dims=None, fp16=False, mean=None, components=None):
+        self.mode = mode
+        self.dims = dims
+        self.fp16 = fp16
+        self.mean = mean
+        self.components = components
+
+    @property
+    def identity(self):
+        return self.mode == "none" and not self.fp16
+
+    @classmethod
+    def fit(cls, vectors, mode="pca", dims=256, fp16=False):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if mode == "pca":
+            sample = vectors
+            if len(sample) > FIT_SAMPLE:
+                pick = np.random.default_rng(0).choice(len(sample), FIT_SAMPLE, replace=False)
+                sample = sample[pick]
+            mean = sample.mean(axis=0)
+            # rows of vt are the principal axes, strongest first
+            _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+            return cls("pca", dims, fp16, mean=mean, components=vt[:dims].copy())
+        if mode in ("truncate", "none"):
+            return cls(mode, dims if mode == "truncate" else None, fp16)
+        raise ValueError(f"Unknown compact mode: {mode}")
+
+    def apply(self, vectors):
+        vecs = np.asarray(vectors, dtype=np.float32)
+        if vecs.ndim == 1:
+            vecs = vecs[None, :]
+        if self.mode == "pca":
+            vecs = _normalize((vecs - self.mean) @ self.components.T)
+        elif self.mode == "truncate":
+            vecs = _normalize(vecs[:, :self.dims])
+        if self.fp16:
+            vecs = vecs.astype(np.float16).astype(np.float32)
+        return vecs
+
+    def bytes_per_vector(self, full_dims):
+        return (self.dims or full_dims) * (2 if self.fp16 else 4)
+
+    # ---------------------------------
+    # persistence
+    # ---------------------------------
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".part.npz"
+        np.savez(
+            tmp,
+            meta=np.array(json.dumps({"mode": self.mode, "dims": self.dims, "fp16": self.fp16})),
+            mean=self.mean if self.mean is not None else np.zeros(0, dtype=np.float32),
+            components=self.components if self.components is not None else np.zeros((0, 0), dtype=np.float32),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        data = np.load(path)
+        meta = json.loads(str(data["meta"]))
+        mean = data["mean"] if data["mean"].size else None
+        components = data["components"] if data["components"].size else None
+        return cls(meta["mode"], meta["dims"], meta["fp16"], mean=mean, components=components)
+
+
+def legacy_transform_path(key):
+    """Where transforms lived before they moved next to their index."""
+    return os.path.join(config.TRANSFORM_DIR, f"{key}.npz")
+
+
+_TRANSFORMS = {}
+
+
+def get_transform(path, legacy=None):
+    """
+    The transform stored at `path`, loaded once per process. A transform
+    still at its `legacy` location is moved to `path` first.
+    """
+    if path not in _TRANSFORMS:
+        if legacy and not os.path.exists(path) and os.path.exists(legacy):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.move(legacy, path)
+        _TRANSFORMS[path] = VectorTransform.load(path)
+    return _TRANSFORMS[path]
+
+
+def reload_transform(path):
+    """Re-read a transform another process may have replaced."""
+    _TRANSFORMS[path] = VectorTransform.load(path)
+    return _TRANSFORMS[path]
+
+
+def set_transform(path, transform):
+    if transform.identity:
+        if os.path.exists(path):
+            os.remove(path)
+    else:
+        transform.save(path)
+    _TRANSFORMS[path] = transform
+
+
+# ============================================================
+# Recall vs memory
+# ============================================================
+
+def _top_k(corpus, queries, k):
+    scores = queries @ corpus.T
+    # the query itself is in the corpus; push it out of its own results
+    np.fill_diagonal(scores[:, :len(queries)], -np.inf)
+    part = np.argpartition(-scores, k, axis=1)[:, :k]
+    return [set(row) for row in part]
+
+
+def recall_report(vectors, options, k=10, queries=200):
+    """
+    Recall@k of each compact option against exact full-precision search.
+
+    `vectors` are stored model-space vectors (a sample of the index),
+    `options` a list of (mode, dims, fp16). The first `queries` vectors
+    double as queries. Returns one dict per option.
+    """
+    corpus = _normalize(np.asarray(vectors, dtype=np.float32))
+    queries = min(queries, len(corpus) - k - 1)
+    if queries <= 0:
+        return []
+    full_dims = corpus.shape[1]
+    truth = _top_k(corpus, corpus[:queries], k)
+
+    rows = []
+    for mode, dims, fp16 in options:
+        transform = VectorTransform.fit(corpus, mode, dims, fp16)
+        small = transform.apply(corpus)
+        found = _top_k(small, small[:queries], k)
+        recall = np.mean([len(a & b) / k for a, b in zip(truth, found)])
+        per_vec = transform.bytes_per_vector(full_dims)
+        rows.append({
+            "mode": mode,
+            "dims": dims or full_dims,
+            "fp16": fp16,
+            "recall": float(recall),
+            "bytes_per_vector": per_vec,
+            "ratio": (per_vec + HNSW_LINK_BYTES) / (full_dims * 4 + HNSW_LINK_BYTES),
+        })
+    return rows
+
+
+# ============================================================
+# Compacting an existing index
+# ============================================================
+
+def sample_vectors(store, size=FIT_SAMPLE, seed=0):
+    """Uniform (reservoir) sample of up to `size` stored vectors."""
+    rng = np.random.default_rng(seed)
+    sample, seen = [], 0
+    for batch in store.iter_pages(include=("embeddings",)):
+        for vec in batch["embeddings"]:
+            seen += 1
+            if len(sample) < size:
+                sample.append(vec)
+            else:
+                j = rng.integers(seen)
+                if j < size:
+                    sample[j] = vec
+    return np.asarray(sample, dtype=np.float32)
+
+
+def compact_index(store, mode="pca", dims=256, fp16=False, log=print):
+    """
+    Fit a transform on the stored vectors and rewrite the index in the
+    compact space. Only works from full model-space vectors.
+    """
+    if not store.transform.identity:
+        raise RuntimeError(
+            f"{store.name} is already compact ({store.transform.mode}, {store.transform.dims} dims). "
+            f"Remove {store.transform_path} and run km reembed for every repo first."
+        )
+
+    sample = sample_vectors(store)
+    if not len(sample):
+        raise RuntimeError(f"{store.name} is empty")
+    transform = VectorTransform.fit(sample, mode, dims, fp16)
+    log(f"Fitted {mode} transform on {len(sample)} vectors -> {transform.dims or sample.shape[1]} dims")
+
+    total = store.rewrite(transform, log=log)
+    set_transform(store.transform_path, transform)
+    store.transform = transform
+    return total
@@ -0,0 +1,38 @@
+import threading
+
+from kernelmind import config
+
+DEFAULT_COLLECTION = "kernelmind_index"
+
+
+class VectorStoreFactory:
+    @staticmethod
+    def create(name=DEFAULT_COLLECTION, backend=None):
+        backend = backend or config.VECTOR_BACKEND
+        # backends are imported lazily so flat users never need chromadb
+        if backend == "chroma":
+            from .chroma_store import VectorStore
+            return VectorStore(name)
+        elif backend == "flat":
+            from .flat_store import FlatVectorStore
+            return FlatVectorStore(name)
+        else:
+            raise ValueError(f"Unknown vector backend: {backend}")
+
+
+_STORES = {}
+_LOCK = threading.Lock()
+
+
+def get_vector_store(name=DEFAULT_COLLECTION, backend=None):
+    """Process-wide store handle per (index, backend), created on first use."""
+    key = (name, backend or config.VECTOR_BACKEND)
+    with _LOCK:
+        if key not in _STORES:
+            _STORES[key] = VectorStoreFactory.create(*key)
+        return _STORES[key]
+
+
+def use_vector_backend(backend):
+    """Switch the default backend, e.g. from a CLI flag."""
+    config.VECTOR_BACKEND = backend
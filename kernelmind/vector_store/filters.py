@@ -0,0 +1,97 @@
+import os
+import posixpath
+
+# ----------------------------------
+# Metadata filters pushed down into the vector query
+# ----------------------------------
+
+# paths hidden from search unless the query asks for tests/docs
+BLOCKED_FOLDERS = [
+    "tests/", "test/",
+    "docs/", "docs_src/",
+    "examples/", "example/",
+    "tutorial/", "tutorials/",
+    "benchmarks/", "scripts/",
+    "migrations/",
+]
+
+# collection metadata flag: every chunk carries blocked / top_dir
+FILTER_META_FLAG = "filter_meta"
+
+
+def is_blocked(path):
+    p = (path or "").lower()
+    return any(bad in p for bad in BLOCKED_FOLDERS)
+
+
+def top_dir(path):
+    """First path segment, "" for files at the repo root."""
+    parts = (path or "").replace(os.sep, "/").split("/")
+    return parts[0] if len(parts) > 1 else ""
+
+
+def filter_meta(path):
+    """Derived metadata stored on every chunk so search can filter in the store."""
+    return {"blocked": is_blocked(path), "top_dir": top_dir(path)}
+
+
+def normalize_prefix(prefix):
+    """
+    Repo-relative form of a --path prefix: "./src/x", "/src/x" and
+    "src//x" all become "src/x". A trailing "/" (a directory) is kept.
+    """
+    p = (prefix or "").strip().replace(os.sep, "/")
+    while p.startswith(("./", "/")):
+        p = p[2:] if p.startswith("./") else p[1:]
+    if not p or p == ".":
+        return ""
+    norm = posixpath.normpath(p)
+    if norm == ".":
+        return ""
+    return norm + "/" if p.endswith("/") else norm
+
+
+def _prefix_top_dirs(prefix):
+    """top_dir values a path under `prefix` (normalized) can have."""
+    if "/" in prefix:
+        return [top_dir(prefix)]
+    # "src" is the src/ directory or a file at the root such as src.py
+    return [prefix, ""]
+
+
+def matches_prefix(path, prefix):
+    """
+    Whether a chunk path falls under a normalized prefix. The first
+    segment must name a whole directory, matching what build_where()
+    pushes down; deeper segments are plain string prefixes.
+    """
+    if not prefix:
+        return True
+    path = path or ""
+    return path.startswith(prefix) and top_dir(path) in _prefix_top_dirs(prefix)
+
+
+def build_where(repo=None, types=None, allow_blocked=True, path_prefix=None):
+    """
+    Chroma `where` clause for the given filters, or None. A path prefix
+    is pushed down by its top directory; results still need a
+    matches_prefix() check for anything deeper.
+    """
+    clauses = []
+    if repo:
+        clauses.append({"repo": repo})
+    if types:
+        types = list(types)
+        clauses.append({"type": types[0]} if len(types) == 1 else {"type": {"$in": types}})
+    if not allow_blocked:
+        clauses.append({"blocked": False})
+    path_prefix = normalize_prefix(path_prefix)
+    if path_prefix:
+        dirs = _prefix_top_dirs(path_prefix)
+        clauses.append({"top_dir": dirs[0]} if len(dirs) == 1 else {"top_dir": {"$in": dirs}})
+
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
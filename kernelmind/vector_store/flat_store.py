@@ -0,0 +1,549 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from kernelmind import config
+from kernelmind.vector_store.base import BaseVectorStore, clean_metas
+from kernelmind.vector_store.compact import reload_transform, set_transform
+from kernelmind.vector_store.filters import filter_meta
+
+# SQLite's default limit on bound parameters is 999 on older builds
+IN_CHUNK = 900
+
+# smallest row allocation of the vector file
+MIN_CAPACITY = 1024
+
+# rows scored per matrix product; bounds the float32 copy of float16 rows
+SCORE_BLOCK = 65536
+
+# metadata fields kept in memory as integer codes for query masks
+CODE_FIELDS = ("repo", "type", "top_dir")
+
+# seconds a writer waits for another process' write (compact rewrites
+# the whole index inside one)
+WRITE_TIMEOUT = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE,
+    repo TEXT, path TEXT, type TEXT, blocked INTEGER NOT NULL, top_dir TEXT,
+    document TEXT, meta TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_repo_path ON chunks (repo, path);
+CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);
+"""
+
+
+def _chunks(values, size=IN_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _file_id(path):
+    """Identity of a file; a grow or rewrite replaces the vector file."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+class FlatVectorStore(BaseVectorStore):
+    """
+    Exact (brute-force) index for one collection.
+
+    Vectors live in a memory-mapped .npy matrix, one row per chunk, with
+    squared norms alongside; ids, documents and metadata live in a SQLite
+    table keyed by row. repo / type / top_dir / blocked are also held in
+    memory as arrays, so filters become boolean masks and a query is one
+    matrix product plus argpartition. Rows of deleted chunks are reused.
+    float16 compact indexes are stored as float16.
+
+    Several processes may share an index. Every write runs in one BEGIN
+    IMMEDIATE transaction that allocates rows from the next-row counter
+    and free list in SQLite, and the in-memory state is reloaded whenever
+    another process has committed since it was last read.
+    """
+
+    def __init__(self, name="kernelmind_index", root=None):
+        self.dir = os.path.join(root or config.FLAT_INDEX_DIR, name)
+        os.makedirs(self.dir, exist_ok=True)
+        super().__init__(name, os.path.join(self.dir, "transform.npz"), legacy_key=f"{name}.flat")
+        self.vectors_path = os.path.join(self.dir, "vectors.npy")
+        self.norms_path = os.path.join(self.dir, "norms.npy")
+
+        # transactions are managed explicitly (see _txn)
+        self.conn = sqlite3.connect(
+            os.path.join(self.dir, "chunks.db"), check_same_thread=False,
+            isolation_level=None, timeout=WRITE_TIMEOUT,
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+        self.matrix = None
+        self.norms = None
+        self.capacity = 0
+        self._file_id = None
+        with self.lock, self._txn():
+            if self._info("next_row") is None:
+                self._init_rows()
+            self._load()
+
+    # ---------------------------------
+    # shared state
+    # ---------------------------------
+
+    @contextmanager
+    def _txn(self, mode="IMMEDIATE"):
+        """BEGIN IMMEDIATE takes the write lock up front, across processes."""
+        self.conn.execute(f"BEGIN {mode}")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _info(self, key):
+        row = self.conn.execute("SELECT value FROM info WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_info(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)", (key, value))
+
+    def _init_rows(self):
+        """Indexes from before the free list: next row past the highest, holes are free."""
+        used = {r for (r,) in self.conn.execute("SELECT row FROM chunks")}
+        next_row = max(used) + 1 if used else 0
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO free_rows (row) VALUES (?)",
+            [(r,) for r in range(next_row) if r not in used],
+        )
+        self._set_info("next_row", str(next_row))
+
+    def _data_version(self):
+        # changes whenever another connection commits
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load(self):
+        """Read metadata, vector file and masks as committed (inside a transaction)."""
+        self._version = self._data_version()
+        meta = self._info("metadata")
+        self._metadata = json.loads(meta) if meta else {}
+        self.used = int(self._info("next_row") or 0)
+
+        file_id = _file_id(self.vectors_path)
+        if file_id != self._file_id:
+            # grown or rewritten elsewhere; a rewrite also changed the transform
+            self.matrix = self.norms = None
+            self.capacity = 0
+            if file_id is not None:
+                self._open()
+            self.transform = reload_transform(self.transform_path)
+        self._load_masks()
+
+    def _sync(self):
+        """Catch up with writes committed by other processes (under self.lock)."""
+        if self._data_version() == self._version:
+            return
+        if self.conn.in_transaction:
+            self._load()
+        else:
+            with self._txn("DEFERRED"):
+                self._load()
+
+    # ---------------------------------
+    # vector file
+    # ---------------------------------
+
+    def _open(self):
+        self.matrix = np.load(self.vectors_path, mmap_mode="r+")
+        self.norms = np.load(self.norms_path, mmap_mode="r+")
+        self.capacity = len(self.matrix)
+        self._file_id = _file_id(self.vectors_path)
+
+    def _create(self, dim, dtype, capacity):
+        """Fresh vector + norm files, returned as (matrix, norms) opened for writing."""
+        matrix = np.lib.format.open_memmap(
+            self.vectors_path + ".part", mode="w+", dtype=dtype, shape=(capacity, dim)
+        )
+        norms = np.lib.format.open_memmap(
+            self.norms_path + ".part", mode="w+", dtype=np.float32, shape=(capacity,)
+        )
+        return matrix, norms
+
+    def _install(self, matrix, norms):
+        matrix.flush()
+        norms.flush()
+        del matrix, norms
+        self.matrix = self.norms = None
+        os.replace(self.vectors_path + ".part", self.vectors_path)
+        os.replace(self.norms_path + ".part", self.norms_path)
+        self._open()
+        # a commit, so other processes notice the new file (see _sync)
+        self._set_info("vector_file", json.dumps(self._file_id))
+
+    def _grow(self, needed, dim):
+        """Make the vector file cover `needed` rows (under _txn, rows below self.used are kept)."""
+        if needed <= self.capacity:
+            return
+        new_cap = max(needed, self.capacity * 2, MIN_CAPACITY)
+        if self.matrix is None:
+            dtype = np.float16 if self.transform.fp16 else np.float32
+            self._install(*self._create(dim, dtype, new_cap))
+        else:
+            # .npy headers fix the shape, so growing means a new file
+            matrix, norms = self._create(self.matrix.shape[1], self.matrix.dtype, new_cap)
+            for i in range(0, self.used, SCORE_BLOCK):
+                j = min(i + SCORE_BLOCK, self.used)
+                matrix[i:j] = self.matrix[i:j]
+            norms[:self.used] = self.norms[:self.used]
+            self._install(matrix, norms)
+
+        grow = self.capacity - len(self.alive)
+        self.alive = np.concatenate([self.alive, np.zeros(grow, dtype=bool)])
+        self.blocked = np.concatenate([self.blocked, np.zeros(grow, dtype=bool)])
+        for field in CODE_FIELDS:
+            self.codes[field] = np.concatenate([self.codes[field], np.full(grow, -1, dtype=np.int32)])
+
+    # ---------------------------------
+    # in-memory masks
+    # ---------------------------------
+
+    def _code(self, field, value):
+        vocab = self.vocab[field]
+        if value not in vocab:
+            vocab[value] = len(vocab)
+        return vocab[value]
+
+    def _load_masks(self):
+        size = max(self.capacity, self.used)
+        self.alive = np.zeros(size, dtype=bool)
+        self.blocked = np.zeros(size, dtype=bool)
+        self.codes = {field: np.full(size, -1, dtype=np.int32) for field in CODE_FIELDS}
+        self.vocab = {field: {} for field in CODE_FIELDS}
+
+        rows = self.conn.execute("SELECT row, repo, type, top_dir, blocked FROM chunks").fetchall()
+        if rows:
+            idx = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+            self.alive[idx] = True
+            self.blocked[idx] = [bool(r[4]) for r in rows]
+            for n, field in enumerate(CODE_FIELDS, start=1):
+                self.codes[field][idx] = [self._code(field, r[n]) for r in rows]
+
+    def _mark(self, rows, metas):
+        rows = np.asarray(rows, dtype=np.int64)
+        self.alive[rows] = True
+        self.blocked[rows] = [bool(m["blocked"]) for m in metas]
+        for field in CODE_FIELDS:
+            self.codes[field][rows] = [self._code(field, m.get(field, "")) for m in metas]
+
+    def _unmark(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        self.alive[rows] = False
+        for field in CODE_FIELDS:
+            self.codes[field][rows] = -1
+
+    def _where_mask(self, where, n):
+        """Boolean mask for the subset of Chroma `where` syntax build_where() emits."""
+        if "$and" in where:
+            mask = np.ones(n, dtype=bool)
+            for clause in where["$and"]:
+                mask &= self._where_mask(clause, n)
+            return mask
+        if "$or" in where:
+            mask = np.zeros(n, dtype=bool)
+            for clause in where["$or"]:
+                mask |= self._where_mask(clause, n)
+            return mask
+
+        (field, cond), = where.items()
+        if isinstance(cond, dict):
+            values = cond.get("$in", [cond.get("$eq")])
+        else:
+            values = [cond]
+
+        if field == "blocked":
+            return np.isin(self.blocked[:n], [bool(v) for v in values])
+        if field not in self.codes:
+            raise ValueError(f"Flat index cannot filter on {field!r}")
+        wanted = [self.vocab[field][v] for v in values if v in self.vocab[field]]
+        return np.isin(self.codes[field][:n], wanted)
+
+    # ---------------------------------
+    # index-level metadata
+    # ---------------------------------
+
+    @property
+    def metadata(self):
+        return self._metadata
+
+    def _set_metadata(self, **updates):
+        with self.lock, self._txn():
+            current = self._info("metadata")
+            self._metadata = {**(json.loads(current) if current else {}), **updates}
+            self._set_info("metadata", json.dumps(self._metadata))
+
+    def has_filter_meta(self):
+        # blocked / top_dir are derived from the path on every write
+        return True
+
+    def ensure_filter_meta(self, page=5000, log=print):
+        return 0
+
+    # ---------------------------------
+    # writes
+    # ---------------------------------
+
+    def _alloc(self, n):
+        """n rows for new chunks: freed rows first, then past the end (under _txn)."""
+        rows = [r for (r,) in self.conn.execute("SELECT row FROM free_rows ORDER BY row LIMIT ?", (n,))]
+        self.conn.executemany("DELETE FROM free_rows WHERE row = ?", [(r,) for r in rows])
+        next_row = int(self._info("next_row") or 0)
+        extra = n - len(rows)
+        rows += range(next_row, next_row + extra)
+        self._set_info("next_row", str(next_row + extra))
+        return rows
+
+    def _rows_of(self, ids):
+        found = {}
+        for part in _chunks(ids):
+            marks = ",".join("?" * len(part))
+            found.update(self.conn.execute(f"SELECT id, row FROM chunks WHERE id IN ({marks})", part))
+        return found
+
+    def _write(self, ids, embeddings, documents, metadatas, transformed, replace):
+        if not len(ids):
+            return
+        vecs = np.asarray(embeddings if transformed else self.to_index_space(embeddings), dtype=np.float32)
+        metas = [
+            {**m, **filter_meta(m.get("path"))} for m in clean_metas(metadatas)
+        ]
+
+        # last write of an id in the batch wins
+        latest = {cid: i for i, cid in enumerate(ids)}
+
+        with self.lock, self._txn():
+            self._sync()
+            existing = self._rows_of(list(latest))
+            if not replace:
+                latest = {cid: i for cid, i in latest.items() if cid not in existing}
+                if not latest:
+                    return
+
+            fresh = [cid for cid in latest if cid not in existing]
+            new_rows = self._alloc(len(fresh))
+            end = int(self._info("next_row"))
+            self._grow(end, vecs.shape[1])
+            self.used = end
+            rows_of = {**existing, **dict(zip(fresh, new_rows))}
+
+            order = list(latest.values())
+            rows = np.array([rows_of[cid] for cid in latest], dtype=np.int64)
+            stored = vecs[order].astype(self.matrix.dtype)
+            self.matrix[rows] = stored
+            as32 = stored.astype(np.float32)
+            self.norms[rows] = np.einsum("ij,ij->i", as32, as32)
+            self.matrix.flush()
+            self.norms.flush()
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, row, repo, path, type, blocked, top_dir, document, meta) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        cid, rows_of[cid], metas[i].get("repo"), metas[i].get("path"),
+                        metas[i].get("type"), int(metas[i]["blocked"]), metas[i]["top_dir"],
+                        documents[i], json.dumps(metas[i]),
+                    )
+                    for cid, i in latest.items()
+                ],
+            )
+            self._mark(rows, [metas[i] for i in order])
+
+    def add(self, ids, embeddings, documents, metadatas, transformed=False):
+        """Insert chunks; ids already in the index are left alone, as in Chroma."""
+        self._write(ids, embeddings, documents, metadatas, transformed, replace=False)
+
+    def upsert(self, ids, embeddings, documents, metadatas, transformed=False):
+        self._write(ids, embeddings, documents, metadatas, transformed, replace=True)
+
+    def update_metadata(self, ids, metadatas):
+        # id, repo and path are fixed for a chunk, so the in-memory masks stay valid
+        metas = [{**m, **filter_meta(m.get("path"))} for m in clean_metas(metadatas)]
+        with self.lock, self._txn():
+            self.conn.executemany(
+                "UPDATE chunks SET meta = ? WHERE id = ?",
+                [(json.dumps(m), cid) for cid, m in zip(ids, metas)],
+            )
+
+    def _delete_where(self, sql, params):
+        with self.lock, self._txn():
+            self._sync()
+            rows = [r for (r,) in self.conn.execute(f"SELECT row FROM chunks WHERE {sql}", params)]
+            self.conn.execute(f"DELETE FROM chunks WHERE {sql}", params)
+            self.conn.executemany("INSERT OR IGNORE INTO free_rows (row) VALUES (?)", [(r,) for r in rows])
+            if rows:
+                self._unmark(rows)
+
+    def delete_ids(self, ids):
+        for part in _chunks(ids):
+            self._delete_where(f"id IN ({','.join('?' * len(part))})", part)
+
+    def delete_file(self, repo, path):
+        self._delete_where("repo = ? AND path = ?", (repo, path))
+
+    def delete_repo(self, repo):
+        self._delete_where("repo = ?", (repo,))
+
+    def rewrite(self, transform, log=print):
+        """
+        Project every row into a new matrix, half precision if the transform
+        asks for it. The transform is saved in the same transaction, so no
+        other writer sees the new matrix with the old transform.
+        """
+        with self.lock, self._txn():
+            self._sync()
+            if self.matrix is None:
+                return 0
+            dtype = np.float16 if transform.fp16 else np.float32
+            dim = transform.dims or self.matrix.shape[1]
+            matrix, norms = self._create(dim, dtype, self.capacity)
+            for i in range(0, self.used, SCORE_BLOCK):
+                j = min(i + SCORE_BLOCK, self.used)
+                block = transform.apply(self.matrix[i:j].astype(np.float32)).astype(dtype)
+                matrix[i:j] = block
+                as32 = block.astype(np.float32)
+                norms[i:j] = np.einsum("ij,ij->i", as32, as32)
+                log(f"  rewrote {j} of {self.used} rows")
+            self._install(matrix, norms)
+            set_transform(self.transform_path, transform)
+            self.transform = transform
+            return int(self.alive[:self.used].sum())
+
+    # ---------------------------------
+    # reads
+    # ---------------------------------
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def file_metas(self, repo, path):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, meta FROM chunks WHERE repo = ? AND path = ?", (repo, path)
+            ).fetchall()
+        return {cid: json.loads(meta) for cid, meta in rows}
+
+    def _page(self, rows, include):
+        batch = {"ids": [r[1] for r in rows]}
+        if "documents" in include:
+            batch["documents"] = [r[2] for r in rows]
+        if "metadatas" in include:
+            batch["metadatas"] = [json.loads(r[3]) for r in rows]
+        if "embeddings" in include:
+            idx = np.array([r[0] for r in rows], dtype=np.int64)
+            batch["embeddings"] = np.asarray(self.matrix[idx], dtype=np.float32)
+        return batch
+
+    def iter_pages(self, include=("embeddings",), page=5000):
+        last = -1
+        while True:
+            with self.lock:
+                self._sync()
+                rows = self.conn.execute(
+                    "SELECT row, id, document, meta FROM chunks WHERE row > ? ORDER BY row LIMIT ?",
+                    (last, page),
+                ).fetchall()
+                if not rows:
+                    break
+                batch = self._page(rows, include)
+            yield batch
+            last = rows[-1][0]
+
+    def repo_stats(self, page=5000):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT repo, COUNT(*), SUM(LENGTH(CAST(document AS BLOB))) FROM chunks GROUP BY repo"
+            ).fetchall()
+        return {repo: {"chunks": n, "bytes": size or 0} for repo, n, size in rows}
+
+    def get(self, ids):
+        found = {}
+        with self.lock:
+            for part in _chunks(ids):
+                marks = ",".join("?" * len(part))
+                for row in self.conn.execute(
+                    f"SELECT row, id, document, meta FROM chunks WHERE id IN ({marks})", part
+                ):
+                    found[row[1]] = row
+        return self._page([found[cid] for cid in ids if cid in found], ("documents", "metadatas"))
+
+    def _fetch(self, rows):
+        found = {}
+        for part in _chunks(rows):
+            marks = ",".join("?" * len(part))
+            for row in self.conn.execute(
+                f"SELECT row, id, document, meta FROM chunks WHERE row IN ({marks})", part
+            ):
+                found[row[0]] = row
+        return found
+
+    def query_vectors(self, embeddings, k=10, where=None):
+        keys = ("ids", "documents", "metadatas", "distances")
+
+        with self.lock:
+            self._sync()
+            # after the sync: a compact elsewhere may have changed the transform
+            queries = np.asarray(self.to_index_space(embeddings), dtype=np.float32)
+            if queries.ndim == 1:
+                queries = queries[None, :]
+            n = self.used
+            mask = self.alive[:n].copy()
+            if where:
+                mask &= self._where_mask(where, n)
+            rows = np.flatnonzero(mask)
+            if self.matrix is None or not len(rows):
+                return {key: [[] for _ in queries] for key in keys}
+
+            # squared l2, like Chroma's default space: |q|^2 - 2 q.x + |x|^2
+            dists = np.empty((len(queries), len(rows)), dtype=np.float32)
+            contiguous = len(rows) == n
+            for i in range(0, len(rows), SCORE_BLOCK):
+                j = min(i + SCORE_BLOCK, len(rows))
+                part = slice(i, j) if contiguous else rows[i:j]
+                block = np.asarray(self.matrix[part], dtype=np.float32)
+                dists[:, i:j] = self.norms[part][None, :] - 2.0 * (queries @ block.T)
+            dists += np.einsum("ij,ij->i", queries, queries)[:, None]
+            np.maximum(dists, 0.0, out=dists)
+
+            k = min(k, len(rows))
+            if k < len(rows):
+                top = np.argpartition(dists, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(len(rows)), dists.shape)
+            top_d = np.take_along_axis(dists, top, axis=1)
+            order = np.argsort(top_d, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_d = np.take_along_axis(top_d, order, axis=1)
+
+            hits = rows[top]
+            found = self._fetch(np.unique(hits).tolist())
+
+        out = {key: [] for key in keys}
+        for row_ids, row_d in zip(hits, top_d):
+            recs = [found[int(r)] for r in row_ids]
+            out["ids"].append([r[1] for r in recs])
+            out["documents"].append([r[2] for r in recs])
+            out["metadatas"].append([json.loads(r[3]) for r in recs])
+            out["distances"].append([float(d) for d in row_d])
+        return out
@@ -0,0 +1,64 @@
+from kernelmind import config
+from kernelmind.metadata_store.sqlite_store import SQLiteMetadataStore
+from kernelmind.parsers.python_parser import parse_python
+from kernelmind.utils.chunker import build_text_chunks
+
+SOURCE = '''"""Module doc."""
+import os
+from collections import OrderedDict
+
+
+def helper(x):
+    """Return x."""
+    return x
+
+
+class Cache:
+    """Small cache."""
+
+    def get(self, key):
+        return key
+'''
+
+
+def _stored_pack(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "BLOB_DIR", str(tmp_path / "blobs"))
+    repo_root = tmp_path / "repo"
+    repo_root.mkdir()
+    path = repo_root / "mod.py"
+    path.write_text(SOURCE)
+
+    store = SQLiteMetadataStore(str(tmp_path / "metadata.db"))
+    store.save_batch([("code", parse_python(str(path)))], "demo", str(repo_root))
+    packs = store.context_packs("demo", ["mod.py"])
+    return packs["mod.py"], str(repo_root)
+
+
+def test_stored_pack_imports_are_documents(tmp_path, monkeypatch):
+    pack, _ = _stored_pack(tmp_path, monkeypatch)
+    assert all(isinstance(imp, dict) for imp in pack["imports"])
+
+
+def test_file_chunk_from_stored_pack(tmp_path, monkeypatch):
+    pack, repo_root = _stored_pack(tmp_path, monkeypatch)
+    chunks = build_text_chunks(pack, repo_root)
+
+    file_chunk = next(c for c in chunks if c["type"] == "file")
+    assert "# imports: os, collections.OrderedDict" in file_chunk["text"]
+    assert {c["type"] for c in chunks} == {"file", "function", "class", "method"}
+
+
+def test_file_chunk_from_parser_pack(tmp_path):
+    path = tmp_path / "mod.py"
+    path.write_text(SOURCE)
+    parsed = parse_python(str(path))
+    pack = {
+        "file": dict(parsed["file"], path="mod.py", source=SOURCE),
+        "imports": parsed["imports"],
+        "functions": parsed["functions"],
+        "classes": parsed["classes"],
+        "methods": parsed["methods"],
+    }
+    chunks = build_text_chunks(pack, str(tmp_path))
+    file_chunk = next(c for c in chunks if c["type"] == "file")
+    assert "# imports: os, collections.OrderedDict" in file_chunk["text"]
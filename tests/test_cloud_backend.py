@@ -0,0 +1,143 @@
+import threading
+
+import numpy as np
+import pytest
+import requests
+
+from kernelmind.embeddings import server as embed_server
+from kernelmind.embeddings.cloud_backend import CloudEmbeddingBackend
+
+
+class StubEmbedder:
+    model_name = "stub-model"
+    dim = 3
+
+    def __init__(self):
+        self.batches = []
+        self.broken = False
+
+    def embed(self, texts):
+        self.batches.append(len(texts))
+        if self.broken:
+            raise ValueError("cannot embed")
+        return np.array([[len(t), t.count("x"), 1.0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    stub = StubEmbedder()
+    monkeypatch.setattr(embed_server.models, "get_embedder", lambda backend: stub)
+    srv = embed_server.make_server(port=0)
+
+    # record the client connection of every request and fail the first
+    # `fail` embed calls with a retryable status
+    srv.clients, srv.fail = [], 0
+
+    class Handler(srv.RequestHandlerClass):
+        def do_POST(self):
+            self.server.clients.append(self.client_address)
+            if self.server.fail:
+                self.server.fail -= 1
+                self._read_body()
+                return self._send(503, {"error": "busy"})
+            super().do_POST()
+
+        def do_GET(self):
+            self.server.clients.append(self.client_address)
+            super().do_GET()
+
+    srv.RequestHandlerClass = Handler
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv, stub, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _backend(url, **kw):
+    kw.setdefault("concurrency", 1)
+    return CloudEmbeddingBackend("stub-model", url=url, backoff=0.01, api_key="", **kw)
+
+
+def test_batches_in_input_order(service):
+    srv, stub, url = service
+    backend = _backend(url, batch_size=4)
+    texts = ["x" * i for i in range(10)]
+
+    vectors = backend.embed(texts)
+    backend.close()
+
+    assert stub.batches == [4, 4, 2]
+    assert vectors.shape == (10, 3)
+    assert vectors[:, 0].tolist() == list(range(10))
+
+
+def test_batches_capped_by_payload_size(service):
+    srv, stub, url = service
+    backend = _backend(url, batch_size=100, max_request_bytes=100)
+    backend.embed(["y" * 40] * 5)
+    backend.close()
+
+    assert stub.batches == [2, 2, 1]
+
+
+def test_retries_retryable_status(service):
+    srv, stub, url = service
+    backend = _backend(url, batch_size=8)
+    srv.fail = 2
+
+    vectors = backend.embed(["a", "bb", "ccc"])
+    backend.close()
+
+    assert srv.fail == 0
+    assert stub.batches == [3]
+    assert vectors[:, 0].tolist() == [1, 2, 3]
+
+
+def test_gives_up_after_retries(service):
+    srv, stub, url = service
+    backend = _backend(url, retries=1)
+    srv.fail = 5
+
+    with pytest.raises(RuntimeError, match="after 2 attempts"):
+        backend.embed(["a"])
+    backend.close()
+    assert stub.batches == []
+
+
+def test_reuses_one_connection(service):
+    srv, stub, url = service
+    backend = _backend(url, batch_size=2)
+    srv.fail = 1
+    for _ in range(3):
+        backend.embed(["a", "b", "c", "d", "e"])
+    backend.close()
+
+    # /info, one 503 and 9 embed batches, all over one keep-alive connection
+    assert len(srv.clients) == 11
+    assert len(set(srv.clients)) == 1
+
+
+def test_embedder_error_is_a_500(service):
+    srv, stub, url = service
+    stub.broken = True
+    resp = requests.post(url + "/embed", json={"texts": ["a"]}, timeout=10)
+    assert resp.status_code == 500
+    assert "cannot embed" in resp.json()["error"]
+
+
+def test_embedder_error_is_not_retried(service):
+    srv, stub, url = service
+    backend = _backend(url)
+    stub.broken = True
+
+    with pytest.raises(RuntimeError, match="HTTP 500"):
+        backend.embed(["a"])
+    backend.close()
+    assert stub.batches == [1]
+
+
+def test_rejects_other_model(service):
+    srv, stub, url = service
+    with pytest.raises(RuntimeError, match="serves 'stub-model'"):
+        CloudEmbeddingBackend("other-model", url=url, api_key="")
@@ -0,0 +1,26 @@
+import pytest
+
+from kernelmind.ingestion.crawler import is_binary_or_generated
+
+
+@pytest.mark.parametrize("head", [
+    "// Code generated by protoc-gen-go. DO NOT EDIT.\npackage pb\n",
+    "# @generated by tool\nx = 1\n",
+    "/* This file is autogenerated. */\nvar a = 1;\n",
+    "#!/usr/bin/env python\n# -*- coding: utf-8 -*-\n# Auto-generated from schema.json\n",
+])
+def test_generated_headers(tmp_path, head):
+    path = tmp_path / "gen.py"
+    path.write_text(head)
+    assert is_binary_or_generated(str(path))
+
+
+@pytest.mark.parametrize("text", [
+    "# do not edit this list without updating docs/x.md\nITEMS = [1, 2]\n",
+    "def f():\n    return 1\n" * 3 + "# Code generated by hand, DO NOT EDIT.\n",
+    "# the code generated by make_parser is cached here\n",
+])
+def test_hand_written_sources(tmp_path, text):
+    path = tmp_path / "src.py"
+    path.write_text(text)
+    assert not is_binary_or_generated(str(path))
@@ -0,0 +1,56 @@
+import pytest
+
+from kernelmind.vector_store.filters import build_where, matches_prefix, normalize_prefix
+
+
+@pytest.mark.parametrize("prefix, expected", [
+    ("src/x", "src/x"),
+    ("./src/x", "src/x"),
+    ("/src/x", "src/x"),
+    ("src//x/../x", "src/x"),
+    ("src/", "src/"),
+    ("./src/", "src/"),
+    ("src", "src"),
+    ("./", ""),
+    ("/", ""),
+    (None, ""),
+])
+def test_normalize_prefix(prefix, expected):
+    assert normalize_prefix(prefix) == expected
+
+
+@pytest.mark.parametrize("prefix", ["src/x", "./src/x", "/src/x", "src/"])
+def test_nested_prefix_pushes_down_top_dir(prefix):
+    assert build_where(path_prefix=prefix) == {"top_dir": "src"}
+
+
+def test_bare_prefix_pushes_down_dir_or_root_file():
+    assert build_where(path_prefix="src") == {"top_dir": {"$in": ["src", ""]}}
+    assert build_where(path_prefix="./src") == {"top_dir": {"$in": ["src", ""]}}
+
+
+def test_empty_prefix_is_no_filter():
+    assert build_where(path_prefix="./") is None
+    assert build_where("r", path_prefix="/") == {"repo": "r"}
+
+
+def test_prefix_combines_with_other_filters():
+    where = build_where("r", ["function"], allow_blocked=False, path_prefix="./src/x")
+    assert where == {"$and": [
+        {"repo": "r"}, {"type": "function"}, {"blocked": False}, {"top_dir": "src"},
+    ]}
+
+
+@pytest.mark.parametrize("path, prefix, expected", [
+    ("src/x/a.py", "src/x", True),
+    ("src/xy.py", "src/x", True),
+    ("src/a.py", "src/x", False),
+    ("src/a.py", "src", True),
+    ("src.py", "src", True),
+    ("srcgen/a.py", "src", False),
+    ("src/a.py", "src/", True),
+    ("src.py", "src/", False),
+    ("lib/a.py", "", True),
+])
+def test_matches_prefix_agrees_with_pushdown(path, prefix, expected):
+    assert matches_prefix(path, prefix) is expected
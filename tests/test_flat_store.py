@@ -0,0 +1,71 @@
+import multiprocessing
+
+import numpy as np
+
+from kernelmind.vector_store.flat_store import FlatVectorStore
+
+DIM = 8
+
+
+def _vec(n):
+    v = np.zeros(DIM, dtype=np.float32)
+    v[n % DIM] = 1.0 + n
+    return v
+
+
+def _meta(n):
+    return {"repo": f"r{n % 3}", "path": f"src/f{n}.py", "type": "function"}
+
+
+def _writer(root, worker, count, batch):
+    store = FlatVectorStore("idx", root=root)
+    for start in range(0, count, batch):
+        nums = [worker * 100000 + i for i in range(start, start + batch)]
+        ids = [f"c{n}" for n in nums]
+        store.upsert(ids, np.stack([_vec(n) for n in nums]), [str(n) for n in nums], [_meta(n) for n in nums])
+        # free some rows so the other writers reuse them
+        store.delete_ids(ids[:batch // 4])
+
+
+def test_concurrent_writers_never_share_a_row(tmp_path):
+    root = str(tmp_path)
+    workers, count, batch = 4, 400, 40
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_writer, args=(root, w, count, batch)) for w in range(workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(120)
+        assert p.exitcode == 0
+
+    store = FlatVectorStore("idx", root=root)
+    kept = [w * 100000 + i for w in range(workers) for i in range(count) if i % batch >= batch // 4]
+    assert store.count() == len(kept)
+
+    rows = store.conn.execute("SELECT id, row FROM chunks").fetchall()
+    assert len({r for _, r in rows}) == len(rows)
+    free = {r for (r,) in store.conn.execute("SELECT row FROM free_rows")}
+    assert not free & {r for _, r in rows}
+
+    for cid, row in rows:
+        assert np.array_equal(store.matrix[row], _vec(int(cid[1:])))
+
+
+def test_reader_sees_other_writers(tmp_path):
+    root = str(tmp_path)
+    reader = FlatVectorStore("idx", root=root)
+    assert reader.query_vectors(_vec(1)[None, :], k=1)["ids"] == [[]]
+
+    writer = FlatVectorStore("idx", root=root)
+    writer.upsert(["c1", "c2"], np.stack([_vec(1), _vec(2)]), ["1", "2"], [_meta(1), _meta(2)])
+    assert reader.query_vectors(_vec(1)[None, :], k=1)["ids"] == [["c1"]]
+    assert reader.count() == 2
+
+    # grow the file past its first allocation in the writer only
+    nums = list(range(3, 3000))
+    writer.upsert([f"c{n}" for n in nums], np.stack([_vec(n) for n in nums]),
+                  [str(n) for n in nums], [_meta(n) for n in nums])
+    writer.delete_ids(["c1"])
+    res = reader.query_vectors(_vec(2999)[None, :], k=1, where={"repo": "r2"})
+    assert res["ids"] == [["c2999"]]
+    assert "c1" not in reader.query_vectors(_vec(1)[None, :], k=5)["ids"][0]
@@ -0,0 +1,68 @@
+import shutil
+
+import pytest
+
+from kernelmind.parsers import js_parser
+from kernelmind.parsers.js_parser import NodeWorker, parse_javascript_batch
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+# stand-ins for parse_js.js speaking the same one-line protocol
+ECHO = """
+require("readline").createInterface({ input: process.stdin }).on("line", (line) => {
+  const req = JSON.parse(line);
+  const results = req.paths.map(() => ({ imports: ["x"], functions: [], classes: [], methods: [] }));
+  process.stdout.write(JSON.stringify({ id: req.id, results }) + "\\n");
+});
+"""
+HANG = 'process.stdin.resume();\n'
+CRASH = 'process.stdin.once("data", () => process.exit(3));\n'
+
+
+def _script(tmp_path, body):
+    path = tmp_path / "worker.js"
+    path.write_text(body)
+    return str(path)
+
+
+def _source(tmp_path):
+    path = tmp_path / "a.js"
+    path.write_text("export const a = 1;\n")
+    return str(path)
+
+
+def test_packaged_script_exists():
+    assert NodeWorker().script == js_parser.PARSE_JS
+    assert js_parser.os.path.isfile(js_parser.PARSE_JS)
+
+
+def test_round_trip_reuses_the_process(tmp_path):
+    worker = NodeWorker(_script(tmp_path, ECHO), timeout=10)
+    src = _source(tmp_path)
+    assert worker.parse_batch([src, src])[0]["imports"] == ["x"]
+    pid = worker.proc.pid
+    worker.parse_batch([src])
+    assert worker.proc.pid == pid
+    worker.close()
+
+
+def test_hung_worker_is_killed_and_restarted(tmp_path):
+    worker = NodeWorker(_script(tmp_path, HANG), timeout=0.5)
+    src = _source(tmp_path)
+    with pytest.raises(RuntimeError, match="timed out"):
+        worker.parse_batch([src])
+    assert worker.proc is None
+
+    worker.script = _script(tmp_path, ECHO)
+    assert len(worker.parse_batch([src])) == 1
+    worker.close()
+
+
+def test_failed_worker_yields_failed_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(js_parser, "_WORKER", NodeWorker(_script(tmp_path, CRASH), timeout=10))
+    src = _source(tmp_path)
+
+    out = parse_javascript_batch([src])
+    assert out[0]["error"].startswith("Failed to parse: node worker exited")
+    assert out[0]["source"] == "export const a = 1;\n"
+    assert js_parser._WORKER.proc is None
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from kernelmind.embeddings.bench import MIN_COSINE, cosine_parity, sample_texts
+
+# small enough to download and export in CI; override to check the real model
+PARITY_MODEL = os.environ.get(
+    "KERNELMIND_PARITY_MODEL", "sentence-transformers-testing/stsb-bert-tiny-safetensors"
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    for module in ("torch", "sentence_transformers", "transformers", "onnx", "onnxruntime"):
+        pytest.importorskip(module)
+    from kernelmind.embeddings.onnx_backend import export_onnx
+
+    out_dir = str(tmp_path_factory.mktemp("onnx"))
+    try:
+        export_onnx(PARITY_MODEL, out_dir=out_dir, log=lambda *_: None)
+    except OSError as e:
+        pytest.skip(f"{PARITY_MODEL} is not available: {e}")
+    return out_dir
+
+
+@pytest.fixture(scope="module")
+def reference(exported):
+    from kernelmind.embeddings.local_backend import LocalEmbeddingBackend
+
+    return LocalEmbeddingBackend(PARITY_MODEL, batch_size=16, device="cpu")
+
+
+@pytest.fixture(scope="module")
+def texts():
+    return sample_texts(os.path.join(REPO_ROOT, "kernelmind"), n=64)
+
+
+@pytest.mark.parametrize("quantized, bar", [(False, 0.999), (True, MIN_COSINE)])
+def test_onnx_matches_pytorch(exported, reference, texts, quantized, bar):
+    from kernelmind.embeddings.onnx_backend import OnnxEmbeddingBackend
+
+    backend = OnnxEmbeddingBackend(PARITY_MODEL, batch_size=16, path=exported, quantized=quantized)
+    assert backend.dim == reference.dim
+
+    low, mean = cosine_parity(reference, backend, texts)
+    assert low >= bar, f"min cosine {low:.4f} (mean {mean:.4f})"